@@ -5,7 +5,7 @@ import {
   completeMelody,
   CompletionRequest,
   fetchDefaultSeed,
-  fetchBridgeLatest,
+  waitBridgeResult,
   startLiveCapture,
   BridgeLatestResponse,
   notifyMax,
@@ -84,7 +84,7 @@ const App: React.FC = () => {
   const [lastPayload, setLastPayload] = useState<CompletionRequest | null>(null);
   
   const [capturingFromLive, setCapturingFromLive] = useState(false);
-  const [captureTimeout, setCaptureTimeout] = useState<NodeJS.Timeout | null>(null);
+  const [captureAbort, setCaptureAbort] = useState<AbortController | null>(null);
   const [capturingChordsFromLive, setCapturingChordsFromLive] = useState(false);
   const [exporting, setExporting] = useState(false);
 
@@ -126,14 +126,14 @@ const App: React.FC = () => {
     };
   }, []);
 
-  // Cleanup: cancel polling on unmount
+  // Cleanup: cancel the pending long-poll on unmount
   useEffect(() => {
     return () => {
-      if (captureTimeout) {
-        clearTimeout(captureTimeout);
+      if (captureAbort) {
+        captureAbort.abort();
       }
     };
-  }, [captureTimeout]);
+  }, [captureAbort]);
 
   const handleReset = () => {
     setNotesInput(defaultNotesText);
@@ -145,7 +145,7 @@ const App: React.FC = () => {
     setAddedNotes([]);
     setLastPayload(null);
     setRequestDuration(null);
-    if (captureTimeout) clearTimeout(captureTimeout);
+    if (captureAbort) captureAbort.abort();
     setCapturingFromLive(false);
   };
 
@@ -273,14 +273,28 @@ const App: React.FC = () => {
     }
   };
 
+  // 等待 Max 时每秒刷新倒计时（一次长轮询可能挂起好几秒）；abort 时自动停止
+  const startCountdown = (deadline: number, signal: AbortSignal, maxUnconfirmed: () => boolean) => {
+    const tick = () => {
+      const remaining = Math.max(0, Math.ceil((deadline - Date.now()) / 1000));
+      setStatus(`⏳ 等待中... (${remaining}s)${maxUnconfirmed() ? " · 监听中 (Max 未确认)" : ""}`);
+    };
+    tick();
+    const timer = window.setInterval(tick, 1000);
+    const stop = () => window.clearInterval(timer);
+    signal.addEventListener("abort", stop);
+    return stop;
+  };
+
   const handleLoadFromLive = async () => {
     setCapturingFromLive(true);
     setError(null);
     setStatus("⏳ 已准备好，请在 Max for Live 中点击「捕获」按钮...");
     
     // 通知后端开始监听
+    let version = 0;
     try {
-      await startLiveCapture();
+      ({ version } = await startLiveCapture());
     } catch (err) {
       console.error("Failed to start capture", err);
       setError("无法启动监听");
@@ -290,6 +304,7 @@ const App: React.FC = () => {
     }
 
     // 顺便推一条消息给 Max（默认发到 7401，经由后端）
+    let maxUnconfirmed = false;
     notifyMax({
       event: "start_capture",
       data: {
@@ -301,46 +316,50 @@ const App: React.FC = () => {
       },
     }).catch(err => {
       console.error("Notify Max failed", err);
-      // 不阻塞主流程，仅提示状态
-      setStatus(prev => prev || "监听中 (Max 未确认)");
+      // 不阻塞主流程，仅在倒计时里提示
+      maxUnconfirmed = true;
     });
 
-    // 轮询查询结果（最多 8 秒，每 1 秒查询一次）
-    let attempts = 0;
-    const maxAttempts = 8;
-    
-    const pollResult = async () => {
-      if (attempts >= maxAttempts) {
-        setCapturingFromLive(false);
-        setError("超时：未收到 Max for Live 的数据。请确认已在 Max 中点击捕获按钮");
-        setStatus("");
-        return;
-      }
+    // 长轮询等待结果（最多 8 秒）：后端一收到 Max 的数据就立即返回
+    const deadline = Date.now() + 8000;
+    const abort = new AbortController();
+    setCaptureAbort(abort);
 
+    const pollResult = async () => {
+      const stopCountdown = startCountdown(deadline, abort.signal, () => maxUnconfirmed);
       try {
-        const result: BridgeLatestResponse = await fetchBridgeLatest();
-        if (result.has_data) {
-          // 收到数据
-          setNotesInput(
-            result.full_track
-              .map(n => `${n.pitch} ${n.start} ${n.duration}`)
-              .join("\n")
-          );
-          setAddedNotes(result.added_notes);
-          setStatus(`✓ 成功从 Live 加载 ${result.full_track.length} 个音符`);
-          setCapturingFromLive(false);
-          return;
+        while (!abort.signal.aborted) {
+          const remaining = Math.ceil((deadline - Date.now()) / 1000);
+          if (remaining <= 0) {
+            setCapturingFromLive(false);
+            setError("超时：未收到 Max for Live 的数据。请确认已在 Max 中点击捕获按钮");
+            setStatus("");
+            return;
+          }
+          try {
+            const result: BridgeLatestResponse = await waitBridgeResult(version, remaining, abort.signal);
+            version = result.version;
+            if (result.has_data) {
+              // 收到数据
+              setNotesInput(
+                result.full_track
+                  .map(n => `${n.pitch} ${n.start} ${n.duration}`)
+                  .join("\n")
+              );
+              setAddedNotes(result.added_notes);
+              setStatus(`✓ 成功从 Live 加载 ${result.full_track.length} 个音符`);
+              setCapturingFromLive(false);
+              return;
+            }
+          } catch (err) {
+            if (abort.signal.aborted) return;
+            console.error("Poll error", err);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+          }
         }
-      } catch (err) {
-        console.error("Poll error", err);
+      } finally {
+        stopCountdown();
       }
-
-      attempts++;
-      const remainingTime = (maxAttempts - attempts);
-      setStatus(`⏳ 等待中... (${remainingTime}s)`);
-      
-      const timeout = setTimeout(pollResult, 1000);
-      setCaptureTimeout(timeout);
     };
 
     pollResult();
@@ -352,8 +371,9 @@ const App: React.FC = () => {
     setError(null);
     setStatus("⏳ 已准备好，请在 Max for Live 中点击「捕获」按钮（和弦）...");
 
+    let version = 0;
     try {
-      await startLiveCapture();
+      ({ version } = await startLiveCapture());
     } catch (err) {
       console.error("Failed to start capture", err);
       setError("无法启动监听");
@@ -362,6 +382,7 @@ const App: React.FC = () => {
       return;
     }
 
+    let maxUnconfirmed = false;
     notifyMax({
       event: "start_capture",
       data: {
@@ -373,42 +394,46 @@ const App: React.FC = () => {
       },
     }).catch(err => {
       console.error("Notify Max failed", err);
-      setStatus(prev => prev || "监听中 (Max 未确认)");
+      maxUnconfirmed = true;
     });
 
-    let attempts = 0;
-    const maxAttempts = 8;
+    const deadline = Date.now() + 8000;
+    const abort = new AbortController();
+    setCaptureAbort(abort);
 
     const pollResult = async () => {
-      if (attempts >= maxAttempts) {
-        setCapturingChordsFromLive(false);
-        setError("超时：未收到 Max for Live 的数据。请确认已在 Max 中点击捕获按钮");
-        setStatus("");
-        return;
-      }
-
+      const stopCountdown = startCountdown(deadline, abort.signal, () => maxUnconfirmed);
       try {
-        const result: BridgeLatestResponse = await fetchBridgeLatest();
-        if (result.has_data) {
-          const text = result.full_track
-            .map(n => `${n.pitch} ${n.start} ${n.duration}`)
-            .join("\n");
-          setChordsInput(text);
-          setChords(parseChordsInput(text));
-          setStatus(`✓ 成功从 Live 加载和弦（共 ${result.full_track.length} 行）`);
-          setCapturingChordsFromLive(false);
-          return;
+        while (!abort.signal.aborted) {
+          const remaining = Math.ceil((deadline - Date.now()) / 1000);
+          if (remaining <= 0) {
+            setCapturingChordsFromLive(false);
+            setError("超时：未收到 Max for Live 的数据。请确认已在 Max 中点击捕获按钮");
+            setStatus("");
+            return;
+          }
+          try {
+            const result: BridgeLatestResponse = await waitBridgeResult(version, remaining, abort.signal);
+            version = result.version;
+            if (result.has_data) {
+              const text = result.full_track
+                .map(n => `${n.pitch} ${n.start} ${n.duration}`)
+                .join("\n");
+              setChordsInput(text);
+              setChords(parseChordsInput(text));
+              setStatus(`✓ 成功从 Live 加载和弦（共 ${result.full_track.length} 行）`);
+              setCapturingChordsFromLive(false);
+              return;
+            }
+          } catch (err) {
+            if (abort.signal.aborted) return;
+            console.error("Poll error", err);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+          }
         }
-      } catch (err) {
-        console.error("Poll error", err);
+      } finally {
+        stopCountdown();
       }
-
-      attempts++;
-      const remainingTime = maxAttempts - attempts;
-      setStatus(`⏳ 等待中... (${remainingTime}s)`);
-
-      const timeout = setTimeout(pollResult, 1000);
-      setCaptureTimeout(timeout);
     };
 
     pollResult();
@@ -16,6 +16,7 @@ export type CompletionRequest = {
   length_unit: MelodyUnit;
   adventureness: number;
   chords?: Chord[];
+  bypass_cache?: boolean;
 };
 
 export type BridgeLatestResponse = {
@@ -23,6 +24,7 @@ export type BridgeLatestResponse = {
   full_track: Note[];
   timestamp: string | null;
   has_data: boolean;
+  version: number;
 };
 
 export type NotifyMaxRequest = {
@@ -81,7 +83,23 @@ export async function fetchBridgeLatest(): Promise<BridgeLatestResponse> {
   return res.json();
 }
 
-export async function startLiveCapture(): Promise<{ status: string; message: string }> {
+// Long-poll: resolves as soon as the bridge state moves past `since`,
+// or with the unchanged state after `timeoutSeconds`.
+export async function waitBridgeResult(
+  since: number,
+  timeoutSeconds: number,
+  signal?: AbortSignal
+): Promise<BridgeLatestResponse> {
+  const params = new URLSearchParams({ since: String(since), timeout: String(timeoutSeconds) });
+  const res = await fetch(`${BRIDGE_LATEST_URL}?${params}`, { method: "GET", signal });
+  if (!res.ok) {
+    const errorText = await res.text();
+    throw new Error(errorText || "Failed to fetch bridge result");
+  }
+  return res.json();
+}
+
+export async function startLiveCapture(): Promise<{ status: string; message: string; version: number }> {
   const res = await fetch(`${BASE_URL}/bridge/start-capture`, { method: "POST" });
   if (!res.ok) {
     const errorText = await res.text();
@@ -0,0 +1,81 @@
+"""
+Benchmark MIDI export latency: native SMF writer vs music21.
+
+Usage:
+    python bin/benchmarks/bench_midi_export.py [--sizes 100 10000 100000] [--music21-max 10000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BIN_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BIN_ROOT))
+
+from midi_track_ctrl.smf import encode_smf, note_events, write_smf  # noqa: E402
+
+PITCHES = ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5", "E-4", "F#4"]
+
+
+def make_notes(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    notes = []
+    start = 0.0
+    for _ in range(count):
+        dur = rng.choice([0.25, 0.5, 0.75, 1.0])
+        notes.append({"pitch": rng.choice(PITCHES), "start": start, "duration": dur})
+        start += dur
+    return notes
+
+
+def export_smf(notes, bpm, path):
+    write_smf(encode_smf(note_events(notes), bpm=bpm), path)
+
+
+def export_music21(notes, bpm, path):
+    from music21 import note as m21note, stream as m21stream, tempo as m21tempo
+
+    s = m21stream.Stream()
+    s.append(m21tempo.MetronomeMark(number=bpm))
+    for n in notes:
+        m = m21note.Note(n["pitch"])
+        m.duration.quarterLength = float(n["duration"])
+        s.insert(float(n["start"]), m)
+    s.write("midi", fp=str(path))
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--music21-max", type=int, default=10_000, help="Skip music21 above this many notes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "bench.mid"
+        export_music21(make_notes(1), 120.0, out)  # keep music21's import out of the timings
+        print(f"{'notes':>8} {'smf (ms)':>10} {'music21 (ms)':>13} {'speedup':>8}")
+        for size in args.sizes:
+            notes = make_notes(size)
+            smf_s = timed(export_smf, notes, 120.0, out, repeat=args.repeat)
+            if size <= args.music21_max:
+                m21_s = timed(export_music21, notes, 120.0, out, repeat=1)
+                print(f"{size:>8} {smf_s * 1000:>10.2f} {m21_s * 1000:>13.1f} {m21_s / smf_s:>7.0f}x")
+            else:
+                print(f"{size:>8} {smf_s * 1000:>10.2f} {'skipped':>13} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
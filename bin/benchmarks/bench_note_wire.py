@@ -0,0 +1,70 @@
+"""
+Benchmark the compact note wire formats against JSON: bytes per note and
+encode / decode time for a bridge payload (full_track + added_notes).
+
+Usage:
+    python bin/benchmarks/bench_note_wire.py [--sizes 16 256 2048]
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_midi_export import make_notes  # noqa: E402
+from midi_track_ctrl.datagram import build_osc_message  # noqa: E402
+from midi_track_ctrl.note_wire import (  # noqa: E402
+    NOTES_ADDRESS,
+    NOTES_BLOB_ADDRESS,
+    decode_notes_message,
+    encode_notes_message,
+)
+from udp_bridge import decode_packet  # noqa: E402
+
+
+def best_us(fn) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 256, 2048])
+    args = parser.parse_args()
+
+    print(f"{'notes':>6} {'format':<8} {'bytes':>8} {'B/note':>7} {'encode us':>10} {'decode us':>10}")
+    for size in args.sizes:
+        notes = make_notes(size)
+        payload = {"full_track": notes, "added_notes": notes[size // 2:], "bpm": 120}
+        count = size + len(payload["added_notes"])
+
+        formats = {
+            # what the backend sends today: JSON as one OSC string argument
+            "json": (
+                lambda: build_osc_message("/json", json.dumps(payload)),
+                decode_packet,
+            ),
+            "notes": (
+                lambda: encode_notes_message(payload, NOTES_ADDRESS),
+                decode_notes_message,
+            ),
+            "notesb": (
+                lambda: encode_notes_message(payload, NOTES_BLOB_ADDRESS),
+                decode_notes_message,
+            ),
+        }
+        for name, (encode, decode) in formats.items():
+            data = encode()
+            enc = best_us(encode)
+            dec = best_us(lambda: decode(data))
+            print(f"{size:>6} {name:<8} {len(data):>8} {len(data) / count:>7.1f} {enc:>10.1f} {dec:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
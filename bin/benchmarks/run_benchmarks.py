@@ -0,0 +1,313 @@
+"""
+Benchmark suite for the backend's own overhead.
+
+Micro benchmarks time the note/MIDI helpers in-process; end-to-end benchmarks
+start the API against the local stub LLM (stub_llm.py) and measure throughput
+and p50/p99 latency per endpoint. Results are written as JSON so runs on
+different commits can be compared.
+
+Usage:
+    python bin/benchmarks/run_benchmarks.py                      # writes bench_results/<commit>.json
+    python bin/benchmarks/run_benchmarks.py --skip-e2e
+    python bin/benchmarks/run_benchmarks.py --compare bench_results/<old>.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+BIN_ROOT = BENCH_DIR.parent
+PROJECT_ROOT = BIN_ROOT.parent
+sys.path.insert(0, str(BIN_ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+from bench_midi_export import make_notes  # noqa: E402
+
+
+# --- micro benchmarks ------------------------------------------------------------
+
+def _time_call(fn: Callable[[], Any]) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = timer.repeat(repeat=5, number=number)
+    per_call = [r / number for r in runs]
+    return {
+        "best_us": min(per_call) * 1e6,
+        "median_us": statistics.median(per_call) * 1e6,
+        "calls_per_run": number,
+    }
+
+
+def run_micro(size: int) -> Dict[str, Dict[str, float]]:
+    import main  # noqa: WPS433 - imported here so --skip-micro avoids the import cost
+
+    notes = make_notes(size)
+    text = main.notes_to_text(notes)  # type: ignore[arg-type]
+    seed = notes[:64]
+    seed_end = main._calculate_end_time(seed)  # type: ignore[arg-type]
+    chords = [
+        {"symbol": s, "start": float(i * 4), "duration": 4.0}
+        for i, s in enumerate(["Am", "F", "C", "G"])
+    ]
+
+    results: Dict[str, Dict[str, float]] = {}
+    results["text_to_notes"] = _time_call(lambda: main.text_to_notes(text))
+    results["notes_to_text"] = _time_call(lambda: main.notes_to_text(notes))  # type: ignore[arg-type]
+    results["build_prompt"] = _time_call(
+        lambda: main.build_completion_messages(
+            seed, "happy", 120.0, seed_end + 16.0, "step", 40.0, chords  # type: ignore[arg-type]
+        )
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "bench.mid"
+        results["midi_export"] = _time_call(
+            lambda: main.export_notes_to_midi(notes, 120.0, out)  # type: ignore[arg-type]
+        )
+        from midi_track_ctrl.midi_read import read_melody
+
+        results["midi_read"] = _time_call(lambda: read_melody(str(out)))
+
+    for entry in results.values():
+        entry["notes"] = size
+    return results
+
+
+# --- end-to-end benchmarks -----------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_http(url: str, timeout: float) -> None:
+    import httpx  # type: ignore
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def _latency_stats(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+
+    def pct(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "mean_ms": statistics.fmean(ordered) * 1000 if ordered else 0.0,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+    }
+
+
+async def _load(
+    requests: int,
+    concurrency: int,
+    call: Callable[[], Awaitable[Any]],
+) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                resp = await call()
+                resp.raise_for_status()
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return _latency_stats(latencies, errors, time.perf_counter() - start)
+
+
+async def _run_scenarios(base: str, requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    import httpx  # type: ignore
+
+    seed = make_notes(16)
+    complete_body = {
+        "original_notes": seed,
+        "mood": "happy",
+        "bpm": 120,
+        "length_value": 8,
+        "length_unit": "bar",
+        "adventureness": 40,
+    }
+    bridge_body = {"full_track": seed, "added_notes": seed[8:]}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60.0) as client:
+        scenarios: Dict[str, Callable[[], Awaitable[Any]]] = {
+            "complete": lambda: client.post("/complete", json={**complete_body, "bypass_cache": True}),
+            "complete_cached": lambda: client.post("/complete", json=complete_body),
+            "default": lambda: client.get("/default"),
+            "bridge_result": lambda: client.post("/bridge/result", json=bridge_body),
+            "bridge_latest": lambda: client.get("/bridge/latest"),
+        }
+        results = {}
+        for name, call in scenarios.items():
+            await call()  # warm-up (also primes the cache for complete_cached)
+            results[name] = await _load(requests, concurrency, call)
+        return results
+
+
+def run_e2e(requests: int, concurrency: int, llm_latency_ms: float) -> Dict[str, Any]:
+    stub_port = _free_port()
+    api_port = _free_port()
+    env = dict(os.environ)
+    env.update(
+        {
+            "OPENAI_API_BASE": f"http://127.0.0.1:{stub_port}/v1",
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_MODEL": "stub",
+            "DOTENV_OVERRIDE": "0",  # a root .env must not redirect the run to a real API
+            "BRIDGE_MODE": "off",  # leave UDP 7400 to a running dev backend
+        }
+    )
+    stub = subprocess.Popen(
+        [sys.executable, str(BENCH_DIR / "stub_llm.py"), "--port", str(stub_port), "--latency-ms", str(llm_latency_ms)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    api = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(api_port), "--log-level", "warning"],
+        cwd=BIN_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{api_port}"
+    try:
+        _wait_http(f"http://127.0.0.1:{stub_port}/docs", 30)
+        _wait_http(f"{base}/default", 60)
+        scenarios = asyncio.run(_run_scenarios(base, requests, concurrency))
+    finally:
+        for proc in (api, stub):
+            proc.terminate()
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "llm_latency_ms": llm_latency_ms,
+        "scenarios": scenarios,
+    }
+
+
+# --- reporting -----------------------------------------------------------------------
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _flatten(results: Dict[str, Any]) -> Dict[str, float]:
+    flat: Dict[str, float] = {}
+    for name, entry in results.get("micro", {}).items():
+        flat[f"micro.{name}.best_us"] = entry["best_us"]
+    for name, entry in results.get("e2e", {}).get("scenarios", {}).items():
+        for metric in ("throughput_rps", "p50_ms", "p99_ms"):
+            flat[f"e2e.{name}.{metric}"] = entry[metric]
+    return flat
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    print(f"\nCompared with {old['meta']['commit']} ({old['meta']['timestamp']}):")
+    print(f"{'metric':<40} {'old':>12} {'new':>12} {'change':>9}")
+    for key in sorted(set(old_flat) & set(new_flat)):
+        before, after = old_flat[key], new_flat[key]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{key:<40} {before:>12.2f} {after:>12.2f} {change:>+8.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Melody Copilot benchmark suite")
+    parser.add_argument("--output", default=None, help="JSON output path (default: bench_results/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    parser.add_argument("--micro-notes", type=int, default=1000, help="Note count for micro benchmarks")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per end-to-end scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Stub LLM delay per completion")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--skip-e2e", action="store_true")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        }
+    }
+
+    if not args.skip_micro:
+        results["micro"] = run_micro(args.micro_notes)
+        for name, entry in results["micro"].items():
+            print(f"{name:<16} best {entry['best_us']:>10.1f} us   median {entry['median_us']:>10.1f} us")
+
+    if not args.skip_e2e:
+        results["e2e"] = run_e2e(args.requests, args.concurrency, args.llm_latency_ms)
+        for name, entry in results["e2e"]["scenarios"].items():
+            print(
+                f"{name:<16} {entry['throughput_rps']:>8.1f} req/s   p50 {entry['p50_ms']:>7.2f} ms"
+                f"   p99 {entry['p99_ms']:>7.2f} ms   errors {entry['errors']}"
+            )
+
+    output = Path(args.output) if args.output else PROJECT_ROOT / "bench_results" / f"{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as fh:
+            compare(json.load(fh), results)
+
+
+if __name__ == "__main__":
+    main()
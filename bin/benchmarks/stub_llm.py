@@ -0,0 +1,134 @@
+"""
+Local OpenAI-compatible stub server for benchmarks.
+
+Serves POST /v1/chat/completions (plain and stream=true) with canned or
+synthesized "PITCH START DURATION" text after a configurable delay, so the
+backend's own overhead can be measured without OpenAI latency.
+
+Usage:
+    python bin/benchmarks/stub_llm.py --port 8099 --latency-ms 200
+    OPENAI_API_BASE=http://127.0.0.1:8099/v1 OPENAI_API_KEY=stub uvicorn main:app --app-dir bin
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn  # type: ignore
+from fastapi import FastAPI, Request  # type: ignore
+from fastapi.responses import StreamingResponse  # type: ignore
+
+_END_RE = re.compile(r"current melody ends at ([0-9.]+) quarterLength")
+_TARGET_RE = re.compile(r"TOTAL target length \(including seed\) = ([0-9.]+) quarterLength")
+_SCALE = ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5"]
+
+
+def synthesize_notes(prompt: str, step: float = 0.5) -> str:
+    """Fill the span the prompt asks for with a simple scale run."""
+    end_match = _END_RE.search(prompt)
+    target_match = _TARGET_RE.search(prompt)
+    start = float(end_match.group(1)) if end_match else 0.0
+    target = float(target_match.group(1)) if target_match else start + 4.0
+    lines: List[str] = []
+    pos = start
+    i = 0
+    while pos + 1e-9 < target:
+        dur = min(step, target - pos)
+        lines.append(f"{_SCALE[i % len(_SCALE)]} {round(pos, 6)} {round(dur, 6)}")
+        pos += dur
+        i += 1
+    return "\n".join(lines) or "C4 0.0 1.0"
+
+
+def create_app(latency_ms: float = 0.0, line_ms: float = 0.0, canned: Optional[str] = None) -> FastAPI:
+    app = FastAPI(title="Stub LLM")
+
+    def completion_text(body: Dict[str, Any]) -> str:
+        if canned is not None:
+            return canned
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        return synthesize_notes(prompt)
+
+    def usage(body: Dict[str, Any], text: str) -> Dict[str, int]:
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        prompt_tokens = prompt_chars // 4
+        completion_tokens = len(text) // 4
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        body = await request.json()
+        text = completion_text(body)
+        model = body.get("model", "stub")
+        created = int(time.time())
+        await asyncio.sleep(latency_ms / 1000.0)
+
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage(body, text),
+            }
+
+        async def chunks() -> AsyncIterator[str]:
+            for line in text.splitlines(keepends=True):
+                chunk = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": line}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if line_ms:
+                    await asyncio.sleep(line_ms / 1000.0)
+            final = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay before the first token")
+    parser.add_argument("--line-ms", type=float, default=0.0, help="Delay between streamed lines")
+    parser.add_argument("--canned", default=None, help="File whose content is returned verbatim")
+    args = parser.parse_args()
+
+    canned = None
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as fh:
+            canned = fh.read()
+    app = create_app(args.latency_ms, args.line_ms, canned)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
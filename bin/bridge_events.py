@@ -0,0 +1,59 @@
+"""
+Versioned change notification for the bridge result.
+
+Every change to the stored Max captures bumps a monotonic version and wakes
+all waiters at once: long-poll requests (`wait`) and SSE / WebSocket
+subscribers (`subscribe`). Must be driven from the event loop thread.
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional, Set
+
+
+class VersionedBroadcast:
+    def __init__(self) -> None:
+        self.version = 0
+        self._waiters: Set["asyncio.Future[int]"] = set()
+        self._subscribers: Set["asyncio.Queue[int]"] = set()
+
+    def publish(self, version: Optional[int] = None) -> int:
+        """Bump the version (or move it to `version`, e.g. the store's) and wake everyone."""
+        self.version = max(self.version + 1 if version is None else version, self.version)
+        for fut in self._waiters:
+            if not fut.done():
+                fut.set_result(self.version)
+        self._waiters.clear()
+        for queue in self._subscribers:
+            if queue.full():  # slow consumer: only the newest version matters
+                queue.get_nowait()
+            queue.put_nowait(self.version)
+        return self.version
+
+    async def wait(self, since: int, timeout: float) -> int:
+        """Return once version > since, or the unchanged version after `timeout` seconds."""
+        if self.version > since or timeout <= 0:
+            return self.version
+        fut: "asyncio.Future[int]" = asyncio.get_running_loop().create_future()
+        self._waiters.add(fut)
+        try:
+            return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            return self.version
+        finally:
+            self._waiters.discard(fut)
+
+    async def subscribe(self, keepalive: float) -> AsyncIterator[Optional[int]]:
+        """Yield every new version; yields None after `keepalive` seconds of silence."""
+        queue: "asyncio.Queue[int]" = asyncio.Queue(maxsize=1)
+        self._subscribers.add(queue)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._subscribers.discard(queue)
+
+    def listeners(self) -> int:
+        return len(self._waiters) + len(self._subscribers)
@@ -0,0 +1,272 @@
+"""
+Bridge state (pending capture + latest Max result) keyed by session / track id.
+
+Every write takes the next value of one store-wide monotonic version, so a
+session's version only grows and `since` long-polls keep working whichever
+session they watch. Sessions expire after `ttl` seconds without a write and
+the store is bounded by session count and by the total size of the stored
+results; the least recently written sessions go first.
+
+Two backends:
+- MemoryBridgeStore: a dict in this process (one uvicorn worker).
+- SqliteBridgeStore: one SQLite file in WAL mode shared by every worker on the
+  host. Versions are assigned inside the write transaction, so a result stored
+  through one worker is what /bridge/latest returns on any other; workers
+  notice each other's writes by polling `last_version()` (one indexed read).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+DEFAULT_SESSION = "default"
+
+
+class BridgeRecord(NamedTuple):
+    session: str
+    version: int
+    listening: bool
+    listen_start_time: Optional[float]
+    timestamp: Optional[float]  # when the result was stored
+    result: Optional[Dict[str, Any]]
+
+
+class MemoryBridgeStore:
+    shared = False
+
+    def __init__(self, ttl: float = 3600.0, max_sessions: int = 256, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._records: "OrderedDict[str, Tuple[float, int, BridgeRecord]]" = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session: str) -> Optional[BridgeRecord]:
+        with self._lock:
+            entry = self._records.get(session)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.ttl:
+                self._drop(session)
+                return None
+            return entry[2]
+
+    def start_capture(self, session: str) -> int:
+        """Mark `session` as waiting for a capture and clear its previous result."""
+        now = time.time()
+        return self._write(session, lambda v: BridgeRecord(session, v, True, now, None, None), 0)
+
+    def store_result(self, session: str, result: Dict[str, Any]) -> int:
+        now = time.time()
+        size = len(json.dumps(result, separators=(",", ":")))
+        return self._write(session, lambda v: BridgeRecord(session, v, False, None, now, result), size)
+
+    def _write(self, session: str, build: Callable[[int], BridgeRecord], size: int) -> int:
+        with self._lock:
+            self._version += 1
+            if session in self._records:
+                self._drop(session)
+            self._records[session] = (time.time(), size, build(self._version))
+            self._bytes += size
+            self._evict()
+            return self._version
+
+    def _drop(self, session: str) -> None:
+        _, size, _ = self._records.pop(session)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        now = time.time()
+        while len(self._records) > 1:  # the entry just written is last and always stays
+            session, (written, _, _) = next(iter(self._records.items()))
+            over = len(self._records) > self.max_sessions or self._bytes > self.max_bytes
+            if not over and now - written <= self.ttl:
+                break
+            self._drop(session)
+            self.evicted += 1
+
+    def last_version(self) -> int:
+        return self._version
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._records),
+                "max_sessions": self.max_sessions,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "version": self._version,
+                "evicted": self.evicted,
+            }
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bridge_meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO bridge_meta (key, value) VALUES ('version', 0);
+CREATE TABLE IF NOT EXISTS bridge_sessions (
+    session TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    listening INTEGER NOT NULL,
+    listen_start_time REAL,
+    timestamp REAL,
+    result TEXT,
+    size INTEGER NOT NULL,
+    written_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bridge_sessions_written ON bridge_sessions (written_at);
+"""
+
+
+class SqliteBridgeStore:
+    shared = True
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: float = 3600.0,
+        max_sessions: int = 256,
+        max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """The process's one connection (shared by worker threads); reopened after close(). Hold the lock."""
+        if self._conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # WAL: durable at checkpoints, never corrupt
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, session: str) -> Optional[BridgeRecord]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT version, listening, listen_start_time, timestamp, result FROM bridge_sessions "
+                "WHERE session = ? AND written_at >= ?",
+                (session, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        version, listening, listen_start_time, timestamp, result = row
+        return BridgeRecord(
+            session, version, bool(listening), listen_start_time, timestamp,
+            json.loads(result) if result is not None else None,
+        )
+
+    def start_capture(self, session: str) -> int:
+        return self._write(session, True, time.time(), None, None)
+
+    def store_result(self, session: str, result: Dict[str, Any]) -> int:
+        return self._write(session, False, None, time.time(), json.dumps(result, separators=(",", ":")))
+
+    def _write(
+        self,
+        session: str,
+        listening: bool,
+        listen_start_time: Optional[float],
+        timestamp: Optional[float],
+        result: Optional[str],
+    ) -> int:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")  # take the write lock before reading the version
+            try:
+                conn.execute("UPDATE bridge_meta SET value = value + 1 WHERE key = 'version'")
+                (version,) = conn.execute("SELECT value FROM bridge_meta WHERE key = 'version'").fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO bridge_sessions "
+                    "(session, version, listening, listen_start_time, timestamp, result, size, written_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session, version, int(listening), listen_start_time, timestamp, result,
+                     len(result) if result is not None else 0, now),
+                )
+                self._evict(conn, session, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def _evict(self, conn: sqlite3.Connection, keep: str, now: float) -> None:
+        conn.execute("DELETE FROM bridge_sessions WHERE written_at < ? AND session != ?", (now - self.ttl, keep))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM bridge_sessions").fetchone()
+        if count <= self.max_sessions and total <= self.max_bytes:
+            return
+        # oldest first, until both bounds hold again
+        for session, size in conn.execute(
+            "SELECT session, size FROM bridge_sessions WHERE session != ? ORDER BY written_at", (keep,)
+        ).fetchall():
+            if count <= self.max_sessions and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM bridge_sessions WHERE session = ?", (session,))
+            count -= 1
+            total -= size
+
+    def last_version(self) -> int:
+        with self._lock:
+            (version,) = self._connect().execute("SELECT value FROM bridge_meta WHERE key = 'version'").fetchone()
+        return version
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            conn = self._connect()
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM bridge_sessions WHERE written_at >= ?",
+                (time.time() - self.ttl,),
+            ).fetchone()
+            (version,) = conn.execute("SELECT value FROM bridge_meta WHERE key = 'version'").fetchone()
+        return {
+            "backend": "sqlite",
+            "path": str(self.path),
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "version": version,
+        }
+
+
+def open_bridge_store(
+    backend: str,
+    path: Optional[Path] = None,
+    ttl: float = 3600.0,
+    max_sessions: int = 256,
+    max_bytes: int = 16 * 1024 * 1024,
+) -> Any:
+    """`memory` or `sqlite` (needs `path`); raises ValueError for anything else."""
+    if backend == "memory":
+        return MemoryBridgeStore(ttl, max_sessions, max_bytes)
+    if backend == "sqlite":
+        if path is None:
+            raise ValueError("The sqlite bridge store needs a path")
+        return SqliteBridgeStore(path, ttl, max_sessions, max_bytes)
+    raise ValueError(f"Unknown bridge store '{backend}', expected 'memory' or 'sqlite'")
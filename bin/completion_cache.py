@@ -0,0 +1,185 @@
+"""
+Completion result cache: in-memory LRU with TTL plus an optional on-disk tier.
+
+Keys are canonical hashes of the request (sorted notes, chords, parameters),
+so UI reloads and bridge retries that resend the same seed skip the LLM.
+The disk tier is bounded by file count and total size: every write sweeps
+out expired files, then the oldest ones until both bounds hold again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def canonical_key(
+    notes: List[Dict[str, Any]],
+    chords: Optional[List[Dict[str, Any]]],
+    params: Dict[str, Any],
+) -> str:
+    """Hash a request; callers pass notes already ordered (see main._sorted_notes)."""
+    ordered_chords = sorted(chords or [], key=lambda c: (float(c["start"]), c["symbol"]))
+    body = {
+        "notes": [[n["pitch"], float(n["start"]), float(n["duration"])] for n in notes],
+        "chords": [[c["symbol"], float(c["start"]), float(c["duration"])] for c in ordered_chords],
+        "params": params,
+    }
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 3600.0,
+        disk_dir: Optional[Path] = None,
+        disk_max_entries: int = 4096,
+        disk_max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # disk tier as of the last sweep (other workers may write to the same directory)
+        self.disk_entries = 0
+        self.disk_bytes = 0
+        self.disk_evicted = 0
+        if disk_dir is not None:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            self._sweep_disk()
+
+    def _disk_path(self, key: str) -> Path:
+        assert self.disk_dir is not None
+        return self.disk_dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Any]]:
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                record = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        stored_at = float(record.get("stored_at", 0.0))
+        if time.time() - stored_at > self.ttl:
+            path.unlink(missing_ok=True)
+            return None
+        return stored_at, record.get("value")
+
+    def _write_disk(self, key: str, stored_at: float, value: Any) -> None:
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"stored_at": stored_at, "value": value}, fh)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # disk tier is best-effort
+        self._sweep_disk()
+
+    def _sweep_disk(self) -> None:
+        """Delete expired files, then the oldest written until both disk bounds hold."""
+        assert self.disk_dir is not None
+        now = time.time()
+        with self._disk_lock:
+            files: List[Tuple[float, int, str]] = []
+            try:
+                entries = list(os.scandir(self.disk_dir))
+            except OSError:
+                return
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue  # removed meanwhile
+                if now - st.st_mtime > self.ttl:
+                    Path(entry.path).unlink(missing_ok=True)
+                    continue
+                files.append((st.st_mtime, st.st_size, entry.path))
+            files.sort()
+            count, total = len(files), sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if count <= self.disk_max_entries and total <= self.disk_max_bytes:
+                    break
+                Path(path).unlink(missing_ok=True)
+                count -= 1
+                total -= size
+                self.disk_evicted += 1
+            self.disk_entries, self.disk_bytes = count, total
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        record = self._read_disk(key)
+        with self._lock:
+            if record is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, record)
+        return record[1]
+
+    def set(self, key: str, value: Any) -> None:
+        stored_at = time.time()
+        with self._lock:
+            self._store(key, (stored_at, value))
+        self._write_disk(key, stored_at, value)
+
+    def _store(self, key: str, entry: Tuple[float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir is not None:
+            for path in self.disk_dir.glob("*.json"):
+                path.unlink(missing_ok=True)
+            self._sweep_disk()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk_tier": str(self.disk_dir) if self.disk_dir else None,
+                "disk_entries": self.disk_entries,
+                "disk_bytes": self.disk_bytes,
+                "disk_max_entries": self.disk_max_entries,
+                "disk_max_bytes": self.disk_max_bytes,
+                "disk_evicted": self.disk_evicted,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,125 @@
+"""
+Validation and repair of model continuations.
+
+The model does not always follow the rules: it repeats seed notes, starts
+before the seed ends, overshoots the target or stops short. Instead of
+resending the whole request, the output is fixed locally (dedupe against the
+seed, snap to the seed's rhythmic grid, clip at the target end) and, when it
+still falls short, only the missing span is asked for again with the last
+notes as context, within a bounded number of retries.
+
+The grid only removes timing noise: it is the seed's finest subdivision and
+never coarser than a sixteenth, so faster rhythms than the seed's survive, and
+two notes that snapping would put on the same onset keep only the first.
+"""
+
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from midi_track_ctrl.note_seq import NoteSeq
+from midi_track_ctrl.smf import pitch_to_midi
+
+_EPS = 1e-6
+# coarsest first, starting at a sixteenth: the grid is the largest of these all
+# seed times are multiples of (a quarter-note seed still gets 0.25, not 1.0)
+GRID_CANDIDATES = (0.25, 1 / 6, 0.125, 1 / 12, 0.0625)
+
+
+def _on_grid(value: float, grid: float) -> bool:
+    return abs(value / grid - round(value / grid)) < 1e-3
+
+
+def seed_grid(seed: NoteSeq) -> float:
+    """Largest subdivision (at most 0.25) that every seed start and duration falls on."""
+    values = list(seed.start) + list(seed.duration)
+    for grid in GRID_CANDIDATES:
+        if all(_on_grid(v, grid) for v in values):
+            return grid
+    return GRID_CANDIDATES[-1]
+
+
+def snap(value: float, grid: float) -> float:
+    # halves round up (round() would send 8.125 and 8.375 to different sides)
+    return round(math.floor(value / grid + 0.5) * grid, 6)
+
+
+class CompletionRepair:
+    """Accumulates repaired notes for one request and decides whether a follow-up is needed."""
+
+    def __init__(self, seed: NoteSeq, end_time: float, target_end: float, max_retries: int = 2) -> None:
+        self.grid = seed_grid(seed) if len(seed) else GRID_CANDIDATES[-1]
+        self.end_time = end_time
+        self.target_end = target_end
+        self.max_retries = max_retries
+        self.retries = 0
+        self.notes: List[Dict[str, Any]] = []
+        self.stats: "Counter[str]" = Counter()
+        self._seen: Set[Tuple[int, float]] = {
+            (pitch, round(start, 6)) for pitch, start in zip(seed.pitch, seed.start)
+        }
+        # snapped onset -> the original onset of the note accepted there
+        self._onsets: Dict[float, float] = {}
+
+    def current_end(self) -> float:
+        return max((n["start"] + n["duration"] for n in self.notes), default=self.end_time)
+
+    def accept(self, notes: List[Dict[str, Any]], start_at: Optional[float] = None) -> None:
+        """Repair `notes` and add the ones that belong between `start_at` and the target end."""
+        start_at = self.end_time if start_at is None else start_at
+        grid = self.grid
+        for note in sorted(notes, key=lambda n: (n["start"], str(n["pitch"]))):
+            try:
+                midi = pitch_to_midi(note["pitch"])
+            except (ValueError, KeyError):
+                self.stats["invalid"] += 1
+                continue
+            start = snap(note["start"], grid)
+            duration = max(snap(note["duration"], grid), grid)
+            if start != note["start"] or duration != note["duration"]:
+                self.stats["snapped"] += 1
+            key = (midi, start)
+            if key in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            if start < start_at - _EPS or start >= self.target_end - _EPS:
+                self.stats["out_of_span"] += 1
+                continue
+            original = self._onsets.setdefault(start, note["start"])
+            if abs(original - note["start"]) > _EPS:
+                # only snapping made these simultaneous: keep the first, don't stack a chord
+                self.stats["collisions"] += 1
+                continue
+            self._seen.add(key)
+            if start + duration > self.target_end + _EPS:
+                duration = round(self.target_end - start, 6)
+                self.stats["clipped"] += 1
+            self.notes.append({"pitch": note["pitch"], "start": start, "duration": duration})
+        self.notes.sort(key=lambda n: (n["start"], pitch_to_midi(n["pitch"])))
+
+    def next_span(self) -> Optional[Tuple[float, float]]:
+        """The (start, end) still missing, or None when complete or out of retries."""
+        end = self.current_end()
+        missing = self.target_end - end
+        if missing <= _EPS:
+            return None
+        if missing < self.grid - _EPS and self.notes:
+            # less than one grid step short: stretch the last note instead of asking again
+            last = max(self.notes, key=lambda n: n["start"] + n["duration"])
+            last["duration"] = round(self.target_end - last["start"], 6)
+            self.stats["extended"] += 1
+            return None
+        if self.retries >= self.max_retries:
+            self.stats["short"] += 1
+            return None
+        self.retries += 1
+        return end, self.target_end
+
+    def context(self, original_notes: List[Dict[str, Any]], count: int = 16) -> List[Dict[str, Any]]:
+        """The last `count` notes of seed + repaired continuation, for a follow-up prompt."""
+        return (list(original_notes) + self.notes)[-count:]
+
+    def summary(self) -> str:
+        fixes = ", ".join(f"{k} {v}" for k, v in sorted(self.stats.items()) if v)
+        text = f"{len(self.notes)} notes, {self.retries} follow-ups, grid {self.grid:g}"
+        return f"{text} ({fixes})" if fixes else text
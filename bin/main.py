@@ -1,34 +1,113 @@
 import sys
+import time
 from pathlib import Path as PathlibPath
 
+_IMPORT_STARTED = time.perf_counter()  # startup timing: module import begins here
+
 # Add parent directory to path to find midi_track_ctrl module
 sys.path.insert(0, str(PathlibPath(__file__).resolve().parent.parent))
 
 import os
 import json
 import socket
+import asyncio
+import hashlib
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, TypedDict
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Literal, Optional, Tuple, TypedDict
 from datetime import datetime
 
+import httpx #type: ignore
 from dotenv import load_dotenv #type: ignore
-from fastapi import FastAPI, HTTPException #type: ignore
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect #type: ignore
 from fastapi.middleware.cors import CORSMiddleware #type: ignore
-from langchain_core.messages import HumanMessage, SystemMessage #type: ignore
-from langchain_openai import ChatOpenAI #type: ignore
-from pydantic import BaseModel, Field #type: ignore
-
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse #type: ignore
+from pydantic import BaseModel, Field, ValidationError, model_validator #type: ignore
+
+from bridge_events import VersionedBroadcast # type: ignore
+from bridge_store import DEFAULT_SESSION, BridgeRecord, open_bridge_store # type: ignore
+from completion_cache import CompletionCache, canonical_key # type: ignore
+from completion_repair import CompletionRepair # type: ignore
+from markov_generator import continue_melody as markov_continue_melody # type: ignore
+from metrics import TOKEN_BUCKETS, MetricsMiddleware, Registry, sample # type: ignore
+from prompt_codec import CHORD_LEGEND, MELODY_LEGEND, encode_seed, estimate_tokens # type: ignore
+from singleflight import AsyncSingleFlight, SingleFlight # type: ignore
+from udp_bridge import BridgeProtocol, start_bridge_listener # type: ignore
+from midi_track_ctrl.event_log import LEVELS, get_event_log, get_logger, parse_level # type: ignore
+from midi_track_ctrl.datagram import UDP_MAX_DATAGRAM, build_osc_message, datagrams_for, osc_json_datagrams, send_all # type: ignore
 from midi_track_ctrl.midi_make import write_melody #type: ignore
-from midi_track_ctrl.midi_read import read_melody # type: ignore
-from music21 import chord as m21chord, stream as m21stream, tempo as m21tempo, note as m21note #type: ignore
+from midi_track_ctrl.midi_read import cached_read_melody, file_stamp # type: ignore
+from midi_track_ctrl.note_seq import NoteSeq # type: ignore
+from midi_track_ctrl.note_wire import encode_notes_message # type: ignore
+from midi_track_ctrl.smf import encode_smf, midi_to_pitch, note_events, pitch_to_midi, use_music21, write_smf # type: ignore
+from midi_track_ctrl.udp_sender import UdpSender # type: ignore
+
+if TYPE_CHECKING:
+    # langchain_openai takes about half a second to import: it is loaded on first
+    # use, or by the background preload the lifespan starts (see _preload_llm)
+    from langchain_core.messages import BaseMessage #type: ignore
+    from langchain_openai import ChatOpenAI #type: ignore
 
 
 PROJECT_ROOT = Path(__file__).resolve().parent
 ROOT_DIR = PROJECT_ROOT.parent
-load_dotenv(ROOT_DIR / ".env", override=True)
+load_dotenv(ROOT_DIR / ".env", override=os.getenv("DOTENV_OVERRIDE", "1") != "0")
 
 MAX_UDP_HOST = os.getenv("MAX_UDP_HOST", "127.0.0.1")
 MAX_UDP_PORT = int(os.getenv("MAX_UDP_PORT", "7401"))
+# Max -> backend UDP listener: "inprocess" (asyncio, started with the app),
+# "external" (standalone bridge script) or "off"
+BRIDGE_MODE = os.getenv("BRIDGE_MODE", "inprocess").lower()
+BRIDGE_UDP_HOST = os.getenv("BRIDGE_UDP_HOST", "127.0.0.1")
+BRIDGE_UDP_PORT = int(os.getenv("BRIDGE_UDP_PORT", "7400"))
+# Completions from Max generated at once; more are answered with "busy"
+BRIDGE_UDP_MAX_CONCURRENT = max(1, int(os.getenv("BRIDGE_UDP_MAX_CONCURRENT", "8")))
+
+# Shared LLM HTTP pool (one per worker process, created in the app lifespan)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "200"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "50"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+
+# Generator backend: "llm" (default) or "markov" (offline, CPU only)
+GENERATOR_BACKEND = os.getenv("GENERATOR_BACKEND", "llm").lower()
+# Set LLM_FALLBACK=markov to answer from the local engine when the LLM fails;
+# LLM_FALLBACK_AFTER (seconds) additionally bounds how long the LLM may take
+LLM_FALLBACK = os.getenv("LLM_FALLBACK", "").lower()
+_fallback_after_env = os.getenv("LLM_FALLBACK_AFTER")
+LLM_FALLBACK_AFTER: Optional[float] = float(_fallback_after_env) if _fallback_after_env else None
+
+# /complete/batch limits
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "16"))
+
+# Seed encoding in the completion prompt: "compact" (token-budgeted) or "text" (one line per note)
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "compact").lower()
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+PROMPT_MIN_BARS = int(os.getenv("PROMPT_MIN_BARS", "2"))
+
+# Model output repair: follow-up requests for a missing tail (0 = local fixes only)
+# and how many preceding notes such a follow-up sees as context
+REPAIR_RETRIES = int(os.getenv("REPAIR_RETRIES", "2"))
+REPAIR_CONTEXT_NOTES = int(os.getenv("REPAIR_CONTEXT_NOTES", "16"))
+
+# Bridge push channel: longest accepted long-poll wait and SSE/WS keepalive (seconds)
+BRIDGE_LONGPOLL_MAX = float(os.getenv("BRIDGE_LONGPOLL_MAX", "60"))
+BRIDGE_KEEPALIVE = float(os.getenv("BRIDGE_KEEPALIVE", "15"))
+
+# Bridge state per session/track: "memory" (this worker only) or "sqlite" (one WAL
+# file shared by all workers on the host; required for more than one worker).
+# Sessions expire after BRIDGE_STORE_TTL seconds; BRIDGE_STORE_POLL is how often a
+# worker checks the shared store for results stored through another worker.
+BRIDGE_STORE = os.getenv("BRIDGE_STORE", "memory").lower()
+BRIDGE_STORE_PATH = Path(os.getenv("BRIDGE_STORE_PATH", str(Path(tempfile.gettempdir()) / "melody_bridge_state.sqlite3")))
+if not BRIDGE_STORE_PATH.is_absolute():
+    BRIDGE_STORE_PATH = PROJECT_ROOT / BRIDGE_STORE_PATH
+BRIDGE_STORE_TTL = float(os.getenv("BRIDGE_STORE_TTL", "3600"))
+BRIDGE_STORE_MAX_SESSIONS = int(os.getenv("BRIDGE_STORE_MAX_SESSIONS", "256"))
+BRIDGE_STORE_MAX_BYTES = int(os.getenv("BRIDGE_STORE_MAX_BYTES", str(16 * 1024 * 1024)))
+BRIDGE_STORE_POLL = float(os.getenv("BRIDGE_STORE_POLL", "0.1"))
 
 _default_midi_env = os.getenv("DEFAULT_MIDI_PATH", PROJECT_ROOT / "default.mid")
 DEFAULT_MIDI_PATH = Path(_default_midi_env)
@@ -37,6 +116,16 @@ if not DEFAULT_MIDI_PATH.is_absolute():
 
 DEFAULT_CHORDS_PATH = PROJECT_ROOT / "default_chords.mid"
 
+COMPLETION_CACHE_SIZE = int(os.getenv("COMPLETION_CACHE_SIZE", "256"))
+COMPLETION_CACHE_TTL = float(os.getenv("COMPLETION_CACHE_TTL", "3600"))
+_cache_dir_env = os.getenv("COMPLETION_CACHE_DIR")
+COMPLETION_CACHE_DIR: Optional[Path] = Path(_cache_dir_env) if _cache_dir_env else None
+if COMPLETION_CACHE_DIR is not None and not COMPLETION_CACHE_DIR.is_absolute():
+    COMPLETION_CACHE_DIR = PROJECT_ROOT / COMPLETION_CACHE_DIR
+# Bounds of the on-disk tier (files / total bytes); oldest files are pruned first
+COMPLETION_CACHE_DISK_MAX_ENTRIES = int(os.getenv("COMPLETION_CACHE_DISK_MAX_ENTRIES", "4096"))
+COMPLETION_CACHE_DISK_MAX_BYTES = int(os.getenv("COMPLETION_CACHE_DISK_MAX_BYTES", str(64 * 1024 * 1024)))
+
 
 SYSTEM_PROMPT = """
 You are a music composition assistant.
@@ -58,6 +147,46 @@ Rules:
 10) Reuse and develop rhythmic motifs from the seed (exact or slightly varied), keeping the same note density and subdivision palette.
 """
 
+# Part of the cache key so cached results are dropped when the prompt changes
+PROMPT_VERSION = hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+completion_cache = CompletionCache(
+    max_entries=COMPLETION_CACHE_SIZE,
+    ttl=COMPLETION_CACHE_TTL,
+    disk_dir=COMPLETION_CACHE_DIR,
+    disk_max_entries=COMPLETION_CACHE_DISK_MAX_ENTRIES,
+    disk_max_bytes=COMPLETION_CACHE_DISK_MAX_BYTES,
+)
+# Identical requests already being generated share one LLM call
+inflight_completions = AsyncSingleFlight()
+inflight_completions_sync = SingleFlight()
+
+# Structured, leveled events; the recent ones are kept for GET /debug/events
+event_log = get_event_log()
+log = get_logger("backend")
+bridge_log = get_logger("bridge")
+
+# Prometheus metrics for GET /metrics (per worker process)
+metrics = Registry()
+stage_seconds = metrics.histogram(
+    "melody_stage_seconds",
+    "Latency of completion and MIDI pipeline stages",
+    ["stage"],
+)
+http_request_seconds = metrics.histogram(
+    "melody_http_request_seconds",
+    "HTTP request latency by route (long-polls and streams included)",
+    ["method", "route"],
+)
+http_requests_inflight = metrics.gauge("melody_http_requests_inflight", "HTTP requests being handled")
+llm_tokens = metrics.counter("melody_llm_tokens_total", "LLM tokens reported by the API", ["type"])
+prompt_tokens_estimate = metrics.histogram(
+    "melody_prompt_estimated_tokens",
+    "Estimated completion prompt size",
+    buckets=TOKEN_BUCKETS,
+)
+completions_total = metrics.counter("melody_completions_total", "Finished completions", ["generator"])
+
 
 class NoteDict(TypedDict):
     pitch: str
@@ -91,12 +220,45 @@ class CompleteRequest(BaseModel):
     length_unit: Literal["bar", "step", "ms"]
     adventureness: float = Field(..., ge=0, le=100)
     chords: Optional[List["ChordPayload"]] = None
+    bypass_cache: bool = False  # skip the cache lookup; the fresh result still refreshes it
+    generator: Optional[Literal["llm", "markov"]] = None  # default: GENERATOR_BACKEND
+    draft: bool = False  # streaming only: send an instant local draft before the LLM notes
 
 
 class CompleteResponse(BaseModel):
     full_track: List[NotePayload]
     added_notes: List[NotePayload]
     midi_file: Optional[str] = None
+    generator: Optional[str] = None
+
+
+class CompleteBatchRequest(BaseModel):
+    """Either one request plus a variation count, or an explicit list of requests."""
+    request: Optional[CompleteRequest] = None
+    variations: int = Field(1, ge=1)
+    requests: Optional[List[CompleteRequest]] = None
+
+    @model_validator(mode="after")
+    def _check_shape(self) -> "CompleteBatchRequest":
+        if (self.request is None) == (self.requests is None):
+            raise ValueError("Provide exactly one of 'request' or 'requests'.")
+        size = len(self.requests) if self.requests is not None else self.variations
+        if size < 1 or size > BATCH_MAX_ITEMS:
+            raise ValueError(f"Batch size must be between 1 and {BATCH_MAX_ITEMS}.")
+        return self
+
+
+class CompleteBatchItem(BaseModel):
+    index: int
+    variation: int = 0
+    result: Optional[CompleteResponse] = None
+    error: Optional[str] = None
+
+
+class CompleteBatchResponse(BaseModel):
+    results: List[CompleteBatchItem]
+    succeeded: int
+    failed: int
 
 
 class DefaultSeedResponse(BaseModel):
@@ -119,6 +281,7 @@ class BridgeLatestResponse(BaseModel):
     full_track: List[NotePayload]
     timestamp: Optional[str] = None
     has_data: bool = False
+    version: int = 0
 
 
 class MaxNotifyRequest(BaseModel):
@@ -130,87 +293,164 @@ def _sorted_notes(notes: List[NoteDict]) -> List[NoteDict]:
     return sorted(notes, key=lambda n: (n["start"], n["pitch"]))
 
 
-def send_udp_to_max(message: Dict[str, Any]) -> None:
-    """Send a UDP packet to Max for Live (default: 127.0.0.1:7401)."""
-    data = json.dumps(message).encode("utf-8")
+# Persistent sender to Max (one socket + sender thread), set by the lifespan;
+# None outside the server, where each call opens a one-off socket
+_max_sender: Optional[UdpSender] = None
+
+
+class MaxQueueFull(RuntimeError):
+    """The sender queue to Max is full; nothing of the message was queued."""
+
+
+def _send_to_max(datagrams: List[bytes], osc: bool) -> None:
+    """Queue on the persistent sender (all datagrams or none), else send now on a one-off socket."""
+    if _max_sender is not None:
+        if not _max_sender.send_many(datagrams, osc=osc):
+            raise MaxQueueFull(f"UDP send queue to Max at {MAX_UDP_HOST}:{MAX_UDP_PORT} is full")
+        return
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.sendto(data, (MAX_UDP_HOST, MAX_UDP_PORT))
+            send_all(sock, datagrams, (MAX_UDP_HOST, MAX_UDP_PORT))
     except Exception as exc:  # pragma: no cover - networking
         raise RuntimeError(f"Failed to send UDP to Max at {MAX_UDP_HOST}:{MAX_UDP_PORT}: {exc}") from exc
 
 
-def _pad4(data: bytes) -> bytes:
-    pad = (4 - (len(data) % 4)) % 4
-    return data + (b"\0" * pad)
-
+def send_udp_to_max(message: Dict[str, Any]) -> None:
+    """Send a UDP packet to Max for Live (default: 127.0.0.1:7401)."""
+    text = json.dumps(message)
+    _send_to_max(datagrams_for(text, text.encode("utf-8")), osc=False)
 
-def build_osc_message(address: str, string_arg: str) -> bytes:
-    """Build a minimal OSC packet: address + ",s" type tag + one string argument."""
-    if not address.startswith("/"):
-        address = "/" + address
-    addr = _pad4(address.encode("utf-8") + b"\0")
-    tags = _pad4(b",s\0")
-    arg = _pad4(string_arg.encode("utf-8") + b"\0")
-    return addr + tags + arg
 
+def send_osc_json_to_max(*messages: Dict[str, Any]) -> None:
+    """Send JSON to Max as OSC (/json, <string>) to satisfy udpreceive expectations.
 
-def send_osc_json_to_max(message: Dict[str, Any]) -> None:
-    """Send JSON to Max as OSC (/json, <string>) to satisfy udpreceive expectations."""
-    payload = json.dumps(message)
-    packet = build_osc_message("/json", payload)
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.sendto(packet, (MAX_UDP_HOST, MAX_UDP_PORT))
-    except Exception as exc:  # pragma: no cover - networking
-        raise RuntimeError(f"Failed to send OSC to Max at {MAX_UDP_HOST}:{MAX_UDP_PORT}: {exc}") from exc
+    Payloads larger than one datagram go out as OSC /chunk messages. Several
+    messages are queued together: all of them or, on a full queue, none;
+    consecutive messages leave as one OSC bundle.
+    """
+    datagrams: List[bytes] = []
+    for message in messages:
+        datagrams.extend(osc_json_datagrams(json.dumps(message)))
+    _send_to_max(datagrams, osc=True)
 
 
 def notes_to_text(notes: List[NoteDict]) -> str:
-    ordered = _sorted_notes(notes)
-    return "\n".join(
-        f"{n['pitch']} {n['start']} {n['duration']}" for n in ordered
-    )
+    return NoteSeq.from_dicts(notes).sorted().to_text()
+
+
+def parse_note_line(line: str) -> NoteDict:
+    parts = line.split()
+    if len(parts) != 3:
+        raise ValueError(f"Invalid note format: '{line}'")
+    pitch, start, duration = parts
+    if pitch.isdigit() and int(pitch) < 128:
+        pitch = midi_to_pitch(int(pitch))  # echoed the compact prompt's MIDI numbers
+    try:
+        return {
+            "pitch": pitch,
+            "start": float(start),
+            "duration": float(duration),
+        }
+    except ValueError as exc:
+        raise ValueError(f"Invalid numeric value in '{line}'") from exc
 
 
 def text_to_notes(text: str) -> List[NoteDict]:
-    notes: List[NoteDict] = []
     lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
     if not lines:
         raise ValueError("Model response did not contain any notes.")
 
-    for line in lines:
-        parts = line.split()
-        if len(parts) != 3:
-            raise ValueError(f"Invalid note format: '{line}'")
-        pitch, start, duration = parts
-        try:
-            note_dict: NoteDict = {
-                "pitch": pitch,
-                "start": float(start),
-                "duration": float(duration),
-            }
-        except ValueError as exc:  # pragma: no cover - defensive parsing
-            raise ValueError(f"Invalid numeric value in '{line}'") from exc
-        notes.append(note_dict)
-    return notes
-
-
-def setup_llm() -> ChatOpenAI:
+    return [parse_note_line(line) for line in lines]
+
+
+def setup_llm(
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
+) -> "ChatOpenAI":
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY is not configured.")
 
+    from langchain_openai import ChatOpenAI #type: ignore
+
     return ChatOpenAI(
         model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
         temperature=0.3,  # tighter adherence to constraints
         api_key=api_key, #type: ignore
         base_url=os.getenv("OPENAI_API_BASE"),
+        timeout=LLM_TIMEOUT,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+def llm_http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
     )
 
 
+def llm_http_timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+
+
+# App-scoped client, set by the FastAPI lifespan; None outside the server
+_llm_client: Optional["ChatOpenAI"] = None
+# Set once the lifespan startup has finished (reported by /readyz)
+_startup: Dict[str, Optional[float]] = {"import_seconds": None, "ready_seconds": None, "llm_seconds": None}
+
+
+def get_llm() -> "ChatOpenAI":
+    """Return the shared client, or build a one-off client (CLI / no lifespan)."""
+    if _llm_client is not None:
+        return _llm_client
+    return setup_llm()
+
+
+# Background creation of the pooled client, started by the lifespan
+_llm_preload: Optional["asyncio.Task[None]"] = None
+
+
+def _build_llm_client(async_http: httpx.AsyncClient) -> Optional["ChatOpenAI"]:
+    import langchain_core.messages  # noqa: F401 - the prompt builders need it on the first request
+
+    try:
+        return setup_llm(http_async_client=async_http)
+    except ValueError as exc:
+        # Keep serving /default etc.; /complete reports the config error per request
+        log.warning("llm_not_initialised", error=str(exc))
+        return None
+
+
+async def _preload_llm(async_http: httpx.AsyncClient) -> None:
+    global _llm_client
+    started = time.perf_counter()
+    client = await asyncio.to_thread(_build_llm_client, async_http)
+    if _llm_client is None:  # never replace a client set meanwhile
+        _llm_client = client
+    _startup["llm_seconds"] = round(time.perf_counter() - started, 3)
+    log.info("llm_preloaded", seconds=_startup["llm_seconds"], configured=client is not None)
+
+
+async def await_llm_preload() -> None:
+    """On the event loop, wait for the background import instead of importing here (blocking the loop)."""
+    task = _llm_preload
+    if task is not None and not task.done():
+        await asyncio.shield(task)
+
+
 def export_notes_to_midi(notes: List[NoteDict], bpm: float, path: Path) -> str:
     """Write notes to a MIDI file at the given path."""
+    with stage_seconds.time("export_midi"):
+        if use_music21():
+            return _export_notes_to_midi_music21(notes, bpm, path)
+        return write_smf(encode_smf(note_events(notes), bpm=bpm), path)
+
+
+def _export_notes_to_midi_music21(notes: List[NoteDict], bpm: float, path: Path) -> str:
+    from music21 import stream as m21stream, tempo as m21tempo, note as m21note #type: ignore
+
     s = m21stream.Stream()
     s.append(m21tempo.MetronomeMark(number=bpm))
 
@@ -240,25 +480,17 @@ def convert_length_to_quarters(
 
 
 def _calculate_end_time(notes: List[NoteDict]) -> float:
-    if not notes:
-        return 0.0
-    return max(n["start"] + n["duration"] for n in notes)
+    return NoteSeq.from_dicts(notes).end_time()
 
 
-def complete_melody(
-    original_notes: List[NoteDict],
-    mood: str,
+def completion_span(
+    seed: NoteSeq,
     bpm: float,
     length_value: float,
     length_unit: str,
-    adventureness: float,
-    chords: Optional[List[ChordDict]] = None,
-    output_path: Optional[str] = None,
-) -> Dict[str, Optional[str] | List[NoteDict]]:
-    if not original_notes:
-        raise ValueError("original_notes must contain at least one note.")
-
-    end_time = _calculate_end_time(original_notes)
+) -> Tuple[float, float]:
+    """Return (seed end, target end) in quarterLength, validating the requested length."""
+    end_time = seed.end_time()
 
     target_end = convert_length_to_quarters(
         length_value,
@@ -270,33 +502,55 @@ def complete_melody(
         raise ValueError(
             f"Target total length ({target_end} ql) must exceed existing melody end ({end_time} ql)."
         )
+    return end_time, target_end
 
-    # basic rhythmic profile of the seed for guidance
-    durations = [n["duration"] for n in original_notes]
-    unique_durs = sorted(set(durations))
-    avg_dur = sum(durations) / len(durations)
-    last_note = original_notes[-1]
 
-    llm = setup_llm()
+def _plain_chord_text(chords: Optional[List[ChordDict]]) -> str:
+    if not chords:
+        return ""
+    ordered_chords = sorted(chords, key=lambda c: (c["start"], c["symbol"]))
+    chord_lines = [
+        f"{c['symbol']} {c['start']} {c['duration']}" for c in ordered_chords
+    ]
+    return "\nChords (symbol start duration):\n" + "\n".join(chord_lines)
 
-    chord_text = ""
-    if chords:
-        ordered_chords = sorted(chords, key=lambda c: (c["start"], c["symbol"]))
-        chord_lines = [
-            f"{c['symbol']} {c['start']} {c['duration']}" for c in ordered_chords
-        ]
-        chord_text = "\nChords (symbol start duration):\n" + "\n".join(chord_lines)
 
-    user_prompt = f"""
+def build_completion_messages(
+    original_notes: List[NoteDict],
+    mood: str,
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    adventureness: float,
+    chords: Optional[List[ChordDict]] = None,
+    variation: int = 0,
+    seed: Optional[NoteSeq] = None,
+) -> List["BaseMessage"]:
+    """Build the chat messages; `seed` may carry original_notes already in columnar form."""
+    if not original_notes:
+        raise ValueError("original_notes must contain at least one note.")
+
+    if seed is None:
+        seed = NoteSeq.from_dicts(original_notes)
+    end_time, target_end = completion_span(seed, bpm, length_value, length_unit)
+
+    # basic rhythmic profile of the seed for guidance
+    unique_durs = seed.unique_durations()
+    avg_dur = seed.mean_duration()
+    # the prompt depends only on the notes, not their input order, like the cache key
+    ordered = seed.sorted()
+    last_note = ordered.to_dicts()[-1]
+
+    def render(melody_section: str, chord_section: str) -> str:
+        return f"""
 Mood: {mood}
 Adventureness: {adventureness} percent
 BPM: {bpm}
 
-Existing melody:
-{notes_to_text(original_notes)}
+{melody_section}
 
 Use these chords as harmonic context (if provided):
-{chord_text or 'No chords provided; assume default vi-IV-I-V repeating.'}
+{chord_section or 'No chords provided; assume default vi-IV-I-V repeating.'}
 
 Seed rhythm profile:
 - Unique durations: {unique_durs}
@@ -311,56 +565,396 @@ Keep rhythmic feel similar to the seed (avoid default straight 4/4 on-beat patte
 Last seed note: {last_note['pitch']} at {last_note['start']} len {last_note['duration']}.
 """
 
-    messages = [
+    if PROMPT_ENCODING == "text":
+        user_prompt = render(f"Existing melody:\n{ordered.to_text()}", _plain_chord_text(chords))
+        layout = "text"
+    else:
+        melody_head = f"Existing melody ({MELODY_LEGEND}):\n"
+        chord_head = f"Chords ({CHORD_LEGEND}):\n"
+        answer_format = (
+            "Write the new notes in the PITCH START DURATION format of rule 5, "
+            "with note names and absolute START values (e.g. C4 8.0 0.5).\n"
+        )
+        fixed = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(render(melody_head, chord_head) + answer_format)
+        encoded = encode_seed(
+            seed,
+            chords,  # type: ignore[arg-type]
+            budget=max(PROMPT_TOKEN_BUDGET - fixed, 200),
+            min_bars=PROMPT_MIN_BARS,
+        )
+        user_prompt = render(
+            melody_head + encoded.melody,
+            chord_head + encoded.chords if encoded.chords else "",
+        ) + answer_format
+        layout = f"compact, {encoded.verbatim_bars} bars verbatim, {encoded.summarized_bars} summarized"
+        # short seeds: the legend costs more than the plain dump saves
+        plain = render(f"Existing melody:\n{seed.sorted().to_text()}", _plain_chord_text(chords))
+        if estimate_tokens(plain) <= estimate_tokens(user_prompt):
+            user_prompt, layout = plain, "text"
+    if variation:
+        user_prompt += (
+            f"This is alternative take #{variation + 1}: make it clearly different from other takes "
+            "while following every rule above.\n"
+        )
+
+    tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_prompt)
+    prompt_tokens_estimate.observe(tokens)
+    log.debug("prompt", tokens=tokens, layout=layout, seed_notes=len(seed))  # sizes are in the metrics
+
+    from langchain_core.messages import HumanMessage, SystemMessage #type: ignore
+
+    return [
+        SystemMessage(content=SYSTEM_PROMPT.strip()),
+        HumanMessage(content=user_prompt.strip()),
+    ]
+
+
+def build_tail_messages(
+    context_notes: List[NoteDict],
+    mood: str,
+    bpm: float,
+    adventureness: float,
+    chords: Optional[List[ChordDict]],
+    span_start: float,
+    span_end: float,
+) -> List["BaseMessage"]:
+    """Follow-up prompt for just the missing span [span_start, span_end) of a short continuation."""
+    nearby = [
+        c for c in (chords or [])
+        if c["start"] < span_end and c["start"] + c["duration"] > span_start - 4.0
+    ]
+    chord_text = _plain_chord_text(nearby) or "No chords provided; assume default vi-IV-I-V repeating."
+    user_prompt = f"""
+Mood: {mood}
+Adventureness: {adventureness} percent
+BPM: {bpm}
+
+The melody so far ends with:
+{notes_to_text(context_notes)}
+
+Harmonic context:
+{chord_text}
+
+Add ONLY the notes from {span_start} to {span_end} quarterLength: the first new note starts at or after {span_start}
+and the final note end equals {span_end} exactly. Continue the phrase with the same rhythmic feel.
+"""
+    from langchain_core.messages import HumanMessage, SystemMessage #type: ignore
+
+    return [
         SystemMessage(content=SYSTEM_PROMPT.strip()),
         HumanMessage(content=user_prompt.strip()),
     ]
 
-    response = llm.invoke(messages)
+
+def completion_cache_key(
+    original_notes: List[NoteDict],
+    mood: str,
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    adventureness: float,
+    chords: Optional[List[ChordDict]] = None,
+    variation: int = 0,
+) -> str:
+    params = {
+        "mood": mood,
+        "bpm": float(bpm),
+        "length_value": float(length_value),
+        "length_unit": length_unit,
+        "adventureness": float(adventureness),
+        "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+        "prompt": PROMPT_VERSION,
+        "encoding": PROMPT_ENCODING,
+        "repair": REPAIR_RETRIES,
+    }
+    if PROMPT_ENCODING != "text":
+        params["prompt_budget"] = PROMPT_TOKEN_BUDGET
+    if variation:
+        params["variation"] = variation
+    return canonical_key(_sorted_notes(original_notes), chords, params)  # type: ignore[arg-type]
+
+
+def _cached_notes(key: str, bypass_cache: bool) -> Optional[List[NoteDict]]:
+    if bypass_cache:
+        return None
+    cached = completion_cache.get(key)
+    if cached is None:
+        return None
+    return [dict(n) for n in cached]  # type: ignore[misc]
+
+
+def _record_token_usage(response: Any) -> None:
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if usage:
+        llm_tokens.inc("prompt", amount=usage.get("prompt_tokens") or 0)
+        llm_tokens.inc("completion", amount=usage.get("completion_tokens") or 0)
+
+
+def _response_to_notes(response: Any) -> List[NoteDict]:
+    _record_token_usage(response)
     content = getattr(response, "content", None)
     if not isinstance(content, str) or not content.strip():
         raise ValueError("Language model returned empty content.")
+    with stage_seconds.time("parse"):
+        return text_to_notes(content)
+
+
+def _invoke_notes(client: "ChatOpenAI", messages: List["BaseMessage"], stage: str = "llm") -> List[NoteDict]:
+    with stage_seconds.time(stage):
+        response = client.invoke(messages)
+    return _response_to_notes(response)
+
+
+async def _ainvoke_notes(client: "ChatOpenAI", messages: List["BaseMessage"], stage: str = "llm") -> List[NoteDict]:
+    with stage_seconds.time(stage):
+        response = await client.ainvoke(messages)
+    return _response_to_notes(response)
+
+
+def generate_local_notes(
+    original_notes: List[NoteDict],
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    adventureness: float,
+    chords: Optional[List[ChordDict]] = None,
+    variation: int = 0,
+    seed: Optional[NoteSeq] = None,
+) -> List[NoteDict]:
+    """Continuation from the offline Markov engine; deterministic per request and variation."""
+    if not original_notes:
+        raise ValueError("original_notes must contain at least one note.")
+    if seed is None:
+        seed = NoteSeq.from_dicts(original_notes)
+    end_time, target_end = completion_span(seed, bpm, length_value, length_unit)
+    rng_seed = hash((tuple(seed.start), tuple(seed.pitch), adventureness, variation)) & 0xFFFFFFFF
+    with stage_seconds.time("markov"):
+        return markov_continue_melody(  # type: ignore[return-value]
+            original_notes,  # type: ignore[arg-type]
+            end_time,
+            target_end,
+            adventureness,
+            chords=chords,  # type: ignore[arg-type]
+            rng_seed=rng_seed,
+            seed=seed,
+        )
+
+
+def _new_repair(
+    original_notes: List[NoteDict],
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    seed: Optional[NoteSeq] = None,
+) -> CompletionRepair:
+    if seed is None:
+        seed = NoteSeq.from_dicts(original_notes)
+    end_time, target_end = completion_span(seed, bpm, length_value, length_unit)
+    return CompletionRepair(seed, end_time, target_end, max_retries=REPAIR_RETRIES)
+
+
+def _use_fallback(exc: BaseException) -> bool:
+    if LLM_FALLBACK != "markov":
+        return False
+    log.warning("llm_fallback", error=repr(exc), generator="markov")
+    return True
 
-    new_notes = text_to_notes(content)
-    full_track = original_notes + new_notes
 
+def complete_melody(
+    original_notes: List[NoteDict],
+    mood: str,
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    adventureness: float,
+    chords: Optional[List[ChordDict]] = None,
+    output_path: Optional[str] = None,
+    llm: Optional["ChatOpenAI"] = None,
+    bypass_cache: bool = False,
+    variation: int = 0,
+    seed: Optional[NoteSeq] = None,
+    generator: Optional[str] = None,
+) -> Dict[str, Optional[str] | List[NoteDict]]:
+    backend = generator or GENERATOR_BACKEND
+    local_args = (original_notes, bpm, length_value, length_unit, adventureness, chords, variation, seed)
+
+    if backend == "markov":
+        new_notes = generate_local_notes(*local_args)
+    else:
+        key = completion_cache_key(
+            original_notes, mood, bpm, length_value, length_unit, adventureness, chords, variation
+        )
+        new_notes = _cached_notes(key, bypass_cache)
+        if new_notes is None:
+            def generate() -> List[NoteDict]:
+                client = llm or get_llm()
+                with stage_seconds.time("prompt"):  # only on a miss: a cache hit needs no prompt
+                    messages = build_completion_messages(
+                        original_notes, mood, bpm, length_value, length_unit, adventureness, chords, variation, seed
+                    )
+                repair = _new_repair(original_notes, bpm, length_value, length_unit, seed)
+                repair.accept(_invoke_notes(client, messages))  # type: ignore[arg-type]
+                while True:
+                    span = repair.next_span()
+                    if span is None:
+                        break
+                    tail = build_tail_messages(
+                        repair.context(original_notes, REPAIR_CONTEXT_NOTES),  # type: ignore[arg-type]
+                        mood, bpm, adventureness, chords, *span,
+                    )
+                    try:
+                        repair.accept(_invoke_notes(client, tail, "llm_tail"), start_at=span[0])  # type: ignore[arg-type]
+                    except ValueError:
+                        continue  # unusable follow-up; it still used up a retry
+                log.info("repair", summary=repair.summary())
+                notes: List[NoteDict] = repair.notes  # type: ignore[assignment]
+                completion_cache.set(key, notes)
+                return notes
+
+            try:
+                new_notes = [dict(n) for n in inflight_completions_sync.do(key, generate)]  # type: ignore[misc]
+            except Exception as exc:
+                if not _use_fallback(exc):
+                    raise
+                backend = "markov"
+                new_notes = generate_local_notes(*local_args)
+
+    completions_total.inc(backend)
+    result: Dict[str, Optional[str] | List[NoteDict]] = {
+        "full_track": original_notes + new_notes,
+        "added_notes": new_notes,
+        "midi_file": None,
+        "generator": backend,
+    }
+
+    if output_path:
+        with stage_seconds.time("write_midi"):
+            write_melody(original_notes, new_notes, output_path)
+        result["midi_file"] = output_path
+
+    return result
+
+
+async def acomplete_melody(
+    original_notes: List[NoteDict],
+    mood: str,
+    bpm: float,
+    length_value: float,
+    length_unit: str,
+    adventureness: float,
+    chords: Optional[List[ChordDict]] = None,
+    output_path: Optional[str] = None,
+    llm: Optional["ChatOpenAI"] = None,
+    bypass_cache: bool = False,
+    variation: int = 0,
+    seed: Optional[NoteSeq] = None,
+    generator: Optional[str] = None,
+) -> Dict[str, Optional[str] | List[NoteDict]]:
+    """Async variant of complete_melody: awaits the LLM instead of blocking a worker thread."""
+    backend = generator or GENERATOR_BACKEND
+    local_args = (original_notes, bpm, length_value, length_unit, adventureness, chords, variation, seed)
+
+    if backend == "markov":
+        new_notes = await asyncio.to_thread(generate_local_notes, *local_args)
+    else:
+        key = completion_cache_key(
+            original_notes, mood, bpm, length_value, length_unit, adventureness, chords, variation
+        )
+        new_notes = _cached_notes(key, bypass_cache)
+        if new_notes is None:
+            await await_llm_preload()
+
+            async def generate() -> List[NoteDict]:
+                client = llm or get_llm()
+                with stage_seconds.time("prompt"):  # only on a miss: a cache hit needs no prompt
+                    messages = build_completion_messages(
+                        original_notes, mood, bpm, length_value, length_unit, adventureness, chords, variation, seed
+                    )
+                repair = _new_repair(original_notes, bpm, length_value, length_unit, seed)
+                repair.accept(await _ainvoke_notes(client, messages))  # type: ignore[arg-type]
+                while True:
+                    span = repair.next_span()
+                    if span is None:
+                        break
+                    tail = build_tail_messages(
+                        repair.context(original_notes, REPAIR_CONTEXT_NOTES),  # type: ignore[arg-type]
+                        mood, bpm, adventureness, chords, *span,
+                    )
+                    try:
+                        repair.accept(await _ainvoke_notes(client, tail, "llm_tail"), start_at=span[0])  # type: ignore[arg-type]
+                    except ValueError:
+                        continue  # unusable follow-up; it still used up a retry
+                log.info("repair", summary=repair.summary())
+                notes: List[NoteDict] = repair.notes  # type: ignore[assignment]
+                completion_cache.set(key, notes)
+                return notes
+
+            try:
+                # wait_for only cancels this waiter; the shared call still finishes and fills the cache
+                shared = await asyncio.wait_for(
+                    inflight_completions.do(key, generate),
+                    LLM_FALLBACK_AFTER if LLM_FALLBACK == "markov" else None,
+                )
+                new_notes = [dict(n) for n in shared]  # type: ignore[misc]
+            except Exception as exc:
+                if not _use_fallback(exc):
+                    raise
+                backend = "markov"
+                new_notes = await asyncio.to_thread(generate_local_notes, *local_args)
+
+    completions_total.inc(backend)
     result: Dict[str, Optional[str] | List[NoteDict]] = {
-        "full_track": full_track,
+        "full_track": original_notes + new_notes,
         "added_notes": new_notes,
         "midi_file": None,
+        "generator": backend,
     }
 
     if output_path:
-        write_melody(original_notes, new_notes, output_path)
+        with stage_seconds.time("write_midi"):
+            await asyncio.to_thread(write_melody, original_notes, new_notes, output_path)
         result["midi_file"] = output_path
 
     return result
 
 
+def _chord_voicing(symbol: str) -> List[str]:
+    # Basic voicing: duplicate symbol root as triad if not a known chord name
+    if symbol.lower() in {"am", "a-"}:
+        return ["A3", "C4", "E4"]
+    if symbol.lower() == "f":
+        return ["F3", "A3", "C4"]
+    if symbol.lower() == "c":
+        return ["C3", "E3", "G3"]
+    if symbol.lower() == "g":
+        return ["G3", "B3", "D4"]
+    # fallback single-note root
+    return [symbol]
+
+
 def ensure_chord_midi(chords: List[ChordDict], path: Path, bpm: float = 96.0) -> str:
     if path.exists():
         return str(path)
 
+    if use_music21():
+        return _ensure_chord_midi_music21(chords, path, bpm)
+
+    events = [
+        (pitch_to_midi(p), float(c["start"]), float(c["duration"]), 90)
+        for c in chords
+        for p in _chord_voicing(c["symbol"])
+    ]
+    return write_smf(encode_smf(events, bpm=bpm), path)
+
+
+def _ensure_chord_midi_music21(chords: List[ChordDict], path: Path, bpm: float) -> str:
+    from music21 import chord as m21chord, stream as m21stream, tempo as m21tempo #type: ignore
+
     s = m21stream.Stream()
     s.append(m21tempo.MetronomeMark(number=bpm))
 
     for chord_dict in chords:
-        pitches = []
-        # Basic voicing: duplicate symbol root as triad if not a known chord name
-        symbol = chord_dict["symbol"]
-        if symbol.lower() in {"am", "a-"}:
-            pitches = ["A3", "C4", "E4"]
-        elif symbol.lower() == "f":
-            pitches = ["F3", "A3", "C4"]
-        elif symbol.lower() == "c":
-            pitches = ["C3", "E3", "G3"]
-        elif symbol.lower() == "g":
-            pitches = ["G3", "B3", "D4"]
-        else:
-            # fallback single-note root
-            pitches = [symbol]
-
-        c = m21chord.Chord(pitches)
+        c = m21chord.Chord(_chord_voicing(chord_dict["symbol"]))
         c.duration.quarterLength = float(chord_dict["duration"])
         s.insert(float(chord_dict["start"]), c)
 
@@ -376,7 +970,8 @@ def complete_melody_from_midi(
     length_unit: str,
     adventureness: float,
 ) -> Dict[str, Optional[str] | List[NoteDict]]:
-    original_notes, _, _ = read_melody(midi_path)
+    with stage_seconds.time("read_midi"):
+        original_notes, _, _ = cached_read_melody(midi_path)
     output_path = str(
         Path(midi_path).with_name(
             f"{Path(midi_path).stem}_completed{Path(midi_path).suffix or '.mid'}"
@@ -393,7 +988,115 @@ def complete_melody_from_midi(
     )
 
 
-app = FastAPI(title="Melody Copilot API", version="1.0.0")
+async def _iter_llm_lines(llm: "ChatOpenAI", messages: List["BaseMessage"]) -> AsyncIterator[str]:
+    """Yield each non-empty line of the model output as soon as its newline arrives."""
+    buffer = ""
+    async for chunk in llm.astream(messages):
+        content = getattr(chunk, "content", None)
+        if not isinstance(content, str) or not content:
+            continue
+        buffer += content
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line.strip()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_note_events(
+    messages: List["BaseMessage"],
+    llm: Optional["ChatOpenAI"] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Stream completion events: one "note" per parsed line, "error" per bad line, then "done"."""
+    await await_llm_preload()
+    llm = llm or get_llm()
+    line_no = 0
+    added = 0
+    try:
+        async for line in _iter_llm_lines(llm, messages):
+            line_no += 1
+            try:
+                note = parse_note_line(line)
+            except ValueError as exc:
+                yield {"event": "error", "line": line_no, "text": line, "detail": str(exc)}
+                continue
+            added += 1
+            yield {"event": "note", "line": line_no, "note": note}
+    except Exception as exc:  # pragma: no cover - upstream/network failure mid-stream
+        yield {"event": "error", "detail": f"LLM stream failed: {exc}", "fatal": True}
+        return
+
+    if not added:
+        yield {"event": "error", "detail": "Model response did not contain any notes.", "fatal": True}
+        return
+    yield {"event": "done", "added": added}
+
+
+def _sse_format(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Create one pooled LLM client per worker and close its connections on shutdown."""
+    global _llm_client, _llm_preload, _bridge_listener, _max_sender
+    lifespan_started = time.perf_counter()
+    async_http = httpx.AsyncClient(limits=llm_http_limits(), timeout=llm_http_timeout())
+    # importing langchain_openai is the slowest part of startup: do it in the
+    # background so the server accepts requests meanwhile (LLM paths wait for it)
+    _llm_preload = asyncio.create_task(_preload_llm(async_http))
+    try:
+        await asyncio.to_thread(get_default_seed)
+    except HTTPException as exc:
+        log.warning("default_seed_not_preloaded", detail=exc.detail)
+    _max_sender = UdpSender(MAX_UDP_HOST, MAX_UDP_PORT)
+    bridge_events.publish(await _store_call(bridge_store.last_version))
+    store_watcher = asyncio.create_task(_watch_bridge_store()) if bridge_store.shared else None
+    if BRIDGE_MODE == "inprocess":
+        try:
+            _bridge_listener = await start_bridge_listener(
+                BRIDGE_UDP_HOST,
+                BRIDGE_UDP_PORT,
+                on_capture=_bridge_capture,
+                on_complete=_bridge_complete,
+                encode_reply=_encode_bridge_reply,
+                reply_address=(MAX_UDP_HOST, MAX_UDP_PORT),
+                max_concurrent=BRIDGE_UDP_MAX_CONCURRENT,
+            )
+            bridge_log.info("udp_listening", address=f"{BRIDGE_UDP_HOST}:{BRIDGE_UDP_PORT}")
+        except OSError as exc:
+            # e.g. another worker or the standalone bridge already owns the port
+            bridge_log.warning("udp_not_started", address=f"{BRIDGE_UDP_HOST}:{BRIDGE_UDP_PORT}", error=str(exc))
+    _startup["ready_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+    log.info(
+        "startup",
+        import_seconds=_startup["import_seconds"],
+        lifespan_seconds=round(time.perf_counter() - lifespan_started, 3),
+        ready_seconds=_startup["ready_seconds"],
+        pid=os.getpid(),
+    )
+    try:
+        yield
+    finally:
+        _startup["ready_seconds"] = None
+        _llm_preload.cancel()
+        _llm_preload = None
+        if store_watcher is not None:
+            store_watcher.cancel()
+            await asyncio.gather(store_watcher, return_exceptions=True)
+        if _bridge_listener is not None:
+            await _bridge_listener.close()
+            _bridge_listener = None
+        if _max_sender is not None:
+            await asyncio.to_thread(_max_sender.close)
+            _max_sender = None
+        _llm_client = None
+        await async_http.aclose()
+        await _store_call(bridge_store.close)  # the SQLite store reopens on next use
+
+
+app = FastAPI(title="Melody Copilot API", version="1.0.0", lifespan=lifespan)
 
 cors_origins = os.getenv("CORS_ALLOW_ORIGINS", "*")
 allowed_origins = [origin.strip() for origin in cors_origins.split(",") if origin.strip()]
@@ -412,35 +1115,304 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, histogram=http_request_seconds, inflight=http_requests_inflight)
 
 
-@app.post("/complete", response_model=CompleteResponse)
-def complete_endpoint(payload: CompleteRequest) -> CompleteResponse:
-    notes = [note.model_dump() for note in payload.original_notes]
+async def _acomplete_payload(payload: CompleteRequest, variation: int = 0) -> Dict[str, Any]:
+    # columnar seed straight from the payload models; dicts only for the result
+    seed = NoteSeq.from_payloads(payload.original_notes)
     chords = [c.model_dump() for c in payload.chords] if payload.chords else None
+    return await acomplete_melody(
+        seed.to_dicts(), #type: ignore
+        payload.mood,
+        payload.bpm,
+        payload.length_value,
+        payload.length_unit,
+        payload.adventureness,
+        chords=chords, #type: ignore
+        bypass_cache=payload.bypass_cache,
+        variation=variation,
+        seed=seed,
+        generator=payload.generator,
+    )
+
+
+@app.post("/complete", response_model=CompleteResponse)
+async def complete_endpoint(payload: CompleteRequest) -> CompleteResponse:
+    try:
+        result = await _acomplete_payload(payload)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    return CompleteResponse(**result)  # type: ignore[arg-type]
+
+
+async def _run_batch_item(
+    semaphore: asyncio.Semaphore,
+    index: int,
+    payload: CompleteRequest,
+    variation: int,
+) -> CompleteBatchItem:
+    async with semaphore:
+        try:
+            result = await _acomplete_payload(payload, variation)
+        except Exception as exc:  # per-item failure must not fail the batch
+            return CompleteBatchItem(index=index, variation=variation, error=str(exc))
+    return CompleteBatchItem(
+        index=index,
+        variation=variation,
+        result=CompleteResponse(**result),  # type: ignore[arg-type]
+    )
+
+
+@app.post("/complete/batch", response_model=CompleteBatchResponse)
+async def complete_batch_endpoint(payload: CompleteBatchRequest) -> CompleteBatchResponse:
+    """Generate several continuations concurrently (at most BATCH_CONCURRENCY at a time)."""
+    if payload.requests is not None:
+        jobs = [(req, 0) for req in payload.requests]
+    else:
+        assert payload.request is not None
+        jobs = [(payload.request, i) for i in range(payload.variations)]
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    items = await asyncio.gather(
+        *(_run_batch_item(semaphore, i, req, variation) for i, (req, variation) in enumerate(jobs))
+    )
+    failed = sum(1 for item in items if item.error is not None)
+    return CompleteBatchResponse(results=list(items), succeeded=len(items) - failed, failed=failed)
+
+
+@app.get("/cache/stats")
+def cache_stats() -> Dict[str, Any]:
+    stats = completion_cache.stats()
+    stats["inflight"] = inflight_completions.inflight() + inflight_completions_sync.inflight()
+    stats["coalesced"] = inflight_completions.coalesced + inflight_completions_sync.coalesced
+    return stats
+
+
+@app.delete("/cache")
+def cache_clear() -> Dict[str, str]:
+    completion_cache.clear()
+    return {"status": "cleared"}
+
+
+def _collect_runtime_metrics() -> List[Tuple[str, str, str, List[Any]]]:
+    """Values kept by other components, read at scrape time."""
+    cache = completion_cache.stats()
+    store = bridge_store.stats()
+    listener = _bridge_listener.stats() if _bridge_listener is not None else None
+    sender = _max_sender.stats() if _max_sender is not None else None
+    lookups = [
+        ("melody_cache_lookups_total", {"result": result}, float(cache[key]))
+        for result, key in (("hit", "hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))
+    ]
+    return [
+        ("melody_cache_lookups_total", "counter", "Completion cache lookups by result", lookups),
+        ("melody_cache_hit_ratio", "gauge", "Completion cache hit rate since start", sample("melody_cache_hit_ratio", cache["hit_rate"])),
+        ("melody_cache_entries", "gauge", "Entries in the in-memory completion cache", sample("melody_cache_entries", cache["entries"])),
+        ("melody_llm_inflight", "gauge", "Distinct LLM generations in flight", sample(
+            "melody_llm_inflight", inflight_completions.inflight() + inflight_completions_sync.inflight()
+        )),
+        ("melody_llm_coalesced_total", "counter", "Requests that joined an in-flight generation", sample(
+            "melody_llm_coalesced_total", inflight_completions.coalesced + inflight_completions_sync.coalesced
+        )),
+        ("melody_bridge_version", "gauge", "Current bridge result version", sample("melody_bridge_version", bridge_events.version)),
+        ("melody_bridge_listeners", "gauge", "Connected bridge push listeners", sample("melody_bridge_listeners", bridge_events.listeners())),
+        ("melody_bridge_sessions", "gauge", "Live sessions in the bridge store", sample("melody_bridge_sessions", store["sessions"])),
+        ("melody_bridge_udp_pending", "gauge", "UDP bridge completions in flight", sample(
+            "melody_bridge_udp_pending", listener["completing"] if listener else None
+        )),
+        ("melody_bridge_udp_busy_total", "counter", "UDP bridge completions refused as busy", sample(
+            "melody_bridge_udp_busy_total", listener["busy"] if listener else None
+        )),
+        ("melody_max_sender_pending", "gauge", "Datagrams queued for Max", sample(
+            "melody_max_sender_pending", sender["pending"] if sender else None
+        )),
+        ("melody_max_sender_dropped_total", "counter", "Datagrams to Max dropped on a full queue", sample(
+            "melody_max_sender_dropped_total", sender["dropped"] if sender else None
+        )),
+    ]
+
+
+metrics.collector(_collect_runtime_metrics)
+
+
+@app.get("/debug/events")
+def debug_events(
+    since: int = 0,
+    level: Optional[str] = None,
+    component: Optional[str] = None,
+    event: Optional[str] = None,
+    limit: int = 200,
+) -> Dict[str, Any]:
+    """Recent structured events of this worker; poll with since=<next> for new ones."""
     try:
-        result = complete_melody(
-            notes, #type: ignore
-            payload.mood,
+        min_level = parse_level(level) if level else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    events = event_log.query(since, min_level, component, event, max(0, min(limit, 2000)))
+    return {
+        "events": events,
+        "next": events[-1]["seq"] if events else since,
+        **event_log.stats(),
+    }
+
+
+@app.put("/debug/events/level")
+def debug_events_level(level: Literal["debug", "info", "warning", "error"]) -> Dict[str, Any]:
+    """Change what the ring buffer records (e.g. "debug" for per-packet bridge traces)."""
+    event_log.set_levels(level=LEVELS[level])
+    return event_log.stats()
+
+
+@app.get("/healthz")
+def healthz() -> Dict[str, str]:
+    """Liveness: the process answers HTTP. Never touches disk, the LLM or the bridge."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz", response_model=None)
+def readyz() -> Any:
+    """Readiness: 200 once startup has finished, 503 before (and during shutdown).
+
+    Only reports in-memory state; a missing LLM key does not make the worker
+    unready since /default, the bridge and the markov engine still work, and
+    LLM requests arriving while the client is still loading wait for it.
+    """
+    ready = _startup["ready_seconds"] is not None
+    loading = _llm_preload is not None and not _llm_preload.done()
+    if not ready:
+        status = "starting"
+    elif _llm_client is None and not loading and GENERATOR_BACKEND == "llm":
+        status = "degraded"  # /complete will report the LLM config error
+    else:
+        status = "ready"
+    body = {
+        "status": status,
+        "pid": os.getpid(),
+        "startup": dict(_startup),
+        "llm": "ready" if _llm_client is not None else ("loading" if loading else "not_configured"),
+        "generator": GENERATOR_BACKEND,
+        "bridge_udp": "listening" if _bridge_listener is not None else ("off" if BRIDGE_MODE != "inprocess" else "not_bound"),
+        "bridge_store": BRIDGE_STORE,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> PlainTextResponse:
+    """Prometheus text exposition of this worker's metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _stream_plan(payload: CompleteRequest) -> Tuple[str, List["BaseMessage"], Optional["ChatOpenAI"], Optional[List[NoteDict]]]:
+    """Validate a streaming request up front; returns (backend, messages, llm, local notes)."""
+    seed = NoteSeq.from_payloads(payload.original_notes)
+    notes: List[NoteDict] = seed.to_dicts()  # type: ignore[assignment]
+    chords = [c.model_dump() for c in payload.chords] if payload.chords else None
+    messages = build_completion_messages(
+        notes,
+        payload.mood,
+        payload.bpm,
+        payload.length_value,
+        payload.length_unit,
+        payload.adventureness,
+        chords=chords, #type: ignore
+        seed=seed,
+    )
+
+    backend = payload.generator or GENERATOR_BACKEND
+    llm: Optional["ChatOpenAI"] = None
+    if backend != "markov":
+        try:
+            llm = get_llm()
+        except ValueError as exc:
+            if not _use_fallback(exc):
+                raise
+            backend = "markov"
+
+    local_notes = None
+    if backend == "markov" or payload.draft:
+        local_notes = generate_local_notes(
+            notes,
             payload.bpm,
             payload.length_value,
             payload.length_unit,
             payload.adventureness,
-            chords=chords, #type: ignore
+            chords, #type: ignore
+            seed=seed,
         )
+    return backend, messages, llm, local_notes
+
+
+async def _plan_events(
+    backend: str,
+    messages: List["BaseMessage"],
+    llm: Optional["ChatOpenAI"],
+    local_notes: Optional[List[NoteDict]],
+) -> AsyncIterator[Dict[str, Any]]:
+    if backend == "markov":
+        for line_no, note in enumerate(local_notes or [], start=1):
+            yield {"event": "note", "line": line_no, "note": note}
+        yield {"event": "done", "added": len(local_notes or []), "generator": "markov"}
+        return
+
+    if local_notes is not None:
+        yield {"event": "draft", "notes": local_notes, "generator": "markov"}
+    async for event in stream_note_events(messages, llm):
+        yield event
+
+
+@app.post("/complete/stream")
+async def complete_stream_endpoint(payload: CompleteRequest) -> StreamingResponse:
+    """Server-Sent Events: each new note is pushed as soon as its line is complete."""
+    await await_llm_preload()
+    try:
+        plan = await asyncio.to_thread(_stream_plan, payload)  # prompt encoding / markov engine are CPU work
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    return CompleteResponse(**result)  # type: ignore[arg-type]
+    async def event_source() -> AsyncIterator[str]:
+        async for event in _plan_events(*plan):
+            yield _sse_format(event)
 
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.get("/default", response_model=DefaultSeedResponse)
-def default_seed() -> DefaultSeedResponse:
-    midi_path = DEFAULT_MIDI_PATH
-    if not midi_path.exists():
-        raise HTTPException(status_code=404, detail="Default MIDI not found.")
 
-    notes, _, tempo = read_melody(str(midi_path))
+@app.websocket("/complete/ws")
+async def complete_ws(websocket: WebSocket) -> None:
+    """WebSocket variant of /complete/stream; accepts one CompleteRequest JSON per message."""
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                raw = await websocket.receive_json()
+            except ValueError as exc:  # JSONDecodeError: the message is consumed, the socket stays usable
+                await websocket.send_json({"event": "error", "detail": f"Invalid JSON: {exc}", "fatal": True})
+                continue
+            try:
+                await await_llm_preload()
+                plan = await asyncio.to_thread(_stream_plan, CompleteRequest.model_validate(raw))
+            except (ValidationError, ValueError) as exc:
+                await websocket.send_json({"event": "error", "detail": str(exc), "fatal": True})
+                continue
+            async for event in _plan_events(*plan):
+                await websocket.send_json(event)
+    except WebSocketDisconnect:
+        pass
+
+
+# Precomputed /default response, rebuilt only when the default MIDI changes on disk
+_default_seed_cache: Dict[str, Any] = {"stamp": None, "response": None}
+
+
+def _build_default_seed(midi_path: Path) -> DefaultSeedResponse:
+    with stage_seconds.time("read_midi"):
+        notes, _, tempo = cached_read_melody(str(midi_path))
     if not notes:
         raise HTTPException(status_code=500, detail="Default MIDI contains no notes.")
 
@@ -469,73 +1441,274 @@ def default_seed() -> DefaultSeedResponse:
     )
 
 
-# Bridge 状态存储（用于 Max → Frontend 通信）
-_bridge_state: Dict[str, Optional[Any]] = {
-    "latest_result": None,
-    "timestamp": None,
-    "listening": False,
-    "listen_start_time": None
-}
+def get_default_seed() -> DefaultSeedResponse:
+    midi_path = DEFAULT_MIDI_PATH
+    try:
+        stamp = file_stamp(str(midi_path))
+    except OSError:
+        raise HTTPException(status_code=404, detail="Default MIDI not found.")
+
+    if _default_seed_cache["stamp"] != stamp:
+        _default_seed_cache["response"] = _build_default_seed(midi_path)
+        _default_seed_cache["stamp"] = stamp
+    return _default_seed_cache["response"]
+
+
+@app.get("/default", response_model=DefaultSeedResponse)
+def default_seed() -> DefaultSeedResponse:
+    return get_default_seed()
+
+
+# Bridge 状态存储（用于 Max → Frontend 通信），按 session / track id 分开
+bridge_store = open_bridge_store(
+    BRIDGE_STORE,
+    path=BRIDGE_STORE_PATH,
+    ttl=BRIDGE_STORE_TTL,
+    max_sessions=BRIDGE_STORE_MAX_SESSIONS,
+    max_bytes=BRIDGE_STORE_MAX_BYTES,
+)
+# Mirrors the store's newest version; wakes long-polls and SSE/WS subscribers
+bridge_events = VersionedBroadcast()
+# BridgeLatestResponse built once per stored result: session -> response
+_bridge_responses: Dict[str, BridgeLatestResponse] = {}
+# In-process UDP listener (BRIDGE_MODE=inprocess), set by the lifespan
+_bridge_listener: Optional[BridgeProtocol] = None
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).isoformat() if ts is not None else None
+
+
+def _bridge_response(record: BridgeRecord) -> BridgeLatestResponse:
+    result = record.result or {}
+    return BridgeLatestResponse(
+        added_notes=[NotePayload(**n) for n in result.get("added_notes", [])],
+        full_track=[NotePayload(**n) for n in result.get("full_track", [])],
+        timestamp=_iso(record.timestamp),
+        has_data=True,
+        version=record.version,
+    )
+
+
+async def _store_call(fn: Callable[..., Any], *args: Any) -> Any:
+    """Call the bridge store; the SQLite store (5 s busy timeout, BEGIN IMMEDIATE) runs in a worker thread."""
+    if bridge_store.shared:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
 
 
-@app.get("/bridge/latest", response_model=BridgeLatestResponse)
-def bridge_latest() -> BridgeLatestResponse:
-    """获取最新的生成结果（从 Max for Live 发来）"""
-    latest = _bridge_state.get("latest_result")
-    timestamp = _bridge_state.get("timestamp")
-    
-    print(f"\n🔍 Backend: GET /bridge/latest called")
-    print(f"   Has latest_result: {latest is not None}")
-    print(f"   Timestamp: {timestamp}")
-    
-    if not latest:
-        print(f"   ❌ No data available, returning has_data=False")
+async def _bridge_snapshot(session: str = DEFAULT_SESSION) -> BridgeLatestResponse:
+    return _snapshot_response(session, await _store_call(bridge_store.get, session))
+
+
+def _snapshot_response(session: str, record: Optional[BridgeRecord]) -> BridgeLatestResponse:
+    if record is None or record.result is None:
+        _bridge_responses.pop(session, None)
         return BridgeLatestResponse(
-            added_notes=[],
-            full_track=[],
-            timestamp=None,
-            has_data=False
+            added_notes=[], full_track=[], timestamp=None, has_data=False,
+            version=record.version if record is not None else 0,
         )
-    
-    added_notes = [NotePayload(**n) for n in latest.get("added_notes", [])]
-    full_track = [NotePayload(**n) for n in latest.get("full_track", [])]
-    
-    print(f"   ✅ Returning data: {len(full_track)} notes, has_data=True")
-    
-    return BridgeLatestResponse(
-        added_notes=added_notes,
-        full_track=full_track,
-        timestamp=timestamp,
-        has_data=True
+    response = _bridge_responses.get(session)
+    if response is None or response.version != record.version:
+        # stored through another worker (or evicted here): rebuild once
+        response = _bridge_responses[session] = _bridge_response(record)
+        while len(_bridge_responses) > BRIDGE_STORE_MAX_SESSIONS:
+            _bridge_responses.pop(next(iter(_bridge_responses)))
+    return response
+
+
+async def _session_version(session: str) -> int:
+    record = await _store_call(bridge_store.get, session)
+    return record.version if record is not None else 0
+
+
+def _write_bridge_result(session: str, payload: Dict[str, Any]) -> Tuple[int, Optional[BridgeRecord]]:
+    version = bridge_store.store_result(session, payload)
+    return version, bridge_store.get(session)
+
+
+async def _publish_bridge_result(session: str, payload: Dict[str, Any]) -> int:
+    """Store the latest result of `session` and wake every waiter."""
+    # validate before storing; raises ValidationError / KeyError / TypeError
+    added = [NotePayload(**n) for n in payload.get("added_notes", [])]
+    full = [NotePayload(**n) for n in payload.get("full_track", [])]
+    version, record = await _store_call(_write_bridge_result, session, payload)
+    _bridge_responses[session] = BridgeLatestResponse(
+        added_notes=added,
+        full_track=full,
+        timestamp=_iso(record.timestamp) if record is not None else datetime.now().isoformat(),
+        has_data=True,
+        version=version,
+    )
+    return bridge_events.publish(version)
+
+
+async def _bridge_capture(payload: Dict[str, Any]) -> None:
+    """UDP capture from Max: same effect as POST /bridge/result."""
+    session = str(payload.pop("session", None) or DEFAULT_SESSION)
+    version = await _publish_bridge_result(session, payload)
+    bridge_log.info("capture_stored", session=session, version=version, added_notes=len(payload.get("added_notes", [])))
+
+
+async def _bridge_complete(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """UDP completion request from Max: generate, store for the UI, return the reply."""
+    session = str(payload.pop("session", None) or DEFAULT_SESSION)
+    result = await _acomplete_payload(CompleteRequest.model_validate(payload))
+    response = CompleteResponse(**result).model_dump(mode="json")  # type: ignore[arg-type]
+    version = await _publish_bridge_result(session, response)
+    bridge_log.info("completion_stored", session=session, version=version, added_notes=len(response["added_notes"]))
+    return response
+
+
+async def _watch_bridge_store() -> None:
+    """Shared store: wake this worker's waiters when another worker stores a result."""
+    while True:
+        await asyncio.sleep(BRIDGE_STORE_POLL)
+        try:
+            version = await asyncio.to_thread(bridge_store.last_version)
+        except Exception as exc:  # e.g. database locked for longer than its timeout
+            bridge_log.warning("store_poll_failed", error=str(exc))
+            continue
+        if version > bridge_events.version:
+            bridge_events.publish(version)
+
+
+def _encode_bridge_reply(message: Dict[str, Any], wire: Optional[str] = None) -> List[bytes]:
+    """Reply in the format Max used: compact notes if it fits one datagram, else chunked JSON."""
+    if wire is not None:
+        packet = encode_notes_message(message, wire)
+        if len(packet) <= UDP_MAX_DATAGRAM:
+            return [packet]
+    return osc_json_datagrams(json.dumps(message))
+
+
+@app.get("/bridge/latest", response_model=BridgeLatestResponse)
+async def bridge_latest(
+    since: Optional[int] = None,
+    timeout: float = 25.0,
+    session: str = DEFAULT_SESSION,
+) -> BridgeLatestResponse:
+    """获取最新的生成结果（从 Max for Live 发来）
+
+    With `since`, long-polls: returns as soon as the session's version moves past
+    it, or after `timeout` seconds (capped at BRIDGE_LONGPOLL_MAX) with the unchanged state.
+    """
+    if since is not None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(max(timeout, 0.0), BRIDGE_LONGPOLL_MAX)
+        while True:
+            seen = bridge_events.version  # read before the store: no change can slip in between
+            if await _session_version(session) > since:
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await bridge_events.wait(seen, remaining)  # any session's change wakes us; re-check ours
+    return await _bridge_snapshot(session)
+
+
+async def _session_changes(session: str) -> AsyncIterator[Optional[BridgeLatestResponse]]:
+    """The session's state now and after each change; None on keepalive ticks."""
+    record = await _store_call(bridge_store.get, session)
+    sent = record.version if record is not None else 0
+    yield _snapshot_response(session, record)
+    async for version in bridge_events.subscribe(BRIDGE_KEEPALIVE):
+        if version is None:
+            yield None
+            continue
+        record = await _store_call(bridge_store.get, session)
+        current = record.version if record is not None else 0
+        if current != sent:
+            sent = current
+            yield _snapshot_response(session, record)
+
+
+@app.get("/bridge/events")
+async def bridge_events_stream(session: str = DEFAULT_SESSION) -> StreamingResponse:
+    """Server-Sent Events: the current state first, then every change as it happens."""
+
+    async def event_source() -> AsyncIterator[str]:
+        async for snapshot in _session_changes(session):
+            if snapshot is None:
+                yield ": keepalive\n\n"
+                continue
+            yield _sse_format({"event": "result", **snapshot.model_dump(mode="json")})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@app.websocket("/bridge/ws")
+async def bridge_ws(websocket: WebSocket, session: str = DEFAULT_SESSION) -> None:
+    """WebSocket variant of /bridge/events; sends one BridgeLatestResponse JSON per change."""
+    await websocket.accept()
+    try:
+        async for snapshot in _session_changes(session):
+            if snapshot is None:
+                await websocket.send_json({"event": "keepalive", "version": await _session_version(session)})
+                continue
+            await websocket.send_json({"event": "result", **snapshot.model_dump(mode="json")})
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/bridge/status")
+def bridge_status(session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    listener = _bridge_listener
+    record = bridge_store.get(session)
+    return {
+        "mode": BRIDGE_MODE,
+        "udp_listener": f"{BRIDGE_UDP_HOST}:{BRIDGE_UDP_PORT}" if listener is not None else None,
+        "session": session,
+        "listening": bool(record is not None and record.listening),
+        "listen_start_time": _iso(record.listen_start_time) if record is not None else None,
+        "version": record.version if record is not None else 0,
+        "has_data": record is not None and record.result is not None,
+        "store": bridge_store.stats(),
+        "stats": listener.stats() if listener is not None else None,
+        "max_sender": _max_sender.stats() if _max_sender is not None else None,
+    }
+
+
 @app.post("/bridge/start-capture", response_model=None)
-def bridge_start_capture() -> Dict[str, str]:
+async def bridge_start_capture(session: str = DEFAULT_SESSION) -> Dict[str, Any]:
     """前端调用：告诉用户在 Max 中执行旋律捕获"""
-    _bridge_state["listening"] = True
-    _bridge_state["listen_start_time"] = datetime.now().isoformat()
     # 清空上一次结果，避免立刻返回旧数据导致“秒回”（尤其是和弦按钮）
-    _bridge_state["latest_result"] = None
-    _bridge_state["timestamp"] = None
-    return {"status": "listening", "message": "Now listening for Max capture. Click the capture button in Max for Live."}
+    version = bridge_events.publish(await _store_call(bridge_store.start_capture, session))
+    _bridge_responses.pop(session, None)
+    return {
+        "status": "listening",
+        "message": "Now listening for Max capture. Click the capture button in Max for Live.",
+        "session": session,
+        "version": version,
+    }
 
 
 @app.post("/bridge/result", response_model=None)
-def bridge_store_result(payload: Dict[str, Any]) -> Dict[str, str]:
-    """桥接脚本调用此端点存储结果（供前端查询）"""
-    print(f"\n🔵 Backend: Received POST to /bridge/result")
-    print(f"   Payload keys: {list(payload.keys())}")
-    print(f"   Full track: {len(payload.get('full_track', []))} notes")
-    print(f"   Added notes: {len(payload.get('added_notes', []))} notes")
-    
-    _bridge_state["latest_result"] = payload
-    _bridge_state["timestamp"] = datetime.now().isoformat()
-    _bridge_state["listening"] = False
-    
-    print(f"✅ Backend: Stored result, timestamp: {_bridge_state['timestamp']}")
-    print(f"   State has_data: True")
-    
+async def bridge_store_result(payload: Dict[str, Any], session: Optional[str] = None) -> Dict[str, str]:
+    """桥接脚本调用此端点存储结果（供前端查询）
+
+    The session comes from `?session=`, else a "session" key in the payload, else "default".
+    """
+    session = str(session or payload.pop("session", None) or DEFAULT_SESSION)
+    payload.pop("session", None)
+    bridge_log.debug("result_received", session=session, keys=sorted(payload))
+    try:
+        version = await _publish_bridge_result(session, payload)
+    except (ValidationError, KeyError, TypeError) as exc:
+        bridge_log.warning("result_invalid", session=session, error=str(exc))
+        raise HTTPException(status_code=400, detail=f"Invalid bridge result: {exc}") from exc
+    bridge_log.info(
+        "result_stored",
+        session=session,
+        version=version,
+        full_track=len(payload.get("full_track", [])),
+        added_notes=len(payload.get("added_notes", [])),
+    )
+
     return {"status": "ok", "message": f"Result stored for {len(payload.get('added_notes', []))} notes"}
 
 
@@ -545,17 +1718,38 @@ def bridge_notify_max(req: MaxNotifyRequest) -> Dict[str, Any]:
     payload = {"event": req.event, "data": req.data}
     try:
         send_osc_json_to_max(payload)
+    except MaxQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc))
 
+    # handed to the sender thread; UDP gives no delivery confirmation
     return {
-        "status": "sent",
-        "message": f"Sent event '{req.event}' to Max",
+        "status": "queued",
+        "message": f"Queued event '{req.event}' for Max",
         "host": MAX_UDP_HOST,
         "port": MAX_UDP_PORT, 
     }
 
 
+@app.post("/bridge/notify-max/batch")
+def bridge_notify_max_batch(reqs: List[MaxNotifyRequest]) -> Dict[str, Any]:
+    """Send several events to Max at once; they are queued together (all or none) and go out bundled."""
+    try:
+        send_osc_json_to_max(*({"event": req.event, "data": req.data} for req in reqs))
+    except MaxQueueFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    return {
+        "status": "queued",
+        "message": f"Queued {len(reqs)} events for Max",
+        "host": MAX_UDP_HOST,
+        "port": MAX_UDP_PORT,
+    }
+
+
 @app.post("/export/midi")
 def export_midi(req: ExportMidiRequest) -> Dict[str, Any]:
     """Export given notes to MIDI file and (on Windows) open folder."""
@@ -586,6 +1780,10 @@ def export_midi(req: ExportMidiRequest) -> Dict[str, Any]:
     return {"status": "ok", "path": written}
 
 
+# everything above runs at import time (uvicorn workers, --reload, the CLI)
+_startup["import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
+
+
 def main():
     print("Melody Completion Tool")
     print("----------------------")
@@ -614,7 +1812,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
-
-
-
+    if "--profile-startup" in sys.argv[1:]:
+        # import-time breakdown and lifespan timing, each measured in a fresh interpreter
+        from startup_profile import main as profile_startup_main # type: ignore
+        profile_startup_main()
+    else:
+        main()
@@ -0,0 +1,189 @@
+"""
+Offline melody continuation engine (CPU only, no network).
+
+A variable-order Markov model over pitch intervals and rhythmic cells
+(inter-onset gap + duration) learned from the seed itself, conditioned on the
+chord list and `adventureness`. Output notes end exactly at `target_end`.
+Used as the "markov" generator backend, as LLM fallback and as instant draft.
+"""
+
+import random
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from midi_track_ctrl.note_seq import NoteSeq
+from midi_track_ctrl.smf import LOWEST_PITCH, midi_to_pitch
+
+MAX_ORDER = 3
+_EPS = 1e-6
+# every generated note lasts (and so advances the position by) at least this
+# long, whatever the seed's durations; MAX_NOTES bounds one call's output
+MIN_DURATION = 1 / 64
+MAX_NOTES = 4096
+
+_CHORD_RE = re.compile(r"^([A-Ga-g])([#b\-]?)(.*)$")
+_STEPS = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+Cell = Tuple[float, float]  # (gap before note, duration) in quarterLength
+
+
+def chord_pitch_classes(symbol: str) -> Optional[List[int]]:
+    """Pitch classes of a chord symbol ("Am", "F", "G7", "Bbmaj7", "C#dim"); None if unknown."""
+    match = _CHORD_RE.match(symbol.strip())
+    if not match:
+        return None
+    letter, accidental, quality = match.groups()
+    root = _STEPS[letter.upper()] + {"#": 1, "b": -1, "-": -1}.get(accidental, 0)
+    quality = quality.lower()
+    if quality.startswith("dim"):
+        intervals = [0, 3, 6]
+    elif quality.startswith("aug"):
+        intervals = [0, 4, 8]
+    elif quality.startswith("m") and not quality.startswith("maj"):
+        intervals = [0, 3, 7]
+    else:
+        intervals = [0, 4, 7]
+    if "maj7" in quality:
+        intervals.append(11)
+    elif "7" in quality:
+        intervals.append(10)
+    return [(root + i) % 12 for i in intervals]
+
+
+class _VariableOrderModel:
+    """Counts continuations for every context of length 0..MAX_ORDER and backs off."""
+
+    def __init__(self, sequence: Sequence[Any], max_order: int = MAX_ORDER) -> None:
+        self.max_order = max_order
+        self.table: Dict[Tuple[Any, ...], Counter] = defaultdict(Counter)
+        for i, symbol in enumerate(sequence):
+            for order in range(0, max_order + 1):
+                if i - order < 0:
+                    break
+                self.table[tuple(sequence[i - order:i])][symbol] += 1
+
+    def sample(self, history: Sequence[Any], rng: random.Random, flatten: float) -> Any:
+        for order in range(min(self.max_order, len(history)), -1, -1):
+            context = tuple(history[len(history) - order:]) if order else ()
+            counts = self.table.get(context)
+            if counts:
+                symbols = list(counts)
+                # flatten > 0 pushes the distribution towards uniform (more surprise)
+                weights = [counts[s] ** (1.0 - flatten) for s in symbols]
+                return rng.choices(symbols, weights=weights)[0]
+        raise ValueError("Empty model")
+
+
+def _chord_at(chords: List[Dict[str, Any]], position: float) -> Optional[List[int]]:
+    if not chords:
+        return None
+    ordered = sorted(chords, key=lambda c: float(c["start"]))
+    span = max(float(c["start"]) + float(c["duration"]) for c in ordered)
+    if span <= 0:
+        return None
+    position = position % span  # progression repeats past its end
+    for chord in ordered:
+        start = float(chord["start"])
+        if start - _EPS <= position < start + float(chord["duration"]) - _EPS:
+            return chord_pitch_classes(chord["symbol"])
+    return None
+
+
+def _nearest_with_pc(pitch: int, classes: Sequence[int]) -> int:
+    best = pitch
+    for offset in (0, -1, 1, -2, 2, -3, 3, -4, 4, -5, 5, -6, 6):
+        if (pitch + offset) % 12 in classes:
+            best = pitch + offset
+            break
+    return best
+
+
+def continue_melody(
+    original_notes: List[Dict[str, Any]],
+    end_time: float,
+    target_end: float,
+    adventureness: float,
+    chords: Optional[List[Dict[str, Any]]] = None,
+    rng_seed: Optional[int] = None,
+    seed: Optional[NoteSeq] = None,
+) -> List[Dict[str, Any]]:
+    """Generate new notes from `end_time` up to exactly `target_end` (quarterLength)."""
+    if target_end <= end_time:
+        raise ValueError("target_end must exceed end_time")
+    seq = (seed or NoteSeq.from_dicts(original_notes)).sorted()
+    if not len(seq):
+        raise ValueError("original_notes must contain at least one note.")
+
+    rng = random.Random(rng_seed)
+    risk = max(0.0, min(1.0, adventureness / 100.0))
+    chords = chords or []
+
+    pitches = list(seq.pitch)
+    starts = list(seq.start)
+    durations = list(seq.duration)
+
+    intervals = [b - a for a, b in zip(pitches, pitches[1:])] or [0]
+    cells: List[Cell] = []
+    for i, (start, dur) in enumerate(zip(starts, durations)):
+        prev_end = starts[i - 1] + durations[i - 1] if i else start
+        cells.append((round(max(0.0, start - prev_end), 6), round(max(dur, MIN_DURATION), 6)))
+
+    interval_model = _VariableOrderModel(intervals)
+    rhythm_model = _VariableOrderModel(cells)
+    seed_classes = sorted({p % 12 for p in pitches})
+    margin = 2 + int(round(risk * 7))
+    low, high = max(LOWEST_PITCH, min(pitches) - margin), min(127, max(pitches) + margin)
+
+    interval_history = list(intervals)
+    cell_history = list(cells)
+    pitch = pitches[-1]
+    pos = end_time
+    new_notes: List[Tuple[int, float, float]] = []
+
+    while pos < target_end - _EPS and len(new_notes) < MAX_NOTES:
+        gap, dur = rhythm_model.sample(cell_history, rng, flatten=0.6 * risk)
+        cell_history.append((gap, dur))
+        start = pos + gap
+        if start >= target_end - _EPS:
+            break
+        dur = min(dur, target_end - start)
+
+        if rng.random() < 0.25 * risk:
+            step = rng.choice([-7, -5, -4, -3, -2, -1, 1, 2, 3, 4, 5, 7])
+        else:
+            step = interval_model.sample(interval_history, rng, flatten=0.6 * risk)
+        interval_history.append(step)
+        candidate = pitch + step
+        if candidate < low or candidate > high:
+            candidate = pitch - step  # mirror back into range
+        candidate = max(low, min(high, candidate))
+
+        chord_classes = _chord_at(chords, start)
+        on_beat = abs(start - round(start)) < _EPS
+        if chord_classes and on_beat and rng.random() >= 0.5 * risk:
+            candidate = _nearest_with_pc(candidate, chord_classes)
+        elif rng.random() >= risk:
+            candidate = _nearest_with_pc(candidate, seed_classes)
+
+        pitch = max(low, min(high, candidate))
+        new_notes.append((pitch, round(start, 6), round(dur, 6)))
+        pos = start + dur
+
+    if not new_notes:
+        new_notes.append((pitch, round(end_time, 6), round(target_end - end_time, 6)))
+
+    # stretch the last note so the phrase ends exactly on target, and resolve it
+    last_pitch, last_start, _ = new_notes[-1]
+    final_chord = _chord_at(chords, last_start)
+    tonic = [final_chord[0]] if final_chord else [pitches[0] % 12]
+    new_notes[-1] = (
+        max(low, min(high, _nearest_with_pc(last_pitch, tonic))),
+        last_start,
+        round(target_end - last_start, 6),
+    )
+
+    return [
+        {"pitch": midi_to_pitch(p), "start": start, "duration": dur}
+        for p, start, dur in new_notes
+    ]
@@ -10,18 +10,39 @@ HTTP 端点（由 FastAPI 后端集成）：
 - GET /bridge/latest：获取最新的生成结果（供前端查询）
 - GET /bridge/status：获取桥接状态
 
+并发处理：接收线程只负责收包入队，由 worker 池调用后端；队列有上限，
+满时按 BRIDGE_OVERFLOW 策略处理：
+- drop_oldest（默认）：丢弃最早排队的请求
+- drop_newest：丢弃新到的请求
+- coalesce：同一音轨只保留最新一次捕获（队列仍满时丢弃最早的）
+每条回复都带 request_id（Max 发来的 request_id，或桥接自动编号）。
+超过一个 UDP 包的消息以 OSC /chunk 分片收发并自动重组（见 midi_track_ctrl/datagram.py）。
+也接受紧凑音符格式（OSC /notes、/notesb，见 midi_track_ctrl/note_wire.py），并用同一格式回复。
+发送 {"command": "stats"} 可取回队列深度 / 等待时间统计。
+
 运行方式：
     python bridge.py
+    BRIDGE_WORKERS=4 BRIDGE_QUEUE_SIZE=32 BRIDGE_OVERFLOW=coalesce python bridge.py
 """
 
+import itertools
 import json
+import os
 import socket
 import sys
 import threading
+import time
 import urllib.request
 import urllib.error
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from midi_track_ctrl.datagram import UDP_MAX_DATAGRAM, Reassembler, datagrams_for, send_all  # noqa: E402
+from midi_track_ctrl.event_log import get_logger  # noqa: E402
+from midi_track_ctrl.note_wire import decode_notes_message, encode_notes_message  # noqa: E402
 
 # 配置
 LISTEN_PORT = 7400  # 接收 Max 数据
@@ -30,20 +51,119 @@ MAX_HOST = "127.0.0.1"
 BACKEND_URL = "http://127.0.0.1:8000/complete"
 BUFFER_SIZE = 65536  # 64KB
 
+# 并发与背压
+WORKERS = int(os.getenv("BRIDGE_WORKERS", "4"))
+QUEUE_SIZE = int(os.getenv("BRIDGE_QUEUE_SIZE", "32"))
+OVERFLOW_POLICY = os.getenv("BRIDGE_OVERFLOW", "drop_oldest").lower()
+STATS_INTERVAL = float(os.getenv("BRIDGE_STATS_INTERVAL", "60"))  # 0 = 不打印
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+# 结构化日志（LOG_LEVEL=debug 时输出逐包跟踪）
+log = get_logger("bridge.m4l")
+
 # 全局状态（供 HTTP 端点查询）
 latest_result: Optional[Dict[str, Any]] = None
 latest_result_lock = threading.Lock()
 last_update_time: Optional[str] = None
 
 
-def send_to_max(sock: socket.socket, data: Dict[str, Any]) -> None:
-    """发送数据回 Max"""
+class Job(NamedTuple):
+    request_id: str
+    track: str
+    payload: Dict[str, Any]
+    enqueued_at: float
+    wire: Optional[str] = None  # compact note format of the request, None = JSON
+
+
+class WorkQueue:
+    """有界 FIFO 队列；put 返回被挤掉的任务，以便回复 Max。"""
+
+    def __init__(self, maxsize: int, policy: str) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}', expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self._items: Deque[Job] = deque()
+        self._cond = threading.Condition()
+        self._waits: Deque[float] = deque(maxlen=512)  # 最近的排队等待时间（秒）
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_depth = 0
+
+    def put(self, job: Job) -> List[Job]:
+        with self._cond:
+            self.enqueued += 1
+            if self.policy == "coalesce":
+                for index, queued in enumerate(self._items):
+                    if queued.track == job.track:
+                        # 还没开始处理的旧捕获直接被新捕获替换
+                        self._items[index] = job
+                        self.coalesced += 1
+                        return [queued]
+
+            discarded: List[Job] = []
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return [job]
+                discarded.append(self._items.popleft())
+
+            self._items.append(job)
+            self.max_depth = max(self.max_depth, len(self._items))
+            self._cond.notify()
+            return discarded
+
+    def get(self) -> Job:
+        with self._cond:
+            while not self._items:
+                self._cond.wait()
+            job = self._items.popleft()
+            self._waits.append(time.monotonic() - job.enqueued_at)
+            return job
+
+    def done(self, ok: bool) -> None:
+        with self._cond:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            waits = sorted(self._waits)
+            depth = len(self._items)
+        return {
+            "policy": self.policy,
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "wait_ms_mean": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))] * 1000, 2) if waits else 0.0,
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else 0.0,
+        }
+
+
+def send_to_max(sock: socket.socket, data: Dict[str, Any], wire: Optional[str] = None) -> None:
+    """发送数据回 Max（wire 为紧凑格式地址时优先用紧凑格式）"""
     try:
-        msg = json.dumps(data).encode("utf-8")
-        sock.sendto(msg, (MAX_HOST, SEND_PORT))
-        print(f"✓ Sent response to Max ({len(msg)} bytes)")
+        text = json.dumps(data)
+        datagrams = datagrams_for(text, text.encode("utf-8"))
+        if wire is not None:
+            packet = encode_notes_message(data, wire)
+            if len(packet) <= UDP_MAX_DATAGRAM:
+                datagrams = [packet]
+        send_all(sock, datagrams, (MAX_HOST, SEND_PORT))
+        log.debug("sent", bytes=sum(map(len, datagrams)), datagrams=len(datagrams), request_id=data.get("request_id"))
     except Exception as e:
-        print(f"✗ Failed to send to Max: {e}")
+        log.error("send_failed", error=str(e))
 
 
 def post_to_backend(payload: Dict[str, Any]) -> Dict[str, Any]:
@@ -83,53 +203,107 @@ def store_result(result: Dict[str, Any]) -> None:
         with urllib.request.urlopen(req, timeout=5) as response:
             response.read()
     except Exception as e:
-        print(f"⚠ Warning: Failed to notify backend: {e}")
+        log.warning("backend_notify_failed", error=str(e))
     
-    print(f"✓ Stored result for frontend (timestamp: {last_update_time})")
+    log.debug("result_stored", timestamp=last_update_time)
+
+
+def worker(sock: socket.socket, queue: WorkQueue) -> None:
+    """从队列取任务 → POST 到后端 → 存储 → 回复 Max"""
+    while True:
+        job = queue.get()
+        try:
+            log.debug("posting", request_id=job.request_id, track=job.track)
+            result = post_to_backend(job.payload)
+            log.info("completed", request_id=job.request_id, track=job.track,
+                     added_notes=len(result.get("added_notes", [])))
+
+            # 存储结果供前端查询
+            store_result(result)
+
+            # 返回给 Max
+            send_to_max(sock, {"request_id": job.request_id, **result}, job.wire)
+            queue.done(True)
+        except Exception as e:
+            log.error("request_failed", request_id=job.request_id, track=job.track, error=str(e))
+            send_to_max(sock, {"request_id": job.request_id, "error": str(e)}, job.wire)
+            queue.done(False)
+
+
+def report_stats(queue: WorkQueue) -> None:
+    while True:
+        time.sleep(STATS_INTERVAL)
+        log.info("queue_stats", **queue.stats())
 
 
 def main() -> None:
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.bind(("0.0.0.0", LISTEN_PORT))
+
+    queue = WorkQueue(QUEUE_SIZE, OVERFLOW_POLICY)
+    for _ in range(max(1, WORKERS)):
+        threading.Thread(target=worker, args=(sock, queue), daemon=True).start()
+    if STATS_INTERVAL > 0:
+        threading.Thread(target=report_stats, args=(queue,), daemon=True).start()
+    request_ids = itertools.count(1)
+    reassembler = Reassembler()
     
-    print(f"Bridge listening on UDP port {LISTEN_PORT}")
-    print(f"Will send responses to Max on port {SEND_PORT}")
-    print(f"Backend: {BACKEND_URL}")
-    print("Waiting for data from Max...\n")
+    log.info(
+        "listening",
+        port=LISTEN_PORT,
+        send_port=SEND_PORT,
+        backend=BACKEND_URL,
+        workers=max(1, WORKERS),
+        queue_size=queue.maxsize,
+        overflow=queue.policy,
+    )
     
     while True:
         try:
             data, addr = sock.recvfrom(BUFFER_SIZE)
-            msg = data.decode("utf-8")
-            print(f"← Received from {addr} ({len(data)} bytes)")
-            
-            payload = json.loads(msg)
-            print(f"  Notes: {len(payload.get('original_notes', []))}")
-            print(f"  Mood: {payload.get('mood')}, BPM: {payload.get('bpm')}")
-            
-            # POST 到后端
-            print("→ Posting to backend...")
-            result = post_to_backend(payload)
-            print(f"✓ Backend responded: {len(result.get('added_notes', []))} new notes")
-            
-            # 存储结果供前端查询
-            store_result(result)
-            
-            # 返回给 Max
-            send_to_max(sock, result)
-            print()
+            message = reassembler.feed_datagram(data)
+            if message is None:
+                continue  # waiting for the remaining chunks
+            compact = decode_notes_message(message)
+            wire = compact[0] if compact is not None else None
+            payload = compact[1] if compact is not None else json.loads(message.decode("utf-8"))
+
+            if payload.get("command") == "stats":
+                send_to_max(sock, {
+                    "request_id": payload.get("request_id"),
+                    "stats": queue.stats(),
+                    "reassembly": reassembler.stats(),
+                })
+                continue
+
+            request_id = str(payload.pop("request_id", None) or next(request_ids))
+            track = str(payload.pop("track", "default"))
+            log.debug(
+                "received",
+                request_id=request_id,
+                track=track,
+                source=f"{addr[0]}:{addr[1]}",
+                bytes=len(message),
+                notes=len(payload.get("original_notes", [])),
+                wire=wire or "json",
+            )
+
+            for discarded in queue.put(Job(request_id, track, payload, time.monotonic(), wire)):
+                reason = "superseded" if discarded.track == track and queue.policy == "coalesce" else "dropped"
+                log.warning("request_" + reason, request_id=discarded.request_id, policy=queue.policy)
+                send_to_max(sock, {"request_id": discarded.request_id, "error": f"Request {reason}"}, discarded.wire)
             
         except json.JSONDecodeError as e:
-            print(f"✗ JSON decode error: {e}")
+            log.warning("invalid_json", error=str(e))
             send_to_max(sock, {"error": f"Invalid JSON: {e}"})
-        except RuntimeError as e:
-            print(f"✗ {e}")
+        except ValueError as e:
+            log.warning("invalid_compact_message", error=str(e))
             send_to_max(sock, {"error": str(e)})
         except KeyboardInterrupt:
-            print("\nShutting down bridge...")
+            log.info("stopped", **queue.stats())
             break
         except Exception as e:
-            print(f"✗ Unexpected error: {e}")
+            log.error("unexpected_error", error=repr(e))
             send_to_max(sock, {"error": f"Bridge error: {e}"})
     
     sock.close()
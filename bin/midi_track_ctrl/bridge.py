@@ -1,38 +1,44 @@
 """
 UDP Bridge: Relays MIDI data from Max for Live (UDP port 7400) to FastAPI backend
 Captures note data and stores it via HTTP POST to /bridge/result
+Large clips arrive as OSC /chunk datagrams and are reassembled (datagram.py)
 """
 
 import socket
 import json
+import sys
 import threading
 import time
 import urllib.request
 import urllib.error
 from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from midi_track_ctrl.datagram import Reassembler, datagrams_for  # noqa: E402
+from midi_track_ctrl.event_log import get_logger  # noqa: E402
+from midi_track_ctrl.note_wire import decode_notes_message  # noqa: E402
+from midi_track_ctrl.udp_sender import UdpSender  # noqa: E402
 
 # Configuration
 LISTEN_PORT = 7400          # Port to receive from Max (UDP)
 SEND_PORT = 7401            # Port to send to Max (UDP)
 BACKEND_URL = "http://localhost:8000/bridge/result"
 BACKEND_POLL_URL = "http://localhost:8000/bridge/latest"
+RECV_BUFFER = 65535         # largest UDP datagram
 
 # State
 latest_result = None
 listening = False
 lock = threading.Lock()
+senders = {}                # port -> UdpSender, created on first send
+log = get_logger("bridge.relay")  # LOG_LEVEL=debug for per-packet traces
 
 
 def store_result(payload):
     """Send result to backend via HTTP POST"""
-    print(f"\n🔄 Attempting to store result in backend...")
-    print(f"   Payload keys: {list(payload.keys())}")
-    print(f"   Full track notes: {len(payload.get('full_track', []))}")
-    print(f"   Added notes: {len(payload.get('added_notes', []))}")
-    
     try:
         data = json.dumps(payload).encode('utf-8')
-        print(f"   Sending to: {BACKEND_URL}")
         req = urllib.request.Request(
             BACKEND_URL,
             data=data,
@@ -41,15 +47,14 @@ def store_result(payload):
         )
         with urllib.request.urlopen(req, timeout=5) as response:
             resp_data = response.read().decode('utf-8')
-            print(f"✅ SUCCESS! Stored {len(payload.get('added_notes', []))} notes in backend")
-            print(f"   Backend response: {resp_data}")
+            log.info("result_stored", added_notes=len(payload.get('added_notes', [])),
+                     full_track=len(payload.get('full_track', [])))
             return json.loads(resp_data)
     except urllib.error.URLError as e:
-        print(f"❌ Failed to POST to backend: {e}")
-        print(f"   URL: {BACKEND_URL}")
-        print(f"   Is backend running on port 8000?")
+        # usually: backend not running on port 8000
+        log.error("backend_unreachable", url=BACKEND_URL, error=str(e))
     except Exception as e:
-        print(f"❌ Error storing result: {e}")
+        log.error("store_failed", error=str(e))
     return None
 
 
@@ -59,22 +64,31 @@ def listen_udp():
     
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    reassembler = Reassembler()
     
     try:
         sock.bind(('127.0.0.1', LISTEN_PORT))
-        print(f"📡 Listening on UDP port {LISTEN_PORT}")
+        log.info("listening", port=LISTEN_PORT)
         
         while True:
             try:
-                data, addr = sock.recvfrom(8192)
-                print(f"\n📨 ========== NEW UDP PACKET ===========")
-                print(f"   Received {len(data)} bytes from {addr}")
-                print(f"   Raw data preview: {data[:100]}...")
+                data, addr = sock.recvfrom(RECV_BUFFER)
+                log.debug("datagram", bytes=len(data), source=f"{addr[0]}:{addr[1]}")
+                message = reassembler.feed_datagram(data)
+                if message is None:
+                    continue  # waiting for the remaining chunks
+                if message is not data:
+                    log.debug("reassembled", bytes=len(message), **reassembler.stats())
+                data = message
                 
                 try:
                     text = data.decode('utf-8', errors='replace')
+                    compact = decode_notes_message(data)
                     try:
-                        payload = json.loads(text)
+                        if compact is not None:
+                            payload = compact[1]
+                        else:
+                            payload = json.loads(text)
                     except json.JSONDecodeError:
                         # Some Max patches prepend symbols like "send" or "send,s".
                         # Strategy: locate the first "{" and last "}" and parse that slice.
@@ -82,42 +96,35 @@ def listen_udp():
                         rbrace = text.rfind('}')
                         if lbrace != -1 and rbrace != -1 and rbrace > lbrace:
                             candidate = text[lbrace:rbrace+1]
-                            print("ℹ Detected prefix before JSON, retrying parse on braces slice")
                             payload = json.loads(candidate)
                         else:
                             raise
 
-                    print(f"✅ JSON parsed successfully")
-                    print(f"   Keys found: {list(payload.keys())}")
+                    log.debug("message", bytes=len(data), keys=sorted(payload),
+                              wire=compact[0] if compact is not None else "json")
 
                     # Validate payload structure
                     if 'full_track' in payload and 'added_notes' in payload:
-                        print(f"✅ Payload structure valid")
                         with lock:
                             latest_result = payload
                         
                         # Store in backend
                         store_result(payload)
                     else:
-                        print(f"❌ Invalid payload structure")
-                        print(f"   Expected keys: ['full_track', 'added_notes']")
-                        print(f"   Found keys: {list(payload.keys())}")
+                        log.warning("invalid_payload", expected="full_track,added_notes", keys=sorted(payload))
                         
                 except json.JSONDecodeError as e:
-                    print(f"❌ Failed to parse JSON: {e}")
-                    print(f"   Data: {text[:200]}")
+                    log.warning("invalid_json", error=str(e), bytes=len(data))
                 except Exception as e:
-                    print(f"❌ Error processing payload: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    log.error("payload_failed", error=repr(e))
                     
             except socket.timeout:
                 continue
             except Exception as e:
-                print(f"⚠ Error receiving: {e}")
+                log.warning("receive_failed", error=str(e))
                 
     except Exception as e:
-        print(f"✗ Failed to bind UDP socket: {e}")
+        log.error("bind_failed", port=LISTEN_PORT, error=str(e))
     finally:
         sock.close()
 
@@ -125,12 +132,16 @@ def listen_udp():
 def send_udp(message, port=SEND_PORT):
     """Send UDP message to Max on specified port"""
     try:
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.sendto(json.dumps(message).encode('utf-8'), ('127.0.0.1', port))
-        sock.close()
-        print(f"📤 Sent to port {port}: {message}")
+        text = json.dumps(message)
+        with lock:
+            sender = senders.get(port)
+            if sender is None:
+                sender = senders[port] = UdpSender('127.0.0.1', port)
+        if not sender.send_many(datagrams_for(text, text.encode('utf-8')), osc=False):
+            raise RuntimeError("send queue full")
+        log.debug("sent", port=port, bytes=len(text))
     except Exception as e:
-        print(f"✗ Failed to send UDP: {e}")
+        log.error("send_failed", port=port, error=str(e))
 
 
 def start_listening_thread():
@@ -141,11 +152,7 @@ def start_listening_thread():
 
 
 if __name__ == '__main__':
-    print("🎹 MIDI Bridge (Max for Live ↔ FastAPI Backend)")
-    print(f"   Listening on UDP {LISTEN_PORT}")
-    print(f"   Sending to UDP {SEND_PORT}")
-    print(f"   Backend: {BACKEND_URL}")
-    print()
+    log.info("starting", listen_port=LISTEN_PORT, send_port=SEND_PORT, backend=BACKEND_URL)
     
     # Start listener
     start_listening_thread()
@@ -155,4 +162,4 @@ if __name__ == '__main__':
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        print("\n✓ Bridge stopped")
+        log.info("stopped")
@@ -0,0 +1,283 @@
+"""
+OSC framing plus chunking / reassembly for UDP messages to and from Max.
+
+A message that does not fit in one datagram (UDP_MAX_DATAGRAM bytes) is split
+into OSC "/chunk" messages: (message id: str, index: int, total: int, piece: str).
+Pieces are cut on UTF-8 boundaries so every piece is a valid OSC string. Max's
+[udpsend] behind a [prepend send] delivers them as address "send" with "/chunk"
+as the first argument; both forms are accepted.
+
+The receiver keeps partial messages in a bounded buffer: incomplete messages
+expire after `timeout` seconds, and the oldest are evicted once `max_messages`
+or `max_bytes` is exceeded.
+"""
+
+import itertools
+import os
+import struct
+import time
+from collections import OrderedDict, deque
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+UDP_MAX_DATAGRAM = int(os.getenv("UDP_MAX_DATAGRAM", "8192"))
+CHUNK_ADDRESS = "/chunk"
+MAX_CHUNKS = 4096
+_CHUNK_OVERHEAD = 64  # address, type tags, id and two int32s
+
+OscArg = Union[str, int, float, bytes]
+
+_INT32 = struct.Struct(">i")
+_FLOAT32 = struct.Struct(">f")
+
+_ids = itertools.count(1)
+_id_prefix = f"{os.getpid():x}"
+
+
+def _pad4(data: bytes) -> bytes:
+    pad = (4 - (len(data) % 4)) % 4
+    return data + (b"\0" * pad)
+
+
+def osc_string(value: str) -> bytes:
+    return _pad4(value.encode("utf-8") + b"\0")
+
+
+def build_osc_message(address: str, *args: OscArg) -> bytes:
+    """Build an OSC message; str -> s, int -> i, float -> f, bytes -> b."""
+    if not address.startswith("/"):
+        address = "/" + address
+    tags = [","]
+    body: List[bytes] = []
+    for arg in args:
+        if isinstance(arg, str):
+            tags.append("s")
+            body.append(osc_string(arg))
+        elif isinstance(arg, bool) or not isinstance(arg, (int, float, bytes)):
+            raise TypeError(f"Unsupported OSC argument: {arg!r}")
+        elif isinstance(arg, int):
+            tags.append("i")
+            body.append(_INT32.pack(arg))
+        elif isinstance(arg, float):
+            tags.append("f")
+            body.append(_FLOAT32.pack(arg))
+        else:
+            tags.append("b")
+            body.append(_INT32.pack(len(arg)) + _pad4(arg))
+    return osc_string(address) + osc_string("".join(tags)) + b"".join(body)
+
+
+def _read_osc_string(data: bytes, pos: int) -> Tuple[str, int]:
+    end = data.index(b"\0", pos)
+    return data[pos:end].decode("utf-8"), (end + 4) & ~3
+
+
+def parse_osc_message(data: bytes) -> Tuple[str, List[OscArg]]:
+    """Parse an OSC message into (address, args); raises ValueError if malformed."""
+    try:
+        address, pos = _read_osc_string(data, 0)
+        if not address.startswith("/") and address != "send":
+            raise ValueError("Not an OSC message")
+        if pos >= len(data):
+            return address, []
+        tags, pos = _read_osc_string(data, pos)
+        if not tags.startswith(","):
+            raise ValueError("Missing OSC type tags")
+        args: List[OscArg] = []
+        for tag, run in groupby(tags[1:]):
+            count = len(list(run))
+            if tag in "if":
+                # runs of numeric args (e.g. note records) unpack in one call
+                args.extend(struct.unpack_from(f">{count}{tag}", data, pos))
+                pos += 4 * count
+                continue
+            for _ in range(count):
+                if tag == "s":
+                    value, pos = _read_osc_string(data, pos)
+                    args.append(value)
+                elif tag == "b":
+                    (size,) = _INT32.unpack_from(data, pos)
+                    pos += 4
+                    args.append(data[pos:pos + size])
+                    pos += (size + 3) & ~3
+                else:
+                    raise ValueError(f"Unsupported OSC type tag '{tag}'")
+        return address, args
+    except (struct.error, UnicodeDecodeError) as exc:
+        raise ValueError(f"Malformed OSC message: {exc}") from exc
+
+
+def _split_utf8(data: bytes, size: int) -> List[bytes]:
+    pieces: List[bytes] = []
+    pos = 0
+    while pos < len(data):
+        end = min(pos + size, len(data))
+        while end < len(data) and end > pos + 1 and data[end] & 0xC0 == 0x80:
+            end -= 1  # never cut inside a multi-byte character
+        pieces.append(data[pos:end])
+        pos = end
+    return pieces
+
+
+def new_message_id() -> str:
+    return f"{_id_prefix}-{next(_ids):x}"
+
+
+def chunk_message(
+    text: str,
+    max_datagram: int = UDP_MAX_DATAGRAM,
+    message_id: Optional[str] = None,
+) -> List[bytes]:
+    """Split `text` into OSC /chunk datagrams of at most `max_datagram` bytes."""
+    message_id = message_id or new_message_id()
+    size = max(16, max_datagram - _CHUNK_OVERHEAD - len(message_id))
+    pieces = _split_utf8(text.encode("utf-8"), size) or [b""]
+    if len(pieces) > MAX_CHUNKS:
+        raise ValueError(f"Message too large: {len(pieces)} chunks (max {MAX_CHUNKS})")
+    total = len(pieces)
+    return [
+        build_osc_message(CHUNK_ADDRESS, message_id, index, total, piece.decode("utf-8"))
+        for index, piece in enumerate(pieces)
+    ]
+
+
+def datagrams_for(text: str, packet: bytes, max_datagram: int = UDP_MAX_DATAGRAM) -> List[bytes]:
+    """`packet` as is when it fits in one datagram, otherwise `text` as /chunk datagrams."""
+    if len(packet) <= max_datagram:
+        return [packet]
+    return chunk_message(text, max_datagram)
+
+
+def osc_json_datagrams(text: str, address: str = "/json", max_datagram: int = UDP_MAX_DATAGRAM) -> List[bytes]:
+    return datagrams_for(text, build_osc_message(address, text), max_datagram)
+
+
+def as_chunk(data: bytes) -> Optional[Tuple[str, int, int, str]]:
+    """Return (message id, index, total, piece) if `data` is a /chunk datagram."""
+    if not data.startswith((b"/chunk\0", b"send\0", b"/send\0")):
+        return None
+    try:
+        address, args = parse_osc_message(data)
+    except ValueError:
+        return None
+    if address != CHUNK_ADDRESS:
+        if not args or args[0] != CHUNK_ADDRESS:
+            return None
+        args = args[1:]  # [prepend send] in the Max patch
+    if len(args) != 4:
+        return None
+    message_id, index, total, piece = args
+    if isinstance(index, float):
+        index = int(index)
+    if isinstance(total, float):
+        total = int(total)
+    if not isinstance(index, int) or not isinstance(total, int) or not isinstance(piece, str):
+        return None
+    return str(message_id), index, total, piece
+
+
+class _Partial:
+    __slots__ = ("total", "pieces", "size", "first_seen")
+
+    def __init__(self, total: int, now: float) -> None:
+        self.total = total
+        self.pieces: Dict[int, str] = {}
+        self.size = 0
+        self.first_seen = now
+
+
+class Reassembler:
+    def __init__(
+        self,
+        timeout: float = 5.0,
+        max_messages: int = 64,
+        max_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._partial: "OrderedDict[str, _Partial]" = OrderedDict()
+        self._recent: "deque[str]" = deque(maxlen=max_messages)  # completed ids, drops late duplicates
+        self._bytes = 0
+        self.completed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def feed(
+        self,
+        message_id: str,
+        index: int,
+        total: int,
+        piece: str,
+        now: Optional[float] = None,
+    ) -> Optional[str]:
+        """Add one chunk; returns the full text once every chunk has arrived."""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        if not 0 < total <= MAX_CHUNKS or not 0 <= index < total:
+            self.rejected += 1
+            return None
+        if total == 1:
+            self.completed += 1
+            return piece
+
+        partial = self._partial.get(message_id)
+        if partial is None:
+            if message_id in self._recent:
+                return None
+            partial = self._partial[message_id] = _Partial(total, now)
+        elif partial.total != total:
+            self.rejected += 1
+            return None
+        if index in partial.pieces:
+            return None  # duplicate datagram
+        partial.pieces[index] = piece
+        partial.size += len(piece)
+        self._bytes += len(piece)
+
+        if len(partial.pieces) == total:
+            del self._partial[message_id]
+            self._bytes -= partial.size
+            self._recent.append(message_id)
+            self.completed += 1
+            return "".join(partial.pieces[i] for i in range(total))
+
+        while self._partial and (len(self._partial) > self.max_messages or self._bytes > self.max_bytes):
+            _, oldest = self._partial.popitem(last=False)
+            self._bytes -= oldest.size
+            self.evicted += 1
+        return None
+
+    def feed_datagram(self, data: bytes, now: Optional[float] = None) -> Optional[bytes]:
+        """Return the complete message bytes: `data` itself unless it is a /chunk datagram."""
+        chunk = as_chunk(data)
+        if chunk is None:
+            return data
+        text = self.feed(*chunk, now=now)
+        return text.encode("utf-8") if text is not None else None
+
+    def expire(self, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        while self._partial:
+            message_id, oldest = next(iter(self._partial.items()))
+            if now - oldest.first_seen < self.timeout:
+                break
+            del self._partial[message_id]
+            self._bytes -= oldest.size
+            self.expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._partial),
+            "pending_bytes": self._bytes,
+            "completed": self.completed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+        }
+
+
+def send_all(sock: Any, datagrams: Sequence[bytes], address: Tuple[str, int]) -> None:
+    for datagram in datagrams:
+        sock.sendto(datagram, address)
@@ -0,0 +1,198 @@
+"""
+Leveled, structured event logging with an in-memory ring buffer.
+
+An event is (level, component, name, fields). Events at or above the buffer
+level go into a bounded deque (the backend serves it at /debug/events); events
+at or above the console level go to the stdlib `logging` module through a
+QueueHandler, so the terminal write happens on a listener thread rather than on
+the request or packet path. Below both levels a call costs one comparison, so
+per-packet DEBUG tracing can stay in the code and be switched on when needed.
+
+Environment:
+- LOG_LEVEL        console level (default INFO)
+- EVENT_LOG_LEVEL  ring buffer level (default INFO; DEBUG records per-packet traces)
+- EVENT_LOG_SIZE   ring buffer capacity (default 2000 events)
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+
+def parse_level(name: Optional[str], default: int = logging.INFO) -> int:
+    if not name:
+        return default
+    try:
+        return LEVELS[name.strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown log level '{name}', expected one of {sorted(LEVELS, key=LEVELS.get)}") from None
+
+
+def _logfmt_value(value: Any) -> str:
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return '"' + text.replace('"', '\\"') + '"'
+    return text
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """component event key=value ... (logfmt-style fields)."""
+    fields = " ".join(
+        f"{k}={_logfmt_value(v)}" for k, v in event.items()
+        if k not in ("seq", "ts", "level", "component", "event")
+    )
+    head = f"{event['component']} {event['event']}"
+    return f"{head} {fields}" if fields else head
+
+
+class EventLog:
+    def __init__(
+        self,
+        capacity: int = 2000,
+        level: int = logging.INFO,
+        console_level: int = logging.INFO,
+        logger: Optional[logging.Logger] = None,
+    ) -> None:
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self._seq = itertools.count(1)
+        self._logger = logger or logging.getLogger("melody")
+        self.level = level
+        self.console_level = console_level
+        self._min = min(level, console_level)
+        self.recorded = 0
+
+    def set_levels(self, level: Optional[int] = None, console_level: Optional[int] = None) -> None:
+        if level is not None:
+            self.level = level
+        if console_level is not None:
+            self.console_level = console_level
+        self._min = min(self.level, self.console_level)
+
+    def enabled(self, level: int) -> bool:
+        return level >= self._min
+
+    def emit(self, level: int, component: str, event: str, fields: Dict[str, Any]) -> None:
+        if level < self._min:
+            return
+        record = {
+            "seq": next(self._seq),
+            "ts": time.time(),
+            "level": logging.getLevelName(level).lower(),
+            "component": component,
+            "event": event,
+            **fields,
+        }
+        if level >= self.level:
+            self._events.append(record)  # deque append is atomic; no lock on the hot path
+            self.recorded += 1
+        if level >= self.console_level:
+            self._logger.log(level, "%s", format_event(record))
+
+    def query(
+        self,
+        since: int = 0,
+        level: Optional[int] = None,
+        component: Optional[str] = None,
+        event: Optional[str] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """Events newer than `since` (a seq number), oldest first, at most the last `limit`."""
+        out = []
+        for record in list(self._events):
+            if record["seq"] <= since:
+                continue
+            if level is not None and LEVELS[record["level"]] < level:
+                continue
+            if component is not None and not record["component"].startswith(component):
+                continue
+            if event is not None and record["event"] != event:
+                continue
+            out.append(record)
+        return out[-limit:] if limit > 0 else out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "level": logging.getLevelName(self.level).lower(),
+            "console_level": logging.getLevelName(self.console_level).lower(),
+            "capacity": self._events.maxlen,
+            "buffered": len(self._events),
+            "recorded": self.recorded,
+        }
+
+
+class EventLogger:
+    """Per-component handle: log.info("capture", notes=12)."""
+
+    __slots__ = ("log", "component")
+
+    def __init__(self, log: EventLog, component: str) -> None:
+        self.log = log
+        self.component = component
+
+    def enabled(self, level: int) -> bool:
+        return self.log.enabled(level)
+
+    def debug(self, event: str, **fields: Any) -> None:
+        self.log.emit(logging.DEBUG, self.component, event, fields)
+
+    def info(self, event: str, **fields: Any) -> None:
+        self.log.emit(logging.INFO, self.component, event, fields)
+
+    def warning(self, event: str, **fields: Any) -> None:
+        self.log.emit(logging.WARNING, self.component, event, fields)
+
+    def error(self, event: str, **fields: Any) -> None:
+        self.log.emit(logging.ERROR, self.component, event, fields)
+
+
+_default: Optional[EventLog] = None
+_default_lock = threading.Lock()
+
+
+def _console_logger() -> logging.Logger:
+    """The "melody" logger, writing to stderr from a background listener thread."""
+    logger = logging.getLogger("melody")
+    logger.setLevel(logging.DEBUG)  # EventLog does the level filtering
+    logger.propagate = False
+    records: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s"))
+    listener = logging.handlers.QueueListener(records, handler)
+    listener.start()
+    atexit.register(listener.stop)  # flush what is still queued
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    return logger
+
+
+def get_event_log() -> EventLog:
+    """The process-wide event log, configured from the environment on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = EventLog(
+                    capacity=int(os.getenv("EVENT_LOG_SIZE", "2000")),
+                    level=parse_level(os.getenv("EVENT_LOG_LEVEL")),
+                    console_level=parse_level(os.getenv("LOG_LEVEL")),
+                    logger=_console_logger(),
+                )
+    return _default
+
+
+def get_logger(component: str) -> EventLogger:
+    return EventLogger(get_event_log(), component)
@@ -1,7 +1,24 @@
-from music21 import note, stream, duration
+from midi_track_ctrl.smf import encode_smf, pitch_to_midi, use_music21, write_smf
 
 
 def write_melody(original_notes, new_notes, output_path: str):
+    if use_music21():
+        return _write_melody_music21(original_notes, new_notes, output_path)
+
+    # notes are laid out back to back, as the music21 Stream.append version did
+    events = []
+    offset = 0.0
+    for n in original_notes + new_notes:
+        dur = float(n["duration"])
+        events.append((pitch_to_midi(n["pitch"]), offset, dur, 80))
+        offset += dur
+
+    write_smf(encode_smf(events), output_path)
+
+
+def _write_melody_music21(original_notes, new_notes, output_path: str):
+    from music21 import note, stream, duration
+
     s = stream.Stream()
 
     for n in original_notes + new_notes:
@@ -1,7 +1,77 @@
-from music21 import converter, note, chord
+import os
+import threading
+from collections import OrderedDict
 
+from midi_track_ctrl.smf import midi_to_pitch, read_notes, use_music21_reader
+
+# Parsed-file cache: (path, track, channel) -> ((mtime_ns, size), result)
+_PARSE_CACHE_SIZE = int(os.getenv("MIDI_PARSE_CACHE_SIZE", "64"))
+_parse_cache = OrderedDict()
+_parse_lock = threading.Lock()
+
+
+def file_stamp(midi_path: str):
+    """(mtime_ns, size) of a file; changes whenever the file is rewritten."""
+    st = os.stat(midi_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def cached_read_melody(midi_path: str, track=None, channel=None):
+    """read_melody memoised on path + mtime + size; returns fresh note dicts per call."""
+    key = (os.path.abspath(midi_path), track, channel)
+    stamp = file_stamp(midi_path)
+    with _parse_lock:
+        entry = _parse_cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            _parse_cache.move_to_end(key)
+            notes, end, tempo = entry[1]
+            return [dict(n) for n in notes], end, tempo
+
+    result = read_melody(midi_path, track=track, channel=channel)
+    with _parse_lock:
+        _parse_cache[key] = (stamp, result)
+        _parse_cache.move_to_end(key)
+        while len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    notes, end, tempo = result
+    return [dict(n) for n in notes], end, tempo
+
+
+def read_melody(midi_path: str, track=None, channel=None):
+    """Return (notes, end, tempo) with tick-accurate starts; chords collapse to their top note."""
+    if use_music21_reader():
+        return _read_melody_music21(midi_path)
+
+    tracks = [track] if track is not None else None
+    channels = [channel] if channel is not None else None
+    header, tempo, raw_notes = read_notes(midi_path, tracks=tracks, channels=channels)
+    ppq = float(header.ppq)
+
+    # raw notes are sorted by (start, pitch), so the last one per onset is the top note
+    top_notes = {}
+    for n in raw_notes:
+        top_notes[n.start] = n
+
+    notes = []
+    end = 0.0
+    for n in top_notes.values():
+        start = n.start / ppq
+        dur = n.duration / ppq
+        notes.append(
+            {
+                "pitch": midi_to_pitch(n.pitch),
+                "start": start,
+                "duration": dur,
+            }
+        )
+        end = max(end, start + dur)
+
+    return notes, end, tempo
+
+
+def _read_melody_music21(midi_path: str):
+    from music21 import converter, note, chord
 
-def read_melody(midi_path: str):
     score = converter.parse(midi_path)
 
     notes = []
@@ -34,4 +104,3 @@ def read_melody(midi_path: str):
 
     tempo = score.metronomeMarkBoundaries()[0][2].number
     return notes, current_offset, tempo
-
@@ -0,0 +1,163 @@
+"""
+Compact columnar note container.
+
+Holds MIDI pitch numbers and quarterLength start/duration in flat arrays so
+sorting, end time and rhythm statistics run as single C-level passes instead
+of per-dict Python loops. Original pitch spellings are kept alongside so
+conversion back to note dicts / payloads is lossless.
+"""
+
+import struct
+from array import array
+from collections import Counter
+from itertools import islice
+from operator import add, le, lt
+from typing import Any, Dict, Iterable, List, Optional
+
+from midi_track_ctrl.smf import NoteArrays, midi_to_pitch, pitch_to_midi
+
+_HEADER = struct.Struct("<I")
+
+
+class NoteSeq:
+    __slots__ = ("pitch", "start", "duration", "names")
+
+    def __init__(
+        self,
+        pitch: "array[int]",
+        start: "array[float]",
+        duration: "array[float]",
+        names: Optional[List[str]] = None,
+    ) -> None:
+        if not len(pitch) == len(start) == len(duration):
+            raise ValueError("NoteSeq columns must have equal length")
+        self.pitch = pitch
+        self.start = start
+        self.duration = duration
+        self.names = names
+
+    # --- construction ---------------------------------------------------------
+
+    @classmethod
+    def from_dicts(cls, notes: Iterable[Dict[str, Any]]) -> "NoteSeq":
+        notes = list(notes)
+        names = [n["pitch"] for n in notes]
+        return cls(
+            array("B", map(pitch_to_midi, names)),
+            array("d", [n["start"] for n in notes]),
+            array("d", [n["duration"] for n in notes]),
+            names,
+        )
+
+    @classmethod
+    def from_payloads(cls, payloads: Iterable[Any]) -> "NoteSeq":
+        """Build from NotePayload-like objects without a model_dump round trip."""
+        payloads = list(payloads)
+        names = [p.pitch for p in payloads]
+        return cls(
+            array("B", map(pitch_to_midi, names)),
+            array("d", [p.start for p in payloads]),
+            array("d", [p.duration for p in payloads]),
+            names,
+        )
+
+    @classmethod
+    def from_note_arrays(cls, arrays: NoteArrays) -> "NoteSeq":
+        ppq = float(arrays.ppq)
+        return cls(
+            array("B", arrays.pitch),
+            array("d", (t / ppq for t in arrays.start)),
+            array("d", (t / ppq for t in arrays.duration)),
+        )
+
+    # --- queries ----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.pitch)
+
+    def pitch_names(self) -> List[str]:
+        if self.names is not None:
+            return self.names
+        return [midi_to_pitch(p) for p in self.pitch]
+
+    def sorted(self) -> "NoteSeq":
+        """Order by (start, pitch); returns self when already ordered."""
+        start = self.start
+        if all(map(lt, start, start[1:])):
+            return self  # strictly increasing onsets: nothing to reorder
+        keys = list(zip(start, self.pitch))
+        if all(map(le, keys, islice(keys, 1, None))):
+            return self
+        order = [i for _, _, i in sorted(zip(start, self.pitch, range(len(keys))))]
+        names = self.names
+        return NoteSeq(
+            array("B", (self.pitch[i] for i in order)),
+            array("d", (self.start[i] for i in order)),
+            array("d", (self.duration[i] for i in order)),
+            [names[i] for i in order] if names is not None else None,
+        )
+
+    def end_time(self) -> float:
+        if not self.pitch:
+            return 0.0
+        return max(map(add, self.start, self.duration))
+
+    def duration_histogram(self) -> Dict[float, int]:
+        return dict(Counter(self.duration))
+
+    def unique_durations(self) -> List[float]:
+        return sorted(set(self.duration))
+
+    def mean_duration(self) -> float:
+        return sum(self.duration) / len(self.duration) if self.duration else 0.0
+
+    # --- conversion -------------------------------------------------------------
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [
+            {"pitch": name, "start": start, "duration": dur}
+            for name, start, dur in zip(self.pitch_names(), self.start, self.duration)
+        ]
+
+    def to_payloads(self, payload_cls: Any) -> List[Any]:
+        """Build payload models with model_construct; the data is already validated."""
+        construct = payload_cls.model_construct
+        return [
+            construct(pitch=name, start=start, duration=dur)
+            for name, start, dur in zip(self.pitch_names(), self.start, self.duration)
+        ]
+
+    def to_text(self) -> str:
+        """One "PITCH START DURATION" line per note, in stored order."""
+        return "\n".join(map("%s %r %r".__mod__, zip(self.pitch_names(), self.start, self.duration)))
+
+    def to_bytes(self) -> bytes:
+        """Pack as count + pitch bytes + start doubles + duration doubles (spellings dropped)."""
+        return (
+            _HEADER.pack(len(self.pitch))
+            + self.pitch.tobytes()
+            + _le(self.start).tobytes()
+            + _le(self.duration).tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "NoteSeq":
+        (count,) = _HEADER.unpack_from(data)
+        pos = _HEADER.size
+        pitch = array("B", data[pos:pos + count])
+        pos += count
+        start = array("d", data[pos:pos + 8 * count])
+        pos += 8 * count
+        duration = array("d", data[pos:pos + 8 * count])
+        if len(start) != count or len(duration) != count:
+            raise ValueError("Truncated NoteSeq payload")
+        return cls(pitch, _le(start), _le(duration))
+
+
+def _le(values: "array[float]") -> "array[float]":
+    """array.tobytes is native-endian; the wire format is little-endian."""
+    if struct.pack("=H", 1) == struct.pack("<H", 1):
+        return values
+    swapped = array("d", values)
+    swapped.byteswap()
+    return swapped
@@ -0,0 +1,185 @@
+"""
+Compact note encoding for traffic between backend, bridge and Max.
+
+Instead of JSON text with pitch names and float strings, note lists travel as
+(MIDI number, start ticks, duration ticks, velocity) with times in fixed-point
+ticks (WIRE_PPQ per quarter note). Two OSC framings carry the same data:
+
+- "/notes" (typed int args, easy to unpack in Max JS):
+    i version, i ppq, then per note list: s key, i count, count * (i pitch,
+    i start, i duration, i velocity); finally s <JSON of the remaining fields>
+- "/notesb" (one packed blob, smallest):
+    u8 version, u16 ppq, u8 lists, per list: u8 key length, key, u32 count,
+    count * (u8 pitch, u8 velocity, u32 start, u32 duration); then the JSON
+    of the remaining fields
+
+The leading version byte / int is WIRE_VERSION; decoders reject others, and
+anything that is not one of these messages is left to the JSON path.
+"""
+
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+from midi_track_ctrl.datagram import build_osc_message, osc_string, parse_osc_message
+from midi_track_ctrl.smf import DEFAULT_VELOCITY, LOWEST_PITCH, midi_to_pitch, pitch_to_midi
+
+WIRE_VERSION = 1
+WIRE_PPQ = 480
+NOTES_ADDRESS = "/notes"
+NOTES_BLOB_ADDRESS = "/notesb"
+NOTE_KEYS = ("original_notes", "full_track", "added_notes")
+
+_BLOB_HEADER = struct.Struct(">BHB")
+_BLOB_RECORD = struct.Struct(">BBII")
+_COUNT = struct.Struct(">I")
+
+NoteRecord = Tuple[int, int, int, int]  # (pitch, start ticks, duration ticks, velocity)
+
+_PITCH_NAMES = [midi_to_pitch(p) if p >= LOWEST_PITCH else "" for p in range(128)]
+
+
+def _note_records(notes: List[Dict[str, Any]], ppq: int) -> List[NoteRecord]:
+    records: List[NoteRecord] = []
+    for n in notes:
+        pitch = n["pitch"]
+        records.append((
+            pitch if isinstance(pitch, int) else pitch_to_midi(pitch),
+            int(round(float(n["start"]) * ppq)),
+            int(round(float(n["duration"]) * ppq)),
+            int(n.get("velocity") or DEFAULT_VELOCITY),
+        ))
+    return records
+
+
+def _note_dicts(records: List[NoteRecord], ppq: int) -> List[Dict[str, Any]]:
+    scale = float(ppq)
+    names = _PITCH_NAMES
+    if any(pitch & 0x7F < LOWEST_PITCH for pitch, _, _, _ in records):
+        raise ValueError(f"Note below C0 (MIDI {LOWEST_PITCH})")
+    return [
+        {"pitch": names[pitch & 0x7F], "start": start / scale, "duration": dur / scale, "velocity": velocity}
+        for pitch, start, dur, velocity in records
+    ]
+
+
+def _split(payload: Dict[str, Any]) -> Tuple[List[Tuple[str, List[Dict[str, Any]]]], Dict[str, Any]]:
+    lists = [(key, payload[key]) for key in NOTE_KEYS if isinstance(payload.get(key), list)]
+    meta = {k: v for k, v in payload.items() if k not in dict(lists)}
+    return lists, meta
+
+
+def encode_notes_osc(payload: Dict[str, Any], ppq: int = WIRE_PPQ) -> bytes:
+    """Encode a payload's note lists as an OSC "/notes" message with typed int args."""
+    lists, meta = _split(payload)
+    # same bytes as build_osc_message(NOTES_ADDRESS, *args), packed per list
+    tags = ["ii"]
+    body = [struct.pack(">ii", WIRE_VERSION, ppq)]
+    for key, notes in lists:
+        flat = [v for record in _note_records(notes, ppq) for v in record]
+        tags.append("si" + "i" * len(flat))
+        body.append(osc_string(key))
+        body.append(struct.pack(f">i{len(flat)}i", len(flat) // 4, *flat))
+    tags.append("s")
+    body.append(osc_string(json.dumps(meta)))
+    return osc_string(NOTES_ADDRESS) + osc_string("," + "".join(tags)) + b"".join(body)
+
+
+def encode_notes_blob(payload: Dict[str, Any], ppq: int = WIRE_PPQ) -> bytes:
+    """Pack a payload's note lists into the binary blob layout (no OSC framing)."""
+    lists, meta = _split(payload)
+    out = bytearray(_BLOB_HEADER.pack(WIRE_VERSION, ppq, len(lists)))
+    pack_record = _BLOB_RECORD.pack
+    for key, notes in lists:
+        name = key.encode("ascii")
+        records = _note_records(notes, ppq)
+        out.append(len(name))
+        out += name
+        out += _COUNT.pack(len(records))
+        for pitch, start, dur, velocity in records:
+            out += pack_record(pitch, velocity, start, dur)
+    out += json.dumps(meta).encode("utf-8")
+    return bytes(out)
+
+
+def decode_notes_blob(blob: bytes) -> Dict[str, Any]:
+    version, ppq, count = _BLOB_HEADER.unpack_from(blob)
+    if version != WIRE_VERSION:
+        raise ValueError(f"Unsupported note wire version {version}")
+    pos = _BLOB_HEADER.size
+    payload: Dict[str, Any] = {}
+    lists: Dict[str, List[NoteRecord]] = {}
+    for _ in range(count):
+        size = blob[pos]
+        key = blob[pos + 1:pos + 1 + size].decode("ascii")
+        pos += 1 + size
+        (notes,) = _COUNT.unpack_from(blob, pos)
+        pos += _COUNT.size
+        end = pos + notes * _BLOB_RECORD.size
+        if end > len(blob):
+            raise ValueError("Truncated note blob")
+        lists[key] = [(p, s, d, v) for p, v, s, d in _BLOB_RECORD.iter_unpack(blob[pos:end])]
+        pos = end
+    if pos < len(blob):
+        payload.update(json.loads(blob[pos:].decode("utf-8")))
+    for key, records in lists.items():
+        payload[key] = _note_dicts(records, ppq)
+    return payload
+
+
+def encode_notes_blob_osc(payload: Dict[str, Any], ppq: int = WIRE_PPQ) -> bytes:
+    return build_osc_message(NOTES_BLOB_ADDRESS, encode_notes_blob(payload, ppq))
+
+
+def _decode_typed_args(args: List[Any]) -> Dict[str, Any]:
+    if len(args) < 2 or args[0] != WIRE_VERSION:
+        raise ValueError(f"Unsupported note wire version {args[0] if args else None}")
+    ppq = int(args[1])
+    pos = 2
+    payload: Dict[str, Any] = {}
+    lists: Dict[str, List[NoteRecord]] = {}
+    while pos < len(args) - 1:
+        key, count = args[pos], int(args[pos + 1])
+        pos += 2
+        flat = [int(v) for v in args[pos:pos + 4 * count]]
+        if len(flat) != 4 * count:
+            raise ValueError("Truncated /notes message")
+        lists[str(key)] = list(zip(flat[0::4], flat[1::4], flat[2::4], flat[3::4]))  # type: ignore[arg-type]
+        pos += 4 * count
+    if pos < len(args):
+        payload.update(json.loads(str(args[pos])))
+    for key, records in lists.items():
+        payload[key] = _note_dicts(records, ppq)
+    return payload
+
+
+def decode_notes_message(data: bytes) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Decode a "/notes" or "/notesb" OSC datagram to (address, payload); None if neither.
+
+    A leading "send" address (Max's [prepend send]) is accepted as well.
+    """
+    if not data.startswith((b"/notes", b"send\0", b"/send\0")):
+        return None
+    try:
+        address, args = parse_osc_message(data)
+    except ValueError:
+        return None
+    if address not in (NOTES_ADDRESS, NOTES_BLOB_ADDRESS):
+        if not args or args[0] not in (NOTES_ADDRESS, NOTES_BLOB_ADDRESS):
+            return None
+        address, args = str(args[0]), args[1:]
+    try:
+        if address == NOTES_BLOB_ADDRESS:
+            if len(args) != 1 or not isinstance(args[0], bytes):
+                raise ValueError("/notesb expects one blob argument")
+            return address, decode_notes_blob(args[0])
+        return address, _decode_typed_args(args)
+    except (struct.error, IndexError, TypeError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Malformed {address} message: {exc}") from exc
+
+
+def encode_notes_message(payload: Dict[str, Any], address: str = NOTES_ADDRESS) -> bytes:
+    """Encode with the framing named by `address` ("/notes" or "/notesb")."""
+    if address == NOTES_BLOB_ADDRESS:
+        return encode_notes_blob_osc(payload)
+    return encode_notes_osc(payload)
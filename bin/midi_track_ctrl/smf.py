@@ -0,0 +1,340 @@
+"""
+Minimal Standard MIDI File (SMF) reader and writer.
+
+Encodes note-on/off events with delta times and a tempo meta event straight
+from note dicts, and parses SMF chunks back into tick-accurate notes, without
+going through music21. Set MIDI_WRITER=music21 / MIDI_READER=music21 to fall
+back to the music21 code paths.
+"""
+
+import os
+import re
+import struct
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+MIDI_WRITER = os.getenv("MIDI_WRITER", "smf").lower()
+MIDI_READER = os.getenv("MIDI_READER", "smf").lower()
+
+DEFAULT_PPQ = 480
+DEFAULT_VELOCITY = 90  # music21's default when a note has no explicit velocity
+
+_PITCH_RE = re.compile(r"^([A-Ga-g])([#b\-]*)(\d+)?$")
+_STEP_SEMITONES = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+# C0. Octave -1 has no name that survives a round trip: "C-1" / "B--1" read
+# back as flats in octave 1 ("-" is music21's flat), so MIDI 0-11 are rejected
+LOWEST_PITCH = 12
+
+# (pitch, start_ql, duration_ql, velocity)
+NoteEvent = Tuple[int, float, float, int]
+
+
+def use_music21() -> bool:
+    return MIDI_WRITER == "music21"
+
+
+def use_music21_reader() -> bool:
+    return MIDI_READER == "music21"
+
+
+@lru_cache(maxsize=512)
+def pitch_to_midi(name: str) -> int:
+    """Convert a music21-style pitch name ("C#4", "B-3", "Bb3", "E") to a MIDI number."""
+    match = _PITCH_RE.match(name.strip())
+    if not match:
+        raise ValueError(f"Invalid pitch name: '{name}'")
+    step, accidentals, octave = match.groups()
+    semitone = _STEP_SEMITONES[step.upper()]
+    for acc in accidentals:
+        semitone += 1 if acc == "#" else -1
+    midi = (int(octave) if octave is not None else 4) * 12 + 12 + semitone
+    if not LOWEST_PITCH <= midi <= 127:
+        raise ValueError(f"Pitch out of range (C0-G9): '{name}'")
+    return midi
+
+
+# music21's default spelling for MIDI numbers
+_PITCH_NAMES = ["C", "C#", "D", "E-", "E", "F", "F#", "G", "G#", "A", "B-", "B"]
+
+
+def midi_to_pitch(midi: int) -> str:
+    """Inverse of pitch_to_midi for LOWEST_PITCH..127; ValueError below (see LOWEST_PITCH)."""
+    if midi < LOWEST_PITCH:
+        raise ValueError(f"MIDI pitch {midi} is below C0 and has no unambiguous name")
+    return f"{_PITCH_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+def _varlen(value: int) -> bytes:
+    buf = value & 0x7F
+    value >>= 7
+    out = bytearray()
+    while value:
+        out.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(buf)
+    return bytes(out)
+
+
+def encode_smf(
+    events: Iterable[NoteEvent],
+    bpm: Optional[float] = None,
+    ppq: int = DEFAULT_PPQ,
+    channel: int = 0,
+) -> bytes:
+    """Encode (pitch, start, duration, velocity) events as a format-0 SMF."""
+    timeline: List[Tuple[int, int, int, int]] = []
+    for pitch, start, dur, velocity in events:
+        on = int(round(float(start) * ppq))
+        off = max(on + 1, int(round((float(start) + float(dur)) * ppq)))
+        # at equal ticks note-offs (0) sort before note-ons (1)
+        timeline.append((on, 1, pitch, velocity))
+        timeline.append((off, 0, pitch, 0))
+    timeline.sort()
+
+    track = bytearray()
+    if bpm:
+        tempo = int(round(60_000_000 / float(bpm)))
+        track += b"\x00\xff\x51\x03" + tempo.to_bytes(3, "big")
+
+    note_on = 0x90 | (channel & 0x0F)
+    note_off = 0x80 | (channel & 0x0F)
+    last_tick = 0
+    for tick, kind, pitch, velocity in timeline:
+        track += _varlen(tick - last_tick)
+        track.append(note_on if kind else note_off)
+        track.append(pitch & 0x7F)
+        track.append(velocity & 0x7F)
+        last_tick = tick
+    track += b"\x00\xff\x2f\x00"
+
+    header = b"MThd" + struct.pack(">IHHH", 6, 0, 1, ppq)
+    return header + b"MTrk" + struct.pack(">I", len(track)) + bytes(track)
+
+
+def note_events(
+    notes: Iterable[Dict[str, Any]],
+    velocity: int = DEFAULT_VELOCITY,
+) -> List[NoteEvent]:
+    return [
+        (pitch_to_midi(n["pitch"]), float(n["start"]), float(n["duration"]), int(n.get("velocity") or velocity))
+        for n in notes
+    ]
+
+
+def notes_to_smf(
+    notes: Iterable[Dict[str, Any]],
+    bpm: Optional[float] = None,
+    ppq: int = DEFAULT_PPQ,
+    velocity: int = DEFAULT_VELOCITY,
+) -> bytes:
+    return encode_smf(note_events(notes, velocity), bpm=bpm, ppq=ppq)
+
+
+def write_smf(data: bytes, path: Union[str, Path]) -> str:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+# --- Reading -----------------------------------------------------------------
+
+DEFAULT_TEMPO_BPM = 120.0
+
+
+class RawNote(NamedTuple):
+    start: int  # ticks
+    duration: int  # ticks
+    pitch: int
+    velocity: int
+    channel: int
+    track: int
+
+
+class SmfHeader(NamedTuple):
+    format: int
+    ntracks: int
+    ppq: int
+
+
+class NoteArrays(NamedTuple):
+    """Columnar note data: one array per field, times in ticks."""
+    ppq: int
+    bpm: float
+    start: "array[int]"
+    duration: "array[int]"
+    pitch: "array[int]"
+    velocity: "array[int]"
+    channel: "array[int]"
+
+
+def _read_exact(fh: BinaryIO, size: int) -> bytes:
+    data = fh.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated MIDI file")
+    return data
+
+
+def _read_header(fh: BinaryIO) -> SmfHeader:
+    chunk_id, length = struct.unpack(">4sI", _read_exact(fh, 8))
+    if chunk_id != b"MThd" or length < 6:
+        raise ValueError("Not a Standard MIDI File")
+    fmt, ntracks, division = struct.unpack(">HHH", _read_exact(fh, 6))
+    if length > 6:
+        fh.seek(length - 6, os.SEEK_CUR)
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported")
+    return SmfHeader(fmt, ntracks, division)
+
+
+def _parse_track(
+    data: bytes,
+    track: int,
+    channels: Optional[Set[int]],
+    tempos: List[Tuple[int, int]],
+) -> List[RawNote]:
+    """Decode one MTrk body into notes; tempo changes are appended to `tempos`."""
+    notes: List[RawNote] = []
+    open_notes: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+    pos = 0
+    end = len(data)
+    tick = 0
+    status = 0
+
+    while pos < end:
+        delta = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            delta = (delta << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                break
+        tick += delta
+
+        byte = data[pos]
+        if byte & 0x80:
+            status = byte
+            pos += 1
+        elif not status:
+            raise ValueError(f"Running status without a status byte in track {track}")
+
+        if status == 0xFF:
+            meta_type = data[pos]
+            pos += 1
+            length = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                length = (length << 7) | (byte & 0x7F)
+                if not byte & 0x80:
+                    break
+            if meta_type == 0x51 and length == 3:
+                tempos.append((tick, int.from_bytes(data[pos:pos + 3], "big")))
+            pos += length
+            if meta_type == 0x2F:
+                break
+            status = 0
+            continue
+        if status in (0xF0, 0xF7):
+            length = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                length = (length << 7) | (byte & 0x7F)
+                if not byte & 0x80:
+                    break
+            pos += length
+            status = 0
+            continue
+
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind in (0xC0, 0xD0):
+            pos += 1
+            continue
+        pitch = data[pos]
+        velocity = data[pos + 1]
+        pos += 2
+        if kind not in (0x80, 0x90) or (channels is not None and channel not in channels):
+            continue
+
+        key = (channel, pitch)
+        if kind == 0x90 and velocity:
+            open_notes.setdefault(key, []).append((tick, velocity))
+        else:
+            pending = open_notes.get(key)
+            if pending:
+                on_tick, on_velocity = pending.pop(0)
+                notes.append(RawNote(on_tick, tick - on_tick, pitch, on_velocity, channel, track))
+
+    # notes never switched off run to the end of the track
+    for (channel, pitch), pending in open_notes.items():
+        for on_tick, on_velocity in pending:
+            notes.append(RawNote(on_tick, max(tick - on_tick, 0), pitch, on_velocity, channel, track))
+
+    notes.sort(key=lambda n: (n.start, n.pitch))
+    return notes
+
+
+def iter_track_notes(
+    path: Union[str, Path],
+    tracks: Optional[Iterable[int]] = None,
+    channels: Optional[Iterable[int]] = None,
+) -> Iterator[Tuple[SmfHeader, List[Tuple[int, int]], List[RawNote]]]:
+    """Yield (header, tempo map so far, notes) one track at a time.
+
+    Only one track chunk is held in memory; unselected tracks are skipped with a seek.
+    """
+    wanted = set(tracks) if tracks is not None else None
+    channel_set = set(channels) if channels is not None else None
+    tempos: List[Tuple[int, int]] = []
+    with open(path, "rb") as fh:
+        header = _read_header(fh)
+        for index in range(header.ntracks):
+            raw = fh.read(8)
+            if len(raw) < 8:
+                break
+            chunk_id, length = struct.unpack(">4sI", raw)
+            # tempo lives in track 0 of format-1 files, so always parse it
+            if chunk_id != b"MTrk" or (wanted is not None and index not in wanted and index != 0):
+                fh.seek(length, os.SEEK_CUR)
+                continue
+            notes = _parse_track(_read_exact(fh, length), index, channel_set, tempos)
+            if wanted is not None and index not in wanted:
+                notes = []
+            yield header, tempos, notes
+
+
+def read_notes(
+    path: Union[str, Path],
+    tracks: Optional[Iterable[int]] = None,
+    channels: Optional[Iterable[int]] = None,
+) -> Tuple[SmfHeader, float, List[RawNote]]:
+    """Return (header, first tempo in BPM, notes sorted by start then pitch)."""
+    header = SmfHeader(0, 0, DEFAULT_PPQ)
+    tempos: List[Tuple[int, int]] = []
+    notes: List[RawNote] = []
+    for header, tempos, track_notes in iter_track_notes(path, tracks, channels):
+        notes.extend(track_notes)
+    notes.sort(key=lambda n: (n.start, n.pitch))
+    bpm = round(60_000_000 / min(tempos, key=lambda t: t[0])[1], 3) if tempos else DEFAULT_TEMPO_BPM
+    return header, bpm, notes
+
+
+def read_note_arrays(
+    path: Union[str, Path],
+    tracks: Optional[Iterable[int]] = None,
+    channels: Optional[Iterable[int]] = None,
+) -> NoteArrays:
+    header, bpm, notes = read_notes(path, tracks, channels)
+    return NoteArrays(
+        ppq=header.ppq,
+        bpm=bpm,
+        start=array("l", (n.start for n in notes)),
+        duration=array("l", (n.duration for n in notes)),
+        pitch=array("B", (n.pitch for n in notes)),
+        velocity=array("B", (n.velocity for n in notes)),
+        channel=array("B", (n.channel for n in notes)),
+    )
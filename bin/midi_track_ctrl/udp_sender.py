@@ -0,0 +1,156 @@
+"""
+Long-lived UDP sender for messages to Max.
+
+One connected socket per destination, fed through a bounded queue that
+callers never block on. A background thread drains whatever has queued up and
+packs consecutive OSC messages into OSC bundles ("#bundle", immediate time tag)
+up to one datagram, so a burst of events costs a few sendto calls instead of
+a socket plus a syscall per event. Non-OSC datagrams (plain JSON) are sent
+as they are. `send_many` queues a message's datagrams (e.g. its /chunk
+pieces) as one entry, so they are all sent or, on a full queue, none.
+"""
+
+import queue
+import socket
+import struct
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from midi_track_ctrl.datagram import UDP_MAX_DATAGRAM
+
+BUNDLE_HEADER = b"#bundle\0" + struct.pack(">Q", 1)  # time tag 1 = "immediately"
+_SIZE = struct.Struct(">i")
+
+_STOP = object()
+
+
+def build_osc_bundle(messages: Iterable[bytes]) -> bytes:
+    return BUNDLE_HEADER + b"".join(_SIZE.pack(len(m)) + m for m in messages)
+
+
+class UdpSender:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        max_queue: int = 1024,
+        max_datagram: int = UDP_MAX_DATAGRAM,
+        bundle: bool = True,
+    ) -> None:
+        self.address: Tuple[str, int] = (host, port)
+        self.max_datagram = max_datagram
+        self.bundle = bundle
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.connect(self.address)
+        self._thread = threading.Thread(target=self._run, name=f"udp-sender-{port}", daemon=True)
+        self._thread.start()
+        self.queued = 0
+        self.dropped = 0
+        self.datagrams = 0
+        self.bundled = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+    # --- producer side ---------------------------------------------------------
+
+    def send(self, datagram: bytes, osc: bool = True) -> bool:
+        """Queue one datagram; False (and counted as dropped) if the queue is full."""
+        return self.send_many((datagram,), osc)
+
+    def send_many(self, datagrams: Iterable[bytes], osc: bool = True) -> bool:
+        """Queue all `datagrams` or, if the queue is full, none of them (all counted as dropped)."""
+        group = tuple(datagrams)
+        if not group:
+            return True
+        try:
+            self._queue.put_nowait((group, osc))
+        except queue.Full:
+            self.dropped += len(group)
+            return False
+        self.queued += len(group)
+        return True
+
+    def flush(self, timeout: float = 1.0) -> bool:
+        """Wait until everything queued so far has been handed to the socket."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 1.0) -> None:
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._sock.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "destination": f"{self.address[0]}:{self.address[1]}",
+            "queued": self.queued,
+            "pending": self._queue.qsize(),  # queue entries (one per send / send_many call)
+            "dropped": self.dropped,
+            "datagrams": self.datagrams,
+            "bundled_messages": self.bundled,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    # --- sender thread -----------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while True:  # take the whole burst that is already waiting
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch: List[bytes] = []
+            size = len(BUNDLE_HEADER)
+            for item in items:
+                if item is _STOP:
+                    self._write_batch(batch)
+                    return
+                if isinstance(item, threading.Event):
+                    self._write_batch(batch)
+                    batch, size = [], len(BUNDLE_HEADER)
+                    item.set()
+                    continue
+                group, osc = item
+                for datagram in group:
+                    if not osc or not self.bundle:
+                        self._write_batch(batch)
+                        batch, size = [], len(BUNDLE_HEADER)
+                        self._write(datagram)
+                        continue
+                    if batch and size + 4 + len(datagram) > self.max_datagram:
+                        self._write_batch(batch)
+                        batch, size = [], len(BUNDLE_HEADER)
+                    batch.append(datagram)
+                    size += 4 + len(datagram)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[bytes]) -> None:
+        if not batch:
+            return
+        if len(batch) == 1:
+            self._write(batch[0])
+            return
+        self._write(build_osc_bundle(batch))
+        self.bundled += len(batch)
+
+    def _write(self, datagram: bytes) -> None:
+        try:
+            self._sock.send(datagram)
+            self.datagrams += 1
+        except OSError as exc:
+            # e.g. ECONNREFUSED from a previous send while Max is not listening
+            self.errors += 1
+            self.last_error = str(exc)
+
@@ -2,11 +2,17 @@
    Captures notes from selected MIDI clip and sends via UDP
    
    Usage: Put this in a [js] object in Max
-   Wire outputs to [prepend send] → [udpsend 127.0.0.1 7400]
+   Wire outlet 0 to [prepend send] → [udpsend 127.0.0.1 7400]
+   Large captures are split into "/chunk" messages (see sendJSON below)
+   Decoded replies (reassembled chunks) leave on outlet 1
 */
 
 inlets = 1;
-outlets = 1;
+// outlet 0 → [prepend send] → [udpsend 127.0.0.1 7400] (to the backend)
+// outlet 1 → decoded replies from the backend ("json <text>"), e.g. → [dict.deserialize];
+//            never wire it to udpsend, or every reply is sent back as a new capture
+outlets = 2;
+var REPLY_OUTLET = 1;
 
 // Global state
 var live_api = null;
@@ -48,7 +54,7 @@ function capture_notes(msg) {
         };
         
         // Send as JSON via outlet
-        outlet(0, JSON.stringify(output));
+        sendWire(output);
         
         post("notesender: Captured " + all_notes.length + " notes\n");
         
@@ -57,6 +63,147 @@ function capture_notes(msg) {
     }
 }
 
+// ---- 分片传输 (chunked UDP) ------------------------------------------------
+// JSON longer than CHUNK_SIZE is sent as several "/chunk <id> <index> <total> <piece>"
+// messages; the Python side (midi_track_ctrl/datagram.py) reassembles them.
+// Replies that arrive chunked can be fed back in through [route /chunk] → [prepend chunk];
+// the reassembled JSON leaves on REPLY_OUTLET, not on the udpsend outlet.
+var CHUNK_SIZE = 4000;        // characters per piece (well under one UDP datagram)
+var CHUNK_TIMEOUT_MS = 5000;  // drop incomplete messages after this long
+var CHUNK_MAX_PENDING = 16;   // bound the reassembly buffer
+var chunk_seq = 0;
+var chunk_pending = {};
+
+function sendJSON(text) {
+    if (text.length <= CHUNK_SIZE) {
+        outlet(0, text);
+        return;
+    }
+    var id = Date.now().toString(36) + "-" + (chunk_seq++).toString(36);
+    var total = Math.ceil(text.length / CHUNK_SIZE);
+    for (var i = 0; i < total; i++) {
+        outlet(0, "/chunk", id, i, total, text.substr(i * CHUNK_SIZE, CHUNK_SIZE));
+    }
+}
+
+function chunk(id, index, total, piece) {
+    var now = Date.now();
+    var ids = [];
+    for (var key in chunk_pending) {
+        if (now - chunk_pending[key].first_seen > CHUNK_TIMEOUT_MS) {
+            delete chunk_pending[key];
+        } else {
+            ids.push(key);
+        }
+    }
+    if (!chunk_pending[id]) {
+        if (ids.length >= CHUNK_MAX_PENDING) {
+            ids.sort(function (a, b) { return chunk_pending[a].first_seen - chunk_pending[b].first_seen; });
+            delete chunk_pending[ids[0]];
+        }
+        chunk_pending[id] = { first_seen: now, total: total, count: 0, pieces: [] };
+    }
+    var entry = chunk_pending[id];
+    if (entry.pieces[index] === undefined) {
+        entry.pieces[index] = String(piece);
+        entry.count++;
+    }
+    if (entry.count === entry.total) {
+        delete chunk_pending[id];
+        outlet(REPLY_OUTLET, "json", entry.pieces.join(""));
+    }
+}
+
+// ---- 紧凑音符格式 (compact note wire format, midi_track_ctrl/note_wire.py) ----
+// WIRE_FORMAT = "notes" sends note lists as typed OSC ints instead of JSON text:
+//   /notes <version> <ppq> <key> <count> (<midi> <start ticks> <dur ticks> <velocity>)* ... <meta json>
+// Max turns the outlet list into exactly those typed args. Replies in the same
+// format can be decoded via [route /notes] → [prepend wire_notes] → this js;
+// the decoded JSON leaves on REPLY_OUTLET.
+var WIRE_FORMAT = "json";   // "json" or "notes"
+var WIRE_VERSION = 1;
+var WIRE_PPQ = 480;
+var WIRE_NOTE_KEYS = { original_notes: true, full_track: true, added_notes: true };
+var WIRE_STEPS = { C: 0, D: 2, E: 4, F: 5, G: 7, A: 9, B: 11 };
+
+function nameToMidi(name) {
+    if (typeof name === "number") return name;
+    var m = /^([A-Ga-g])([#b\-]*)(-?\d+)?$/.exec(String(name));
+    if (!m) throw "unparseable pitch '" + name + "'";
+    var semitone = WIRE_STEPS[m[1].toUpperCase()];
+    for (var i = 0; i < m[2].length; i++) semitone += m[2].charAt(i) === "#" ? 1 : -1;
+    var octave = m[3] !== undefined ? parseInt(m[3], 10) : 4;
+    return (octave + 1) * 12 + semitone;
+}
+
+function encodeNotesMessage(payload) {
+    var out = ["/notes", WIRE_VERSION, WIRE_PPQ];
+    var meta = {};
+    for (var key in payload) {
+        var value = payload[key];
+        if (WIRE_NOTE_KEYS[key] && value instanceof Array) {
+            var ints = [];
+            for (var i = 0; i < value.length; i++) {
+                var n = value[i];
+                try {
+                    ints.push(
+                        nameToMidi(n.pitch),
+                        Math.round(n.start * WIRE_PPQ),
+                        Math.round(n.duration * WIRE_PPQ),
+                        n.velocity || 90
+                    );
+                } catch (err) {
+                    // never send a made-up pitch: report and leave the note out
+                    post("notesender: skipping " + key + " note " + i + " - " + err + "\n");
+                }
+            }
+            out.push(key, ints.length / 4);
+            for (var j = 0; j < ints.length; j++) out.push(ints[j]);
+        } else {
+            meta[key] = value;
+        }
+    }
+    out.push(JSON.stringify(meta));
+    return out;
+}
+
+function decodeNotesMessage(a) {
+    if (a[0] !== WIRE_VERSION) throw "unsupported note wire version " + a[0];
+    var ppq = a[1];
+    var pos = 2;
+    var payload = {};
+    while (pos < a.length - 1) {
+        var key = a[pos], count = a[pos + 1];
+        var notes = [];
+        pos += 2;
+        for (var i = 0; i < count; i++, pos += 4) {
+            notes.push({ pitch: note_name_from_pitch(a[pos]), start: a[pos + 1] / ppq, duration: a[pos + 2] / ppq, velocity: a[pos + 3] });
+        }
+        payload[key] = notes;
+    }
+    if (pos < a.length) {
+        var meta = JSON.parse(a[pos]);
+        for (var k in meta) payload[k] = meta[k];
+    }
+    return payload;
+}
+
+function sendWire(payload) {
+    if (WIRE_FORMAT === "notes") {
+        outlet(0, encodeNotesMessage(payload));
+    } else {
+        sendJSON(JSON.stringify(payload));
+    }
+}
+
+function wire_notes() {
+    try {
+        outlet(REPLY_OUTLET, "json", JSON.stringify(decodeNotesMessage(arrayfromargs(arguments))));
+    } catch (err) {
+        post("notesender: bad /notes message - " + err + "\n");
+    }
+}
+
 function get_selected_clip() {
     // This is a placeholder - actual implementation depends on 
     // how Live exposes the current clip through Max API
@@ -0,0 +1,204 @@
+"""
+Compact, token-budgeted encoding of the seed melody for the completion prompt.
+
+The plain "PITCH START DURATION" dump grows one line per note. Here the seed
+is written one line per bar with MIDI pitch numbers and no absolute starts:
+notes follow each other, a duration stays in effect until the next "DUR:",
+gaps are explicit rests and overlaps restart at an absolute "@START":
+
+    bar 3: 0.5: 60 62 64 65 1: 67 r0.5 0.5: 69
+
+When the result would not fit in the token budget, the most recent bars stay
+verbatim (they matter most for the continuation) and everything before them
+is replaced by a short summary of its recurring rhythm cells and interval
+motifs. Chords get the same treatment.
+
+Token counts are estimates (about 4 characters per token), which is close
+enough for budgeting without a tokenizer dependency.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from midi_track_ctrl.note_seq import NoteSeq
+
+BAR_QL = 4.0
+
+MELODY_LEGEND = (
+    'one line per 4-quarterLength bar; "bar N:" starts at quarterLength 4*(N-1). '
+    "Numbers are MIDI pitches (60 = C4) played one after another; "
+    '"DUR:" sets the quarterLength duration of the following notes until the next "DUR:", '
+    '"rX" is a rest of X, "@X" moves to absolute quarterLength X (overlapping notes).'
+)
+CHORD_LEGEND = 'SYMBOL@START/DUR in quarterLength'
+
+Cell = Tuple[float, float, int]  # (start, duration, MIDI pitch)
+
+
+class EncodedSeed(NamedTuple):
+    melody: str
+    chords: str
+    tokens: int
+    verbatim_bars: int
+    summarized_bars: int
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _num(value: float) -> str:
+    return f"{round(value, 3):g}"
+
+
+def _bars(seed: NoteSeq) -> List[Tuple[int, List[Cell]]]:
+    """Group the (sorted) seed into bars of (start, duration, pitch) cells."""
+    bars: List[Tuple[int, List[Cell]]] = []
+    for pitch, start, dur in zip(seed.pitch, seed.start, seed.duration):
+        index = int(start // BAR_QL)
+        if not bars or bars[-1][0] != index:
+            bars.append((index, []))
+        bars[-1][1].append((start, dur, pitch))
+    return bars
+
+
+def _bar_tokens(index: int, cells: Sequence[Cell], pitches: bool = True) -> List[str]:
+    tokens: List[str] = []
+    pos = index * BAR_QL
+    current: Optional[float] = None
+    for start, dur, pitch in cells:
+        gap = round(start - pos, 3)
+        if gap > 0:
+            tokens.append(f"r{_num(gap)}")
+        elif gap < 0:
+            tokens.append(f"@{_num(start)}")
+        if dur != current:
+            tokens.append(f"{_num(dur)}:")
+            current = dur
+        if pitches:
+            tokens.append(str(pitch))
+        pos = start + dur
+    return tokens
+
+
+def encode_bar(index: int, cells: Sequence[Cell]) -> str:
+    return f"bar {index + 1}: " + " ".join(_bar_tokens(index, cells))
+
+
+def _rhythm(index: int, cells: Sequence[Cell]) -> str:
+    """A bar's rhythm alone: the note durations (n = one note) and rests."""
+    out: List[str] = []
+    current = "?"
+    for token in _bar_tokens(index, cells, pitches=True):
+        if token.endswith(":"):
+            current = token[:-1]
+        elif token[0] in "r@":
+            out.append(token)
+        else:
+            out.append(current)
+    return " ".join(out)
+
+
+def _top(counter: "Counter[str]", limit: int = 3) -> str:
+    return "; ".join(f'"{item}" x{count}' for item, count in counter.most_common(limit))
+
+
+def summarize_bars(bars: Sequence[Tuple[int, List[Cell]]]) -> str:
+    """A few lines describing what the omitted bars contain."""
+    if not bars:
+        return ""
+    cells = [c for _, bar in bars for c in bar]
+    pitches = [c[2] for c in cells]
+    rhythms: "Counter[str]" = Counter()
+    motifs: "Counter[str]" = Counter()
+    for index, bar in bars:
+        rhythms[_rhythm(index, bar)] += 1
+        steps = [b[2] - a[2] for a, b in zip(bar, bar[1:])][:4]
+        if steps:
+            motifs[" ".join(f"{s:+d}" for s in steps)] += 1
+    durations = Counter(_num(c[1]) for c in cells)
+    first, last = bars[0][0] + 1, bars[-1][0] + 1
+    lines = [
+        f"bars {first}-{last} summarized: {len(cells)} notes, MIDI range {min(pitches)}-{max(pitches)}, "
+        f"durations {dict(durations.most_common(4))}",
+        f"- most used bar rhythms (durations per note, rests): {_top(rhythms)}",
+    ]
+    recurring = Counter({m: n for m, n in motifs.items() if n > 1})
+    if recurring:
+        lines.append(f"- recurring motifs (intervals in semitones): {_top(recurring)}")
+    return "\n".join(lines)
+
+
+def _progression(symbols: List[str], max_period: int = 8, max_runs: int = 32) -> str:
+    """Collapse a repeating progression ("(Am F C G) x12 then Am F") or repeated symbols."""
+    for period in range(1, min(max_period, len(symbols) // 2) + 1):
+        if all(symbols[i] == symbols[i % period] for i in range(period, len(symbols))):
+            text = f"({' '.join(symbols[:period])}) x{len(symbols) // period}"
+            tail = symbols[len(symbols) - len(symbols) % period:]
+            return text + (f" then {' '.join(tail)}" if tail else "")
+    runs: List[List[Any]] = []
+    for symbol in symbols:
+        if runs and runs[-1][0] == symbol:
+            runs[-1][1] += 1
+        else:
+            runs.append([symbol, 1])
+    text = " ".join(s if n == 1 else f"{s}x{n}" for s, n in runs[-max_runs:])
+    return text if len(runs) <= max_runs else "... " + text
+
+
+def _chord_token(chord: Dict[str, Any]) -> str:
+    return f"{chord['symbol']}@{_num(float(chord['start']))}/{_num(float(chord['duration']))}"
+
+
+def encode_chords(chords: Optional[List[Dict[str, Any]]], since: float = 0.0) -> str:
+    """Chords from `since` on verbatim; earlier ones as their (run-length) symbol sequence."""
+    if not chords:
+        return ""
+    ordered = sorted(chords, key=lambda c: (float(c["start"]), c["symbol"]))
+    earlier = [c["symbol"] for c in ordered if float(c["start"]) + float(c["duration"]) <= since]
+    recent = [_chord_token(c) for c in ordered if float(c["start"]) + float(c["duration"]) > since]
+    lines: List[str] = []
+    if earlier:
+        lines.append(f"before {_num(since)}: {_progression(earlier)}")
+    if recent:
+        lines.append(" ".join(recent))
+    return "\n".join(lines)
+
+
+def encode_seed(
+    seed: NoteSeq,
+    chords: Optional[List[Dict[str, Any]]] = None,
+    budget: int = 1500,
+    min_bars: int = 2,
+) -> EncodedSeed:
+    """Encode the seed and chords in about `budget` tokens, keeping the latest bars verbatim."""
+    bars = _bars(seed.sorted())
+    lines = [encode_bar(index, cells) for index, cells in bars]
+    full_melody = "\n".join(lines)
+    full_chords = encode_chords(chords)
+    tokens = estimate_tokens(full_melody) + estimate_tokens(full_chords)
+    if tokens <= budget or len(bars) <= min_bars:
+        return EncodedSeed(full_melody, full_chords, tokens, len(bars), 0)
+
+    # room for the summary (its size does not grow with the seed) and the chords
+    reserve = estimate_tokens(summarize_bars(bars))
+    reserve += estimate_tokens(encode_chords(chords, bars[-min_bars][0] * BAR_QL))
+    keep = min_bars
+    used = sum(estimate_tokens(line) + 1 for line in lines[-keep:])
+    while keep < len(bars):
+        cost = estimate_tokens(lines[-keep - 1]) + 1
+        if used + cost + reserve > budget:
+            break
+        used += cost
+        keep += 1
+
+    if keep == len(bars):
+        return EncodedSeed(full_melody, full_chords, tokens, len(bars), 0)
+
+    while True:
+        melody = summarize_bars(bars[:-keep]) + "\n" + "\n".join(lines[-keep:])
+        chord_text = encode_chords(chords, bars[-keep][0] * BAR_QL)
+        tokens = estimate_tokens(melody) + estimate_tokens(chord_text)
+        if tokens <= budget or keep <= min_bars:
+            return EncodedSeed(melody, chord_text, tokens, keep, len(bars) - keep)
+        keep -= 1  # the reserve was an estimate; give back bars until it fits
@@ -0,0 +1,75 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one in-flight execution and all
+receive its result (or its exception). Used around completion generation
+so UI double-submits and bridge retries do not fan out into parallel LLM calls.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class AsyncSingleFlight:
+    def __init__(self) -> None:
+        self._tasks: Dict[str, "asyncio.Task[Any]"] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _t, k=key: self._forget(k, _t))
+        else:
+            self.coalesced += 1
+        # shield: a cancelled waiter must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter went away
+
+    def inflight(self) -> int:
+        return len(self._tasks)
+
+
+class SingleFlight:
+    """Thread-based variant for the sync code path."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "Future[Any]"] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+            else:
+                self.coalesced += 1
+        assert fut is not None
+        if not leader:
+            return fut.result()
+
+        try:
+            fut.set_result(fn())
+        except BaseException as exc:
+            fut.set_exception(exc)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return fut.result()
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._calls)
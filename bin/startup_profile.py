@@ -0,0 +1,147 @@
+"""
+Startup-time report for the backend (`python bin/main.py --profile-startup`).
+
+Every measurement runs in a fresh interpreter, so nothing the current
+process has already imported skews it:
+- `python -X importtime -c "import main"`: per-module import times, shown as
+  the slowest imports (cumulative) and the total self time per package.
+- the FastAPI lifespan entered directly (no server, BRIDGE_MODE=off): time until
+  startup is done and until the background LLM client preload has finished.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple
+
+BIN_DIR = Path(__file__).resolve().parent
+# imported on first use / in the background, never while `main` is imported
+DEFERRED = ("langchain_openai", "langchain_core", "openai", "music21")
+
+_LIFESPAN_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def run():
+    async with main.lifespan(main.app):
+        ready = time.perf_counter()
+        await main.await_llm_preload()
+        return ready, time.perf_counter()
+
+ready, preloaded = asyncio.run(run())
+print(json.dumps({
+    "import": imported - started,
+    "lifespan": ready - imported,
+    "llm_preload": preloaded - imported,
+}))
+"""
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTime]:
+    """Parse `-X importtime` lines ("import time: self | cumulative | name")."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append(ImportTime(name.strip(), int(parts[0]), int(parts[1]), depth))
+    return rows
+
+
+def _run(args: List[str], env: Dict[str, str]) -> "subprocess.CompletedProcess[str]":
+    return subprocess.run(args, cwd=BIN_DIR, env=env, capture_output=True, text=True, check=False)
+
+
+def profile_startup(module: str = "main") -> Dict[str, Any]:
+    env = dict(os.environ, BRIDGE_MODE="off")  # no UDP bind next to a running server
+
+    started = time.perf_counter()
+    _run([sys.executable, "-c", "pass"], env)
+    interpreter = time.perf_counter() - started
+
+    started = time.perf_counter()
+    proc = _run([sys.executable, "-X", "importtime", "-c", f"import {module}"], env)
+    import_wall = time.perf_counter() - started
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = parse_importtime(proc.stderr)
+
+    lifespan: Dict[str, float] = {}
+    lifespan_error = ""
+    proc = _run([sys.executable, "-c", _LIFESPAN_SCRIPT], env)
+    if proc.returncode == 0 and proc.stdout.strip():
+        lifespan = json.loads(proc.stdout.strip().splitlines()[-1])
+    else:
+        lifespan_error = proc.stderr.strip()[-2000:] or f"exit code {proc.returncode}, no output"
+
+    loaded = {row.module.split(".")[0] for row in rows}
+    return {
+        "interpreter_seconds": interpreter,
+        "import_wall_seconds": import_wall,
+        "rows": rows,
+        "lifespan": lifespan,
+        "lifespan_error": lifespan_error,
+        "deferred": [name for name in DEFERRED if name not in loaded],
+        "eager": [name for name in DEFERRED if name in loaded],
+    }
+
+
+def format_report(profile: Dict[str, Any], top: int = 15) -> str:
+    rows: List[ImportTime] = profile["rows"]
+    total = next((r.cumulative_us for r in reversed(rows) if r.depth == 0 and r.module == "main"), 0)
+    packages: "Counter[str]" = Counter()
+    for row in rows:
+        packages[row.module.split(".")[0]] += row.self_us
+
+    lines = [
+        "Startup profile",
+        f"  interpreter start          {profile['interpreter_seconds']:.3f}s",
+        f"  import main (-X importtime) {total / 1e6:.3f}s  (wall {profile['import_wall_seconds']:.3f}s; CLI prompt / worker spawn)",
+    ]
+    lifespan = profile["lifespan"]
+    if lifespan:
+        lines.append(f"  lifespan until ready       {lifespan['lifespan']:.3f}s")
+        lines.append(f"  LLM client preload         {lifespan['llm_preload']:.3f}s  (background, after startup)")
+    else:
+        lines.append("  lifespan                   not measured, the lifespan run failed:")
+        lines.extend(f"    {line}" for line in profile["lifespan_error"].splitlines())
+
+    lines.append(f"Slowest imports (cumulative, top {top}):")
+    slowest = sorted((r for r in rows if r.depth <= 1), key=lambda r: r.cumulative_us, reverse=True)
+    for row in slowest[:top]:
+        lines.append(f"  {row.cumulative_us / 1000:8.1f} ms  {'  ' * row.depth}{row.module}")
+
+    lines.append(f"Self time by package (top {top}):")
+    for name, self_us in packages.most_common(top):
+        lines.append(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    if profile["deferred"]:
+        lines.append(f"Deferred (first use / background): {', '.join(profile['deferred'])}")
+    if profile["eager"]:
+        lines.append(f"Imported eagerly, should be deferred: {', '.join(profile['eager'])}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    print(format_report(profile_startup()))
+
+
+if __name__ == "__main__":
+    main()
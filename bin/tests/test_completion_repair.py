@@ -0,0 +1,68 @@
+"""
+Regression tests for completion_repair on the shipped default seed.
+
+Run with: python -m pytest bin/tests
+"""
+
+import sys
+from pathlib import Path
+
+BIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BIN_DIR))
+
+from completion_repair import CompletionRepair, seed_grid, snap  # noqa: E402
+from midi_track_ctrl.midi_read import read_melody  # noqa: E402
+from midi_track_ctrl.note_seq import NoteSeq  # noqa: E402
+
+SCALE = ["C4", "D4", "E4", "F4", "G4", "A4", "B4", "C5"]
+
+
+def default_seed() -> NoteSeq:
+    notes, _, _ = read_melody(str(BIN_DIR / "default.mid"))
+    return NoteSeq.from_dicts(notes)
+
+
+def test_quarter_note_seed_keeps_eighth_notes_intact():
+    seed = default_seed()
+    assert seed_grid(seed) == 0.25  # all quarter notes, but never coarser than a sixteenth
+    repair = CompletionRepair(seed, seed.end_time(), 12.0)
+    eighths = [{"pitch": p, "start": 8.0 + i * 0.5, "duration": 0.5} for i, p in enumerate(SCALE)]
+
+    repair.accept(eighths)
+
+    assert repair.notes == eighths
+    assert not repair.stats
+    assert repair.next_span() is None
+
+
+def test_snap_rounds_halves_up():
+    assert snap(8.125, 0.25) == 8.25
+    assert snap(8.375, 0.25) == 8.5
+    assert snap(7.99, 0.25) == 8.0
+
+
+def test_notes_snapped_onto_one_onset_are_not_stacked():
+    seed = default_seed()
+    repair = CompletionRepair(seed, seed.end_time(), 12.0)
+
+    repair.accept([
+        {"pitch": "C4", "start": 8.0, "duration": 1.0},
+        {"pitch": "E4", "start": 8.05, "duration": 1.0},
+        {"pitch": "G4", "start": 9.0, "duration": 1.0},
+    ])
+
+    assert [(n["pitch"], n["start"]) for n in repair.notes] == [("C4", 8.0), ("G4", 9.0)]
+    assert repair.stats["collisions"] == 1
+
+
+def test_chords_written_as_chords_are_kept():
+    seed = default_seed()
+    repair = CompletionRepair(seed, seed.end_time(), 12.0)
+
+    repair.accept([
+        {"pitch": "C4", "start": 8.0, "duration": 4.0},
+        {"pitch": "E4", "start": 8.0, "duration": 4.0},
+    ])
+
+    assert len(repair.notes) == 2
+    assert not repair.stats
@@ -0,0 +1,38 @@
+"""
+Regression tests for the offline Markov engine.
+
+Run with: python -m pytest bin/tests
+"""
+
+import sys
+from pathlib import Path
+
+BIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BIN_DIR))
+
+from markov_generator import MAX_NOTES, MIN_DURATION, continue_melody  # noqa: E402
+
+
+def _ends_at(notes, target_end):
+    last = notes[-1]
+    return abs(last["start"] + last["duration"] - target_end) < 1e-6
+
+
+def test_tiny_duration_seed_terminates():
+    # rounded to 6 decimals these durations are 0: the rhythm cells used to be all (0, 0)
+    seed = [{"pitch": p, "start": i * 1e-7, "duration": 1e-7} for i, p in enumerate(["C4", "D4", "E4", "F4"])]
+
+    notes = continue_melody(seed, 4e-7, 4.0, 50, rng_seed=1)
+
+    assert _ends_at(notes, 4.0)
+    assert all(n["duration"] >= MIN_DURATION - 1e-6 for n in notes)
+    assert len(notes) <= 4.0 / MIN_DURATION
+
+
+def test_note_count_is_capped():
+    seed = [{"pitch": "C4", "start": i * 1e-7, "duration": 1e-7} for i in range(4)]
+
+    notes = continue_melody(seed, 4e-7, 1000.0, 0, rng_seed=1)
+
+    assert len(notes) == MAX_NOTES
+    assert _ends_at(notes, 1000.0)
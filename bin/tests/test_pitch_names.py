@@ -0,0 +1,42 @@
+"""
+Pitch name <-> MIDI number conversions (midi_track_ctrl.smf, NoteSeq).
+
+Run with: python -m pytest bin/tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BIN_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BIN_DIR))
+
+from midi_track_ctrl.note_seq import NoteSeq  # noqa: E402
+from midi_track_ctrl.smf import LOWEST_PITCH, midi_to_pitch, pitch_to_midi  # noqa: E402
+
+
+def test_every_midi_number_round_trips_or_is_rejected():
+    for midi in range(128):
+        if midi < LOWEST_PITCH:
+            with pytest.raises(ValueError):
+                midi_to_pitch(midi)
+            continue
+        assert pitch_to_midi(midi_to_pitch(midi)) == midi
+
+
+def test_note_seq_round_trip_keeps_pitches():
+    notes = [{"pitch": midi_to_pitch(m), "start": float(i), "duration": 1.0} for i, m in enumerate(range(LOWEST_PITCH, 128))]
+    seq = NoteSeq.from_dicts(notes)
+
+    assert list(seq.pitch) == list(range(LOWEST_PITCH, 128))
+    assert NoteSeq.from_dicts(seq.to_dicts()).pitch == seq.pitch
+
+
+def test_octave_minus_one_names_are_not_misread():
+    # "-" is music21's flat: these are C-flat 1 / B-double-flat 1, never MIDI 0 / 10
+    assert pitch_to_midi("C-1") == 23
+    assert pitch_to_midi("B--1") == 33
+    assert pitch_to_midi("C0") == LOWEST_PITCH
+    with pytest.raises(ValueError):
+        pitch_to_midi("C-0")  # C-flat 0 = MIDI 11
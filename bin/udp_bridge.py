@@ -0,0 +1,191 @@
+"""
+In-process Max for Live UDP listener.
+
+Runs as an asyncio DatagramProtocol inside the API process (started from the
+FastAPI lifespan), so a capture goes straight into the bridge state and the
+completion pipeline instead of through a loopback HTTP POST. The standalone
+scripts (midi_track_ctrl/bridge.py, max_for_live/bridge.py) remain usable with
+BRIDGE_MODE=external.
+
+Two datagram kinds are accepted:
+- capture:  {"full_track": [...], "added_notes": [...]} -> stored for the UI
+- complete: a CompleteRequest JSON ("original_notes", "mood", ...) -> generated,
+  stored for the UI and sent back to Max
+An optional "request_id" in either kind is echoed in the reply to Max.
+At most `max_concurrent` completions run at once; a completion arriving while
+all slots are taken is answered right away with {"error": "busy"}.
+Messages larger than one datagram arrive / leave as OSC /chunk datagrams
+(midi_track_ctrl/datagram.py). Payloads may also use the compact note wire
+format ("/notes" / "/notesb", midi_track_ctrl/note_wire.py); the reply then
+uses the same format.
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from midi_track_ctrl.datagram import Reassembler
+from midi_track_ctrl.event_log import get_logger
+from midi_track_ctrl.note_wire import decode_notes_message
+
+Address = Tuple[str, int]
+
+log = get_logger("bridge.udp")
+
+
+def decode_packet(data: bytes) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Return (payload, compact wire address or None for JSON).
+
+    JSON datagrams may carry Max prefixes ("send ...") and OSC framing.
+    """
+    compact = decode_notes_message(data)
+    if compact is not None:
+        address, payload = compact
+        return payload, address
+
+    text = data.decode("utf-8", errors="replace")
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError:
+        # udpsend wraps the message as OSC ("send" address, padding NULs):
+        # parse the slice between the first "{" and the last "}"
+        lbrace = text.find("{")
+        rbrace = text.rfind("}")
+        if lbrace == -1 or rbrace <= lbrace:
+            raise
+        payload = json.loads(text[lbrace:rbrace + 1])
+    if not isinstance(payload, dict):
+        raise ValueError("Bridge payload must be a JSON object")
+    return payload, None
+
+
+class BridgeProtocol(asyncio.DatagramProtocol):
+    def __init__(
+        self,
+        on_capture: Callable[[Dict[str, Any]], Awaitable[None]],
+        on_complete: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        encode_reply: Callable[[Dict[str, Any], Optional[str]], List[bytes]],
+        reply_address: Address,
+        max_concurrent: int = 8,
+    ) -> None:
+        self.on_capture = on_capture
+        self.on_complete = on_complete
+        self.encode_reply = encode_reply
+        self.reply_address = reply_address
+        self.max_concurrent = max_concurrent
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.reassembler = Reassembler()
+        self.received = 0
+        self.captures = 0
+        self.completions = 0
+        self.completing = 0  # slots taken, counted when the datagram arrives (not when the task starts)
+        self.busy = 0
+        self.errors = 0
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+
+    def datagram_received(self, data: bytes, addr: Address) -> None:
+        self.received += 1
+        log.debug("datagram", bytes=len(data), source=f"{addr[0]}:{addr[1]}")
+        message = self.reassembler.feed_datagram(data)
+        if message is None:
+            return  # chunk of a message still being reassembled
+        try:
+            payload, wire = decode_packet(message)
+        except ValueError as exc:  # includes JSONDecodeError
+            self._fail(f"Invalid JSON: {exc}")
+            return
+
+        request_id = payload.pop("request_id", None)
+        log.debug("message", bytes=len(message), keys=sorted(payload), wire=wire or "json", request_id=request_id)
+        if "full_track" in payload and "added_notes" in payload:
+            self._spawn(self._capture(payload, request_id, wire))
+        elif "original_notes" in payload:
+            if self.completing >= self.max_concurrent:
+                self.busy += 1
+                self._fail("busy", request_id, wire)
+                return
+            self.completing += 1
+            self._spawn(self._complete(payload, request_id, wire))
+        else:
+            self._fail(f"Unknown payload keys: {sorted(payload)}", request_id, wire)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _capture(self, payload: Dict[str, Any], request_id: Any = None, wire: Optional[str] = None) -> None:
+        try:
+            await self.on_capture(payload)  # the store may block: the callback keeps it off the loop
+        except Exception as exc:
+            self._fail(f"Invalid capture: {exc}", request_id, wire)
+            return
+        self.captures += 1
+
+    async def _complete(self, payload: Dict[str, Any], request_id: Any = None, wire: Optional[str] = None) -> None:
+        try:
+            result = await self.on_complete(payload)
+        except Exception as exc:
+            self._fail(f"Backend error: {exc}", request_id, wire)
+            return
+        finally:
+            self.completing -= 1
+        self.completions += 1
+        self.reply(result if request_id is None else {"request_id": request_id, **result}, wire)
+
+    def _fail(self, message: str, request_id: Any = None, wire: Optional[str] = None) -> None:
+        self.errors += 1
+        log.warning("request_failed", error=message, request_id=request_id)
+        self.reply({"error": message} if request_id is None else {"request_id": request_id, "error": message}, wire)
+
+    def reply(self, message: Dict[str, Any], wire: Optional[str] = None) -> None:
+        # non-blocking send from the listening socket itself
+        if self.transport is not None and not self.transport.is_closing():
+            for datagram in self.encode_reply(message, wire):
+                self.transport.sendto(datagram, self.reply_address)
+
+    def error_received(self, exc: Exception) -> None:
+        # e.g. ICMP port unreachable when nothing listens on the reply port
+        self.errors += 1
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.transport is not None:
+            self.transport.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "captures": self.captures,
+            "completions": self.completions,
+            "errors": self.errors,
+            "pending": len(self._tasks),
+            "completing": self.completing,
+            "max_concurrent": self.max_concurrent,
+            "busy": self.busy,
+            "reassembly": self.reassembler.stats(),
+        }
+
+
+async def start_bridge_listener(
+    host: str,
+    port: int,
+    on_capture: Callable[[Dict[str, Any]], Awaitable[None]],
+    on_complete: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+    encode_reply: Callable[[Dict[str, Any], Optional[str]], List[bytes]],
+    reply_address: Address,
+    max_concurrent: int = 8,
+) -> BridgeProtocol:
+    """Bind the UDP listener on the running loop; raises OSError if the port is taken."""
+    loop = asyncio.get_running_loop()
+    _, protocol = await loop.create_datagram_endpoint(
+        lambda: BridgeProtocol(on_capture, on_complete, encode_reply, reply_address, max_concurrent),
+        local_addr=(host, port),
+    )
+    return protocol
@@ -2,6 +2,8 @@
 
 Usage:
     python main_control.py
+    python main_control.py --production            # several workers, uvloop/httptools, no reload
+    python main_control.py --workers 4 --skip-frontend
 
 Use --help for more options.
 """
@@ -9,13 +11,16 @@ Use --help for more options.
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import os
 import shutil
 import signal
+import socket
 import subprocess
 import sys
 import time
 from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
 from urllib.error import HTTPError, URLError
 from urllib.request import urlopen
 
@@ -23,6 +28,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 BIN_ROOT = PROJECT_ROOT / "bin"
 UI_DIR = BIN_ROOT / "UI"
 BRIDGE_SCRIPT = BIN_ROOT / "midi_track_ctrl" / "bridge.py"
+BRIDGE_UDP_PORT = 7400  # port the standalone bridge binds (midi_track_ctrl/bridge.py LISTEN_PORT)
 
 
 def parse_args() -> argparse.Namespace:
@@ -32,19 +38,55 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--backend-wait-url",
         default=None,
-        help="URL used to detect when the backend is ready. Defaults to http://127.0.0.1:<port>/default",
+        help="URL used to detect when the backend is ready. Defaults to http://127.0.0.1:<port>/readyz",
     )
     parser.add_argument(
         "--backend-timeout",
         type=int,
         default=45,
-        help="Seconds to wait for backend readiness before continuing",
+        help="Seconds after which a backend that is still not ready is reported (other services do not wait for it)",
     )
     parser.add_argument(
         "--reload",
         action="store_true",
         help="Run uvicorn with --reload (development hot reload)",
     )
+    parser.add_argument(
+        "--max-restarts",
+        type=int,
+        default=5,
+        help="Restart a crashed service up to this many times in a row before stopping everything (0: never restart)",
+    )
+    parser.add_argument(
+        "--restart-backoff",
+        type=float,
+        default=1.0,
+        help="Delay before the first restart, doubled after each further crash (capped at 30s)",
+    )
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Production launch: several workers (see --workers), uvloop/httptools when installed, no access log",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="uvicorn worker processes (default 1; with --production min(4, CPU count)). "
+        "More than one worker shares bridge state through BRIDGE_STORE=sqlite",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=["auto", "uvloop", "asyncio"],
+        default="auto",
+        help="Event loop for uvicorn (auto: uvloop when installed and supported)",
+    )
+    parser.add_argument(
+        "--http",
+        choices=["auto", "httptools", "h11"],
+        default="auto",
+        help="HTTP parser for uvicorn (auto: httptools when installed)",
+    )
     parser.add_argument(
         "--frontend-host",
         default="127.0.0.1",
@@ -69,27 +111,154 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--skip-bridge",
         action="store_true",
-        help="Skip starting the Max for Live bridge",
+        help="Skip the Max for Live bridge (no UDP listener at all)",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--external-bridge",
+        action="store_true",
+        help="Run the standalone bridge script instead of the backend's in-process UDP listener",
+    )
+    args = parser.parse_args()
+    if args.workers is None:
+        args.workers = min(4, os.cpu_count() or 1) if args.production else 1
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.reload and (args.production or args.workers > 1):
+        parser.error("--reload runs a single worker; drop --production / --workers")
+    for option, choice in (("--loop", args.loop), ("--http", args.http)):
+        if choice in ("uvloop", "httptools") and not module_available(choice):
+            parser.error(f"{option} {choice}: package '{choice}' is not installed")
+    return args
+
+
+def module_available(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
 
+def resolve_server_impl(args: argparse.Namespace) -> Tuple[str, str]:
+    """The (loop, http) implementations uvicorn will use, resolving "auto" the way uvicorn does."""
+    loop = args.loop
+    if loop == "auto":
+        # uvloop does not support Windows
+        loop = "uvloop" if os.name != "nt" and module_available("uvloop") else "asyncio"
+    http = args.http
+    if http == "auto":
+        http = "httptools" if module_available("httptools") else "h11"
+    return loop, http
 
-def wait_for_backend(url: str, timeout: int) -> bool:
-    print(f"Waiting for backend: {url} (timeout {timeout}s)...")
-    deadline = time.time() + timeout
-    while time.time() < deadline:
+
+def probe_http(url: str, timeout: float = 1.0) -> bool:
+    """One request; True on a 2xx answer (/readyz answers 503 until startup is done)."""
+    try:
+        with urlopen(url, timeout=timeout) as response:  # noqa: S310 - trusted URL
+            return 200 <= response.status < 300
+    except (URLError, HTTPError, OSError):
+        return False
+
+
+def probe_udp_bound(host: str, port: int) -> bool:
+    """True once something has bound the UDP port (our bind attempt fails)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
         try:
-            with urlopen(url) as response:  # noqa: S310 - trusted URL
-                if 200 <= response.status < 500:
-                    print("Backend is responding.")
-                    return True
-        except (URLError, HTTPError):
-            time.sleep(1)
-    print("Backend did not respond within timeout; continuing anyway.")
+            sock.bind((host, port))
+        except OSError:
+            return True
     return False
 
 
+class StartupTimer:
+    """Tracks how long each launched service takes to pass its readiness probe."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.pending: Dict[str, Tuple[float, Callable[[], bool]]] = {}
+        self.ready: Dict[str, float] = {}
+        self.reported = False
+
+    def track(self, name: str, probe: Callable[[], bool], launched_at: Optional[float] = None) -> None:
+        self.pending[name] = (launched_at if launched_at is not None else time.perf_counter(), probe)
+
+    def mark_ready(self, name: str, launched_at: float) -> None:
+        self.pending.pop(name, None)
+        self.ready[name] = time.perf_counter() - launched_at
+        print(f"{name} ready in {self.ready[name]:.2f}s")
+
+    def poll(self) -> None:
+        for name, (launched_at, probe) in list(self.pending.items()):
+            if probe():
+                self.mark_ready(name, launched_at)
+        if not self.pending and not self.reported:
+            self.report()
+
+    def report(self) -> None:
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.ready.items())
+        print(f"Startup timing: {parts} (all ready {time.perf_counter() - self.started:.2f}s after launch)")
+        self.reported = True  # later "ready in" lines are restarts
+
+
+RESTART_BACKOFF_MAX = 30.0
+# a service that ran this long before crashing starts its backoff from scratch
+STABLE_UPTIME = 60.0
+
+
+class Service:
+    """One child process, restarted with exponential backoff when it exits."""
+
+    def __init__(
+        self,
+        name: str,
+        launch: Callable[[], subprocess.Popen[bytes]],
+        probe: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        self.name = name
+        self.launch = launch
+        self.probe = probe
+        self.proc: subprocess.Popen[bytes] | None = None
+        self.launched_at = 0.0
+        self.crashes = 0  # consecutive crashes, reset after STABLE_UPTIME
+        self.restart_at: Optional[float] = None
+
+    def start(self, timer: StartupTimer) -> None:
+        self.launched_at = time.perf_counter()
+        self.restart_at = None
+        self.proc = self.launch()
+        if self.probe is not None:
+            timer.track(self.name, self.probe, self.launched_at)
+
+    def check(self, args: argparse.Namespace, timer: StartupTimer) -> bool:
+        """Start a due restart or notice an exit; False once the restart budget is spent."""
+        now = time.perf_counter()
+        if self.proc is None:
+            if self.restart_at is not None and now >= self.restart_at:
+                print(f"Restarting {self.name}...")
+                self.start(timer)
+            return True
+        code = self.proc.poll()
+        if code is None:
+            return True
+        uptime = now - self.launched_at
+        print(f"{self.name.capitalize()} exited with code {code} after {uptime:.1f}s.")
+        self.proc = None
+        timer.pending.pop(self.name, None)
+        if uptime >= STABLE_UPTIME:
+            self.crashes = 0
+        if self.crashes >= args.max_restarts:
+            if args.max_restarts:
+                print(f"{self.name.capitalize()} crashed {self.crashes + 1} times in a row; giving up.")
+            return False
+        delay = min(args.restart_backoff * 2 ** self.crashes, RESTART_BACKOFF_MAX)
+        self.crashes += 1
+        self.restart_at = now + delay
+        print(f"Restarting {self.name} in {delay:.1f}s (attempt {self.crashes}/{args.max_restarts}).")
+        return True
+
+    def stop(self) -> None:
+        self.restart_at = None
+        terminate_process(self.proc, self.name)
+
+
 def start_backend(args: argparse.Namespace) -> subprocess.Popen[bytes]:
+    loop, http = resolve_server_impl(args)
     cmd = [
         sys.executable,
         "-m",
@@ -99,11 +268,27 @@ def start_backend(args: argparse.Namespace) -> subprocess.Popen[bytes]:
         args.backend_host,
         "--port",
         str(args.backend_port),
+        "--loop",
+        loop,
+        "--http",
+        http,
     ]
     if args.reload:
         cmd.append("--reload")
+    if args.workers > 1:
+        cmd.extend(["--workers", str(args.workers)])
+    if args.production:
+        cmd.append("--no-access-log")
+    env = dict(os.environ)
+    if args.skip_bridge:
+        env["BRIDGE_MODE"] = "off"
+    elif args.external_bridge:
+        env["BRIDGE_MODE"] = "external"
+    if args.workers > 1:
+        # per-process bridge state would differ between workers; an explicit setting wins
+        env.setdefault("BRIDGE_STORE", "sqlite")
     print("Launching backend:", " ".join(cmd))
-    return subprocess.Popen(cmd, cwd=BIN_ROOT)
+    return subprocess.Popen(cmd, cwd=BIN_ROOT, env=env)
 
 
 def start_bridge() -> subprocess.Popen[bytes]:
@@ -153,54 +338,50 @@ def main() -> None:
     wait_url = args.backend_wait_url
     if not wait_url:
         wait_host = "127.0.0.1" if args.backend_host in {"0.0.0.0", "::", "[::]"} else args.backend_host
-        wait_url = f"http://{wait_host}:{args.backend_port}/default"
-
-    backend_proc = start_backend(args)
+        wait_url = f"http://{wait_host}:{args.backend_port}/readyz"
 
-    bridge_proc: subprocess.Popen[bytes] | None = None
-    frontend_proc: subprocess.Popen[bytes] | None = None
+    # Nothing needs the backend to be up in order to start: the frontend only
+    # calls it from the browser and the bridge posts per capture. So every
+    # service is launched at once and only the readiness report waits.
+    services = [Service("backend", lambda: start_backend(args), lambda: probe_http(wait_url))]
+    # the backend hosts the UDP listener itself unless --external-bridge
+    if args.external_bridge and not args.skip_bridge:
+        if BRIDGE_SCRIPT.exists():
+            services.append(Service("bridge", start_bridge, lambda: probe_udp_bound("127.0.0.1", BRIDGE_UDP_PORT)))
+        else:
+            print(f"Warning: Bridge script not found: {BRIDGE_SCRIPT}")
+            print("Continuing without bridge...")
+    if not args.skip_frontend:
+        frontend_host = "127.0.0.1" if args.frontend_host in {"0.0.0.0", "::", "[::]"} else args.frontend_host
+        frontend_url = f"http://{frontend_host}:{args.frontend_port}/"
+        services.append(Service("frontend", lambda: start_frontend(args), lambda: probe_http(frontend_url)))
 
+    timer = StartupTimer()
+    backend_warned = False
     try:
-        wait_for_backend(wait_url, args.backend_timeout)
-        
-        if not args.skip_bridge:
-            try:
-                bridge_proc = start_bridge()
-            except FileNotFoundError as e:
-                print(f"Warning: {e}")
-                print("Continuing without bridge...")
-        
-        if not args.skip_frontend:
-            frontend_proc = start_frontend(args)
-        
-        services = ["backend"]
-        if bridge_proc:
-            services.append("bridge")
-        if frontend_proc:
-            services.append("frontend")
-        print(f"Services running: {', '.join(services)}. Press Ctrl+C to stop all.")
-
-        while True:
-            backend_return = backend_proc.poll()
-            bridge_return = bridge_proc.poll() if bridge_proc else None
-            frontend_return = frontend_proc.poll() if frontend_proc else None
-            
-            if backend_return is not None:
-                print(f"Backend exited with code {backend_return}.")
-                break
-            if bridge_proc and bridge_return is not None:
-                print(f"Bridge exited with code {bridge_return}.")
-                break
-            if frontend_proc and frontend_return is not None:
-                print(f"Frontend exited with code {frontend_return}.")
-                break
-            time.sleep(1)
+        for service in services:
+            service.start(timer)
+
+        names = [service.name for service in services]
+        if not args.skip_bridge and not args.external_bridge:
+            names.insert(1, "bridge (in-process)")
+        print(f"Services starting: {', '.join(names)}. Press Ctrl+C to stop all.")
+
+        while all(service.check(args, timer) for service in services):
+            timer.poll()
+            if (
+                not backend_warned
+                and "backend" in timer.pending
+                and time.perf_counter() - timer.started > args.backend_timeout
+            ):
+                print(f"Backend not ready after {args.backend_timeout}s ({wait_url}); still waiting.")
+                backend_warned = True
+            time.sleep(0.1 if timer.pending or any(s.restart_at for s in services) else 1)
     except KeyboardInterrupt: 
         print("\nStopping services...")
     finally:
-        terminate_process(frontend_proc, "frontend")
-        terminate_process(bridge_proc, "bridge")
-        terminate_process(backend_proc, "backend")
+        for service in reversed(services):
+            service.stop()
 
 
 if __name__ == "__main__":